@@ -1,206 +1,288 @@
+import asyncio
+import csv
+import gzip
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from typing import Iterator
+
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
 from openpyxl.utils import get_column_letter
 from sqlalchemy.future import select
-from sqlalchemy import func
-from sqlalchemy.orm import selectinload
 
 from app.core.extensions.utils import WORKDIR
 
 SAFE_ROWS_PER_SHEET = 950000  # 90% of Excel's limit for safety
-BATCH_SIZE = 1000  # Process users in batches
+BATCH_SIZE = 5000  # Users fetched per keyset page
 
+EXPORT_FORMATS = {
+    "xlsx": "xlsx",
+    "csv": "csv.gz",
+    "parquet": "parquet",
+}
 
-async def export_users_to_excel(
-    save_path: str = str(WORKDIR.parent / "media" / "xlsx"),
-) -> str:
-    from app.bot.models import User
-    from app.core.databases.postgres import get_general_session
+# (header, key, xlsx column width)
+COLUMNS = [
+    ("ID", "id", 10),
+    ("Telegram ID", "tg_id", 15),
+    ("Full Name", "full_name", 30),
+    ("Username", "username", 22),
+    ("Language", "language_code", 10),
+    ("Premium", "is_tg_premium", 12),
+    ("Last Active", "last_active", 18),
+    ("Referred By", "referred_by", 15),
+    ("Active Status", "is_active", 14),
+    ("Balance", "balance", 10),
+    ("Created At", "created_at", 18),
+    ("Updated At", "updated_at", 18),
+    ("Text Downloads", "from_text", 12),
+    ("Voice Downloads", "from_voice", 12),
+    ("YouTube Downloads", "from_youtube", 12),
+    ("TikTok Downloads", "from_tiktok", 12),
+    ("Likee Downloads", "from_like", 12),
+    ("Snapchat Downloads", "from_snapchat", 12),
+    ("Instagram Downloads", "from_instagram", 12),
+    ("Twitter Downloads", "from_twitter", 12),
+]
+STAT_KEYS = [key for _, key, _ in COLUMNS if key.startswith("from_")]
 
-    os.makedirs(save_path, exist_ok=True)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"users_export_{timestamp}.xlsx"
-    full_path = os.path.join(save_path, filename)
+def _iter_user_rows() -> Iterator[dict]:
+    """
+    Yields every user joined with their statistics.
 
-    async with get_general_session() as session:
-        total_count_result = await session.execute(select(func.count(User.id)))
-        total_users = total_count_result.scalar()
+    Pages by ``User.id`` (keyset, so every page costs the same) and reads each
+    page through a server-side cursor, so memory stays flat on large tables.
+    """
+    from app.bot.models import Statistics, User
+    from app.core.databases.postgres import get_sync_engine
 
-        sheets_needed = max(
-            1, (total_users + SAFE_ROWS_PER_SHEET - 1) // SAFE_ROWS_PER_SHEET
+    stat_columns = [getattr(Statistics, key) for key in STAT_KEYS]
+    query = (
+        select(
+            User.id,
+            User.tg_id,
+            User.first_name,
+            User.last_name,
+            User.username,
+            User.language_code,
+            User.is_tg_premium,
+            User.last_active,
+            User.referred_by,
+            User.balance,
+            User.created_at,
+            User.updated_at,
+            *stat_columns,
         )
+        .outerjoin(Statistics, Statistics.tg_id == User.tg_id)
+        .order_by(User.id)
+        .limit(BATCH_SIZE)
+    )
+    active_since = datetime.now() - timedelta(days=30)
 
-        wb = Workbook()
-        wb.remove(wb.active)
+    last_id = 0
+    with get_sync_engine().connect() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=1000)
+        while True:
+            rows = conn.execute(query.where(User.id > last_id)).mappings()
+            count = 0
+            for row in rows:
+                count += 1
+                last_id = row["id"]
+                item = dict(row)
+                first_name = item.pop("first_name")
+                last_name = item.pop("last_name")
+                item["full_name"] = f"{first_name} {last_name or ''}".strip()
+                item["is_active"] = bool(
+                    item["last_active"] and item["last_active"] > active_since
+                )
+                for key in STAT_KEYS:
+                    item[key] = item[key] or 0
+                yield item
+            if count < BATCH_SIZE:
+                break
 
-        header_font = Font(name="Calibri", size=12, bold=True, color="FFFFFF")
-        header_fill = PatternFill(
-            start_color="2F5597", end_color="2F5597", fill_type="solid"
-        )
-        header_alignment = Alignment(horizontal="center", vertical="center")
 
-        data_font = Font(name="Calibri", size=10)
-        data_alignment = Alignment(horizontal="left", vertical="center")
+def _format_xlsx_value(key: str, value):
+    if key in ("last_active", "created_at", "updated_at"):
+        return value.strftime("%Y-%m-%d %H:%M") if value else "N/A"
+    if key == "username":
+        return f"@{value}" if value else "N/A"
+    if key == "is_tg_premium":
+        return "⭐ Premium" if value else "Standard"
+    if key == "is_active":
+        return "✅ Active" if value else "❌ Inactive"
+    if key == "balance":
+        return value if value is not None else 0.0
+    if value is None:
+        return "N/A"
+    return value
 
-        border = Border(
-            left=Side(style="thin", color="D3D3D3"),
-            right=Side(style="thin", color="D3D3D3"),
-            top=Side(style="thin", color="D3D3D3"),
-            bottom=Side(style="thin", color="D3D3D3"),
-        )
 
-        light_fill = PatternFill(
-            start_color="F8F9FA", end_color="F8F9FA", fill_type="solid"
-        )
-        white_fill = PatternFill(
-            start_color="FFFFFF", end_color="FFFFFF", fill_type="solid"
-        )
-        premium_fill = PatternFill(
-            start_color="FFF3CD", end_color="FFF3CD", fill_type="solid"
-        )
+def _named_styles() -> list[NamedStyle]:
+    border = Border(
+        left=Side(style="thin", color="D3D3D3"),
+        right=Side(style="thin", color="D3D3D3"),
+        top=Side(style="thin", color="D3D3D3"),
+        bottom=Side(style="thin", color="D3D3D3"),
+    )
+    data_font = Font(name="Calibri", size=10)
+    data_alignment = Alignment(horizontal="left", vertical="center")
+
+    def fill(color: str) -> PatternFill:
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    return [
+        NamedStyle(
+            name="export_header",
+            font=Font(name="Calibri", size=12, bold=True, color="FFFFFF"),
+            fill=fill("2F5597"),
+            alignment=Alignment(horizontal="center", vertical="center"),
+            border=border,
+        ),
+        NamedStyle(
+            name="export_row",
+            font=data_font,
+            fill=fill("FFFFFF"),
+            alignment=data_alignment,
+            border=border,
+        ),
+        NamedStyle(
+            name="export_row_alt",
+            font=data_font,
+            fill=fill("F8F9FA"),
+            alignment=data_alignment,
+            border=border,
+        ),
+        NamedStyle(
+            name="export_row_premium",
+            font=data_font,
+            fill=fill("FFF3CD"),
+            alignment=data_alignment,
+            border=border,
+        ),
+    ]
+
+
+def _write_xlsx(full_path: str) -> None:
+    # write_only streams rows to disk instead of keeping every cell in memory
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+
+    def new_sheet(index: int):
+        ws = wb.create_sheet("Users" if index == 1 else f"Users_Page_{index}")
+        for col, (_, _, width) in enumerate(COLUMNS, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        ws.freeze_panes = "A2"
+        header = []
+        for title, _, _ in COLUMNS:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.style = "export_header"
+            header.append(cell)
+        ws.append(header)
+        return ws
+
+    sheet_idx = 1
+    ws = new_sheet(sheet_idx)
+    current_row = 2
+    for item in _iter_user_rows():
+        if current_row > SAFE_ROWS_PER_SHEET:
+            sheet_idx += 1
+            ws = new_sheet(sheet_idx)
+            current_row = 2
+
+        if item["is_tg_premium"]:
+            style = "export_row_premium"
+        elif current_row % 2 == 0:
+            style = "export_row_alt"
+        else:
+            style = "export_row"
 
-        # Headers
-        headers = [
-            "ID",
-            "Telegram ID",
-            "Full Name",
-            "Username",
-            "Language",
-            "Premium",
-            "Last Active",
-            "Referred By",
-            "Active Status",
-            "Balance",
-            "Created At",
-            "Updated At",
-            "Text Downloads",
-            "Voice Downloads",
-            "YouTube Downloads",
-            "TikTok Downloads",
-            "Likee Downloads",
-            "Snapchat Downloads",
-            "Instagram Downloads",
-            "Twitter Downloads",
+        row = []
+        for _, key, _ in COLUMNS:
+            cell = WriteOnlyCell(ws, value=_format_xlsx_value(key, item[key]))
+            cell.style = style
+            row.append(cell)
+        ws.append(row)
+        current_row += 1
+
+    wb.save(full_path)
+
+
+def _write_csv_gz(full_path: str) -> None:
+    with gzip.open(full_path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([title for title, _, _ in COLUMNS])
+        for item in _iter_user_rows():
+            writer.writerow([item[key] for _, key, _ in COLUMNS])
+
+
+def _write_parquet(full_path: str) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("tg_id", pa.int64()),
+            ("full_name", pa.string()),
+            ("username", pa.string()),
+            ("language_code", pa.string()),
+            ("is_tg_premium", pa.bool_()),
+            ("last_active", pa.timestamp("us")),
+            ("referred_by", pa.int64()),
+            ("is_active", pa.bool_()),
+            ("balance", pa.float64()),
+            ("created_at", pa.timestamp("us")),
+            ("updated_at", pa.timestamp("us")),
+            *((key, pa.int64()) for key in STAT_KEYS),
         ]
+    )
+    with pq.ParquetWriter(full_path, schema, compression="zstd") as writer:
+        batch: list[dict] = []
+        for item in _iter_user_rows():
+            batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
 
-        # Process users in batches
-        current_sheet_idx = 1
-        current_row = 2
-        current_ws = None
 
-        offset = 0
-        while True:
-            result = await session.execute(
-                select(User)
-                .options(selectinload(User.statistics))
-                .offset(offset)
-                .limit(BATCH_SIZE)
-                .order_by(User.id)
-            )
-            users_batch = result.scalars().all()
-
-            if not users_batch:
-                break
+_WRITERS = {
+    "xlsx": _write_xlsx,
+    "csv": _write_csv_gz,
+    "parquet": _write_parquet,
+}
+
+
+def _run_export(fmt: str, full_path: str) -> str:
+    _WRITERS[fmt](full_path)
+    return full_path
+
+
+async def export_users(
+    fmt: str = "xlsx",
+    save_path: str = str(WORKDIR.parent / "media" / "xlsx"),
+) -> str:
+    """
+    Exports all users in ``fmt`` ("xlsx", "csv" or "parquet").
+
+    The export runs in a separate process with its own sync DB connection, so
+    building a large file never blocks the bot's event loop.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    os.makedirs(save_path, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"users_export_{timestamp}.{EXPORT_FORMATS[fmt]}"
+    full_path = os.path.join(save_path, filename)
 
-            for user in users_batch:
-                if current_ws is None or current_row > SAFE_ROWS_PER_SHEET:
-                    sheet_name = (
-                        f"Users_Page_{current_sheet_idx}"
-                        if sheets_needed > 1
-                        else "Users"
-                    )
-                    current_ws = wb.create_sheet(sheet_name)
-                    current_row = 2
-                    current_sheet_idx += 1
-
-                    # Add headers
-                    for col, header in enumerate(headers, 1):
-                        cell = current_ws.cell(row=1, column=col, value=header)
-                        cell.font = header_font
-                        cell.fill = header_fill
-                        cell.alignment = header_alignment
-                        cell.border = border
-
-                # User data
-                active_status = "✅ Active" if user.is_active() else "❌ Inactive"
-                premium_status = "⭐ Premium" if user.is_tg_premium else "Standard"
-                stats = user.statistics
-                row_data = [
-                    user.id,
-                    user.tg_id,
-                    user.full_name,
-                    f"@{user.username}" if user.username else "N/A",
-                    user.language_code or "N/A",
-                    premium_status,
-                    (
-                        user.last_active.strftime("%Y-%m-%d %H:%M")
-                        if user.last_active
-                        else "N/A"
-                    ),
-                    user.referred_by or "N/A",
-                    active_status,
-                    user.balance if user.balance is not None else 0.0,
-                    (
-                        user.created_at.strftime("%Y-%m-%d %H:%M")
-                        if hasattr(user, "created_at") and user.created_at
-                        else "N/A"
-                    ),
-                    (
-                        user.updated_at.strftime("%Y-%m-%d %H:%M")
-                        if hasattr(user, "updated_at") and user.updated_at
-                        else "N/A"
-                    ),
-                    stats.from_text if stats else 0,
-                    stats.from_voice if stats else 0,
-                    stats.from_youtube if stats else 0,
-                    stats.from_tiktok if stats else 0,
-                    stats.from_like if stats else 0,
-                    stats.from_snapchat if stats else 0,
-                    stats.from_instagram if stats else 0,
-                    stats.from_twitter if stats else 0,
-                ]
-
-                # Write row
-                for col, value in enumerate(row_data, 1):
-                    cell = current_ws.cell(row=current_row, column=col, value=value)
-                    cell.font = data_font
-                    cell.alignment = data_alignment
-                    cell.border = border
-
-                    # Colors
-                    if user.is_tg_premium:
-                        cell.fill = premium_fill
-                    elif current_row % 2 == 0:
-                        cell.fill = light_fill
-                    else:
-                        cell.fill = white_fill
-
-                current_row += 1
-
-            offset += BATCH_SIZE
-
-        # Auto-adjust columns
-        for sheet in wb.worksheets:
-            for column in sheet.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 30)
-                sheet.column_dimensions[column_letter].width = adjusted_width
-
-        # Set active sheet
-        if wb.worksheets:
-            wb.active = wb.worksheets[0]
-
-        # Save
-        wb.save(full_path)
-
-        return full_path
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return await loop.run_in_executor(pool, _run_export, fmt, full_path)
@@ -0,0 +1,390 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from aiogram.types import ContentType
+from sqlalchemy import func, or_, update
+from sqlalchemy.future import select
+
+from app.bot.keyboards.admin_keyboards import get_admin_panel_keyboard
+from app.bot.models import BroadcastCampaign, User
+from app.core.databases.postgres import get_general_session
+from app.core.extensions.enums import BroadcastStatus
+from app.core.settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BATCH_SIZE = 500  # users per checkpoint
+PROGRESS_INTERVAL = 5.0  # seconds between progress message edits
+MAX_RETRIES = 3
+
+# keep references so running campaigns aren't garbage collected
+_running: dict[int, asyncio.Task] = {}
+
+# holder of the campaign leases taken by this process
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseLost(Exception):
+    """Another bot process took the campaign over."""
+
+
+def _lease_expiry() -> datetime:
+    return datetime.now() + timedelta(seconds=settings.BROADCAST_LEASE_TIMEOUT)
+
+
+def _progress_text(campaign: BroadcastCampaign, title: str) -> str:
+    done = campaign.sent + campaign.failed + campaign.blocked
+    return (
+        f"{title}\n\n"
+        f"Processed: <b>{done}</b> / {campaign.total}\n"
+        f"✅ Sent: <b>{campaign.sent}</b>\n"
+        f"🚫 Blocked: <b>{campaign.blocked}</b>\n"
+        f"⚠️ Failed: <b>{campaign.failed}</b>"
+    )
+
+
+class TokenBucket:
+    """
+    Async token bucket: ``rate`` tokens per second, bursts up to ``capacity``.
+
+    ``pause`` empties the bucket for a while, which is how a ``RetryAfter``
+    from Telegram slows down every sender at once.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    self._updated = time.monotonic()
+                    continue
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BroadcastController:
+    """Sends one campaign to every reachable user, checkpointing per batch."""
+
+    def __init__(self, bot: Bot, campaign: BroadcastCampaign) -> None:
+        self.bot = bot
+        self.campaign = campaign
+        self.bucket = TokenBucket(
+            rate=settings.BROADCAST_RATE_PER_SECOND,
+            capacity=settings.BROADCAST_CONCURRENCY,
+        )
+        self._last_progress = 0.0
+
+    async def run(self) -> None:
+        campaign = self.campaign
+        heartbeat = asyncio.create_task(self._keep_lease(asyncio.current_task()))
+        try:
+            while True:
+                users = await self._next_batch()
+                if not users:
+                    break
+                results = await self._send_batch([tg_id for _, tg_id in users])
+                await self._checkpoint(users, results)
+                await self._report_progress()
+            await self._finish(BroadcastStatus.COMPLETED)
+        except asyncio.CancelledError:
+            # leave it RUNNING so it is resumed from the checkpoint on restart
+            raise
+        except LeaseLost:
+            logger.warning(f"Broadcast {campaign.id} was taken over, stopping")
+        except Exception as e:
+            logger.exception(f"Broadcast {campaign.id} failed")
+            await self._finish(BroadcastStatus.FAILED, error=str(e))
+        finally:
+            heartbeat.cancel()
+
+    async def _renew_lease(self) -> bool:
+        async with get_general_session() as session:
+            result = await session.execute(
+                update(BroadcastCampaign)
+                .where(
+                    BroadcastCampaign.id == self.campaign.id,
+                    BroadcastCampaign.locked_by == OWNER,
+                )
+                .values(locked_until=_lease_expiry())
+            )
+            await session.commit()
+            return result.rowcount > 0
+
+    async def _keep_lease(self, sender: asyncio.Task) -> None:
+        """Renews the lease while sending; stops the sender if it was lost."""
+        interval = max(settings.BROADCAST_LEASE_TIMEOUT / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await self._renew_lease()
+            except Exception as e:
+                logger.warning(f"Could not renew broadcast {self.campaign.id}: {e}")
+                continue
+            if not renewed:
+                logger.warning(f"Broadcast {self.campaign.id} lease lost, stopping")
+                sender.cancel()
+                return
+
+    async def _next_batch(self) -> list[tuple[int, int]]:
+        async with get_general_session() as session:
+            result = await session.execute(
+                select(User.id, User.tg_id)
+                .where(
+                    User.id > self.campaign.last_user_id,
+                    User.is_blocked.is_(False),
+                )
+                .order_by(User.id)
+                .limit(BATCH_SIZE)
+            )
+            return [tuple(row) for row in result.all()]
+
+    async def _send_batch(self, tg_ids: list[int]) -> dict[str, list[int]]:
+        results: dict[str, list[int]] = {"sent": [], "failed": [], "blocked": []}
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for tg_id in tg_ids:
+            queue.put_nowait(tg_id)
+
+        async def worker() -> None:
+            while not queue.empty():
+                tg_id = queue.get_nowait()
+                results[await self._deliver(tg_id)].append(tg_id)
+
+        workers = min(settings.BROADCAST_CONCURRENCY, len(tg_ids))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
+
+    async def _deliver(self, tg_id: int) -> str:
+        for _ in range(MAX_RETRIES):
+            await self.bucket.acquire()
+            try:
+                await self._send(tg_id)
+                return "sent"
+            except TelegramRetryAfter as e:
+                logger.warning(f"Broadcast flood control, sleeping {e.retry_after}s")
+                self.bucket.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return "blocked"
+            except TelegramAPIError as e:
+                logger.debug(f"Broadcast to {tg_id} failed: {e}")
+                return "failed"
+        return "failed"
+
+    async def _send(self, tg_id: int) -> None:
+        campaign = self.campaign
+        text = campaign.text
+        if campaign.media_type == ContentType.PHOTO:
+            await self.bot.send_photo(
+                tg_id, photo=campaign.media_file_id, caption=text, parse_mode="HTML"
+            )
+        elif campaign.media_type == ContentType.VIDEO:
+            await self.bot.send_video(
+                tg_id, video=campaign.media_file_id, caption=text, parse_mode="HTML"
+            )
+        elif campaign.media_type:
+            await self.bot.send_document(
+                tg_id, document=campaign.media_file_id, caption=text, parse_mode="HTML"
+            )
+        else:
+            await self.bot.send_message(tg_id, text, parse_mode="HTML")
+
+    async def _checkpoint(
+        self, users: list[tuple[int, int]], results: dict[str, list[int]]
+    ) -> None:
+        campaign = self.campaign
+        campaign.last_user_id = users[-1][0]
+        campaign.sent += len(results["sent"])
+        campaign.failed += len(results["failed"])
+        campaign.blocked += len(results["blocked"])
+        async with get_general_session() as session:
+            if results["blocked"]:
+                await session.execute(
+                    update(User)
+                    .where(User.tg_id.in_(results["blocked"]))
+                    .values(is_blocked=True)
+                    .execution_options(synchronize_session=False)
+                )
+            # only the lease holder moves the checkpoint
+            result = await session.execute(
+                update(BroadcastCampaign)
+                .where(
+                    BroadcastCampaign.id == campaign.id,
+                    BroadcastCampaign.locked_by == OWNER,
+                )
+                .values(
+                    last_user_id=campaign.last_user_id,
+                    sent=campaign.sent,
+                    failed=campaign.failed,
+                    blocked=campaign.blocked,
+                    locked_until=_lease_expiry(),
+                )
+            )
+            await session.commit()
+        if not result.rowcount:
+            raise LeaseLost()
+
+    async def _report_progress(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        if not self.campaign.progress_message_id:
+            return
+        try:
+            await self.bot.edit_message_text(
+                _progress_text(self.campaign, "📬 Broadcast in progress…"),
+                chat_id=self.campaign.admin_id,
+                message_id=self.campaign.progress_message_id,
+                parse_mode="HTML",
+            )
+        except TelegramAPIError as e:
+            logger.debug(f"Broadcast progress update failed: {e}")
+
+    async def _finish(self, status: BroadcastStatus, error: str | None = None):
+        campaign = self.campaign
+        async with get_general_session() as session:
+            result = await session.execute(
+                update(BroadcastCampaign)
+                .where(
+                    BroadcastCampaign.id == campaign.id,
+                    BroadcastCampaign.locked_by == OWNER,
+                )
+                .values(
+                    status=status.value,
+                    finished_at=datetime.now(),
+                    locked_by=None,
+                    locked_until=None,
+                )
+            )
+            await session.commit()
+        if not result.rowcount:
+            # the process that took it over reports the result
+            logger.warning(f"Broadcast {campaign.id} was taken over, not reporting")
+            return
+
+        if status == BroadcastStatus.COMPLETED:
+            title = "📬 Broadcast complete!"
+        else:
+            title = f"❌ Broadcast stopped: {error}"
+        try:
+            await self.bot.send_message(
+                campaign.admin_id,
+                _progress_text(campaign, title),
+                parse_mode="HTML",
+                reply_markup=get_admin_panel_keyboard(),
+            )
+        except TelegramAPIError as e:
+            logger.warning(f"Could not report broadcast result: {e}")
+
+
+async def _count_recipients() -> int:
+    async with get_general_session() as session:
+        result = await session.execute(
+            select(func.count()).select_from(User).where(User.is_blocked.is_(False))
+        )
+        return result.scalar_one()
+
+
+def _spawn(bot: Bot, campaign: BroadcastCampaign) -> asyncio.Task:
+    task = asyncio.create_task(BroadcastController(bot, campaign).run())
+    _running[campaign.id] = task
+    task.add_done_callback(lambda _: _running.pop(campaign.id, None))
+    return task
+
+
+async def start_broadcast(
+    bot: Bot, admin_id: int, text: str, media: tuple[str, str] | None = None
+) -> asyncio.Task:
+    """Creates a campaign, posts its progress message and starts sending."""
+    media_type, media_file_id = media if media else (None, None)
+    if isinstance(media_type, ContentType):
+        media_type = media_type.value
+    campaign = BroadcastCampaign(
+        admin_id=admin_id,
+        text=text,
+        media_type=media_type,
+        media_file_id=media_file_id,
+        status=BroadcastStatus.RUNNING.value,
+        last_user_id=0,
+        total=await _count_recipients(),
+        sent=0,
+        failed=0,
+        blocked=0,
+        locked_by=OWNER,
+        locked_until=_lease_expiry(),
+    )
+    try:
+        progress = await bot.send_message(
+            admin_id,
+            _progress_text(campaign, "📬 Broadcast in progress…"),
+            parse_mode="HTML",
+        )
+        campaign.progress_message_id = progress.message_id
+    except TelegramAPIError as e:
+        logger.warning(f"Could not post broadcast progress message: {e}")
+
+    async with get_general_session() as session:
+        session.add(campaign)
+        await session.commit()
+    return _spawn(bot, campaign)
+
+
+async def resume_broadcasts(bot: Bot) -> None:
+    """
+    Restarts campaigns that were interrupted by a shutdown or crash. Only
+    campaigns whose lease expired are claimed, so a campaign still being
+    sent by another bot process is left to it.
+    """
+    now = datetime.now()
+    async with get_general_session() as session:
+        result = await session.execute(
+            update(BroadcastCampaign)
+            .where(
+                BroadcastCampaign.status == BroadcastStatus.RUNNING.value,
+                or_(
+                    BroadcastCampaign.locked_until.is_(None),
+                    BroadcastCampaign.locked_until < now,
+                ),
+            )
+            .values(locked_by=OWNER, locked_until=_lease_expiry())
+            .returning(BroadcastCampaign)
+            .execution_options(synchronize_session=False)
+        )
+        campaigns = result.scalars().all()
+        await session.commit()
+    for campaign in campaigns:
+        if campaign.id in _running:
+            continue
+        logger.info(
+            f"Resuming broadcast {campaign.id} after user id {campaign.last_user_id}"
+        )
+        _spawn(bot, campaign)
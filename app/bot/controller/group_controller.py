@@ -14,6 +14,7 @@ from app.bot.controller.snapchat_controller import SnapchatController
 from app.bot.controller.shorts_controller import YouTubeShortsController
 from app.bot.handlers.instagram_handler import download_instagram_video_only_mp4
 from app.core.extensions.utils import WORKDIR
+from app.core.utils.cancellation import CancelToken, run_cancellable
 from app.core.settings.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -105,21 +106,21 @@ class GroupController:
 
         try:
             if platform == PlatformType.TIKTOK:
-                return await self._download_tiktok(url)
+                result = await self._download_tiktok(url)
             elif platform == PlatformType.PINTEREST:
-                return await self._download_pinterest(url)
+                result = await self._download_pinterest(url)
             elif platform == PlatformType.THREADS:
-                return await self._download_threads(url)
+                result = await self._download_threads(url)
             elif platform == PlatformType.TWITTER:
-                return await self._download_twitter(url)
+                result = await self._download_twitter(url)
             elif platform == PlatformType.LIKEE:
-                return await self._download_likee(url)
+                result = await self._download_likee(url)
             elif platform == PlatformType.SNAPCHAT:
-                return await self._download_snapchat(url)
+                result = await self._download_snapchat(url)
             elif platform == PlatformType.INSTAGRAM:
-                return await self._download_instagram(url)
+                result = await self._download_instagram(url)
             elif platform == PlatformType.YOUTUBE_SHORTS:
-                return await self._download_youtube_shorts(url)
+                result = await self._download_youtube_shorts(url)
             else:
                 return {
                     "success": False,
@@ -127,6 +128,11 @@ class GroupController:
                     "files": [],
                 }
 
+            # the sender picks an oversize strategy per platform
+            for file_info in result.get("files", []):
+                file_info.setdefault("platform", platform.value)
+            return result
+
         except Exception as e:
             logger.error(f"Download error for {platform.value}: {e}")
             return {
@@ -139,8 +145,16 @@ class GroupController:
         """TikTok video yuklab olish"""
         save_path = self.media_dir / "tiktok"
 
+        # in a thread, so the cancel button is handled while it runs
+        token = CancelToken()
         with TikTokDownloader() as downloader:
-            file_path = downloader.download_video(url, str(save_path))
+            file_path = await run_cancellable(
+                downloader.download_video,
+                url,
+                str(save_path),
+                cancel=token,
+                token=token,
+            )
 
         if file_path and Path(file_path).exists():
             return {
@@ -169,9 +183,17 @@ class GroupController:
         """Pinterest media yuklab olish"""
         save_path = self.media_dir / "pinterest"
 
+        # in a thread, like TikTok: the page and the media are fetched with
+        # blocking requests calls
+        token = CancelToken()
         with PinterestDownloader() as downloader:
-            file_path, media_type = downloader.download(
-                url, str(save_path), "pinterest_media"
+            file_path, media_type = await run_cancellable(
+                downloader.download,
+                url,
+                str(save_path),
+                "pinterest_media",
+                cancel=token,
+                token=token,
             )
 
         if file_path and Path(file_path).exists():
@@ -222,7 +244,7 @@ class GroupController:
     async def _download_likee(self, url: str) -> Dict[str, Any]:
         """Likee video yuklab olish"""
         controller = LikeeController(settings.LIKEE_API_KEY)
-        file_path = controller.download_video(url)
+        file_path = await controller.download_video(url)
 
         if file_path and Path(file_path).exists():
             return {
@@ -236,7 +258,7 @@ class GroupController:
     async def _download_snapchat(self, url: str) -> Dict[str, Any]:
         """Snapchat video yuklab olish"""
         controller = SnapchatController()
-        file_path = controller.download_snapchat_video(url, self.media_dir / "snapchat")
+        file_path = await controller.download_snapchat_video(url, self.media_dir / "snapchat")
 
         if file_path and Path(file_path).exists():
             return {
@@ -1,8 +1,10 @@
+import asyncio
 import os
 import requests
 from uuid import uuid4
 from typing import Optional
 from app.core.extensions.utils import WORKDIR
+from app.core.utils.downloader import download_file
 
 
 class LikeeController:
@@ -20,9 +22,10 @@ class LikeeController:
         video_id = url.strip("/").split("/")[-1] or str(uuid4())
         return f"{nick_name}_{video_id}.mp4"
 
-    def download_video(self, video_url: str) -> Optional[str]:
+    async def download_video(self, video_url: str) -> Optional[str]:
         try:
-            response = requests.get(
+            response = await asyncio.to_thread(
+                requests.get,
                 self.BASE_URL,
                 headers=self.headers,
                 params={"url": video_url},
@@ -42,12 +45,7 @@ class LikeeController:
             os.makedirs(output_dir, exist_ok=True)
             filepath = output_dir / filename
 
-            video_response = requests.get(download_url, stream=True, timeout=30)
-            video_response.raise_for_status()
-
-            with open(filepath, "wb") as f:
-                for chunk in video_response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            await download_file(download_url, filepath)
 
             return str(filepath)
 
@@ -7,6 +7,8 @@ import re
 import json
 from bs4 import BeautifulSoup
 
+from app.core.utils.cancellation import CancelToken
+
 
 class PinterestDL:
     def scrape(self, url):
@@ -133,7 +135,13 @@ class PinterestDownloader:
     def __exit__(self, exc_type, exc_value, traceback):
         pass
 
-    def download(self, url: str, out_path: str, filename: str) -> tuple[str, str]:
+    def download(
+        self,
+        url: str,
+        out_path: str,
+        filename: str,
+        cancel: CancelToken | None = None,
+    ) -> tuple[str, str]:
         """
         Downloads media from a given URL and saves it to a specified location with a specified filename.
 
@@ -150,6 +158,9 @@ class PinterestDownloader:
             The directory path where the media should be saved.
         filename: str
             The base filename to use when saving the file (without extension).
+        cancel: CancelToken | None
+            Checked once the media is fetched, so a cancelled download is not
+            written to disk.
 
         Returns:
         tuple[str, str]
@@ -165,6 +176,8 @@ class PinterestDownloader:
         >>>print(a)
         """
         result = self.downloader.scrape(url)
+        if cancel:
+            cancel.raise_if_cancelled()
 
         media_type = result.media_type or "unknown"
         ext = result.extension or (".mp4" if media_type == "video" else ".jpg")
@@ -172,6 +185,8 @@ class PinterestDownloader:
 
         os.makedirs(out_path, exist_ok=True)
 
+        if cancel:
+            cancel.track(full_path)
         with open(full_path, "wb") as f:
             f.write(result.buffer)
 
@@ -4,10 +4,12 @@ import logging
 from typing import Any, Dict, List, Optional
 from app.bot.handlers.youtube_search import youtube_search
 from app.bot.handlers.youtube_handler import (
+    download_music_by_id,
     download_music_from_youtube,
     download_video_from_youtube,
     cleanup_old_files,
 )
+from app.core.utils.audio import AudioProfile
 
 logger = logging.getLogger(__name__)
 
@@ -40,14 +42,16 @@ class ShazamController:
             logger.error(f"Search error: {e}")
             return []
 
-    async def download_full_track(self, title: str, artist: str) -> Optional[str]:
+    async def download_full_track(
+        self, title: str, artist: str, profile: AudioProfile | None = None
+    ) -> Optional[str]:
         """Faster track download."""
         if not title or not artist:
             return None
 
         try:
             return await asyncio.wait_for(
-                download_music_from_youtube(title.strip(), artist.strip()),
+                download_music_from_youtube(title.strip(), artist.strip(), profile),
                 timeout=50,  # Reduced timeout
             )
         except asyncio.TimeoutError:
@@ -57,6 +61,24 @@ class ShazamController:
             logger.error(f"Download error: {e}")
             return None
 
+    async def download_track_by_id(
+        self, video_id: str, profile: AudioProfile | None = None
+    ) -> Optional[str]:
+        """Track download straight from a search hit's video id."""
+        if not video_id:
+            return None
+
+        try:
+            return await asyncio.wait_for(
+                download_music_by_id(video_id.strip(), profile), timeout=50
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Download timeout: {video_id}")
+            return None
+        except Exception as e:
+            logger.error(f"Download error: {e}")
+            return None
+
     async def download_video(self, video_id: str, title: str) -> Optional[str]:
         """Faster video download."""
         if not video_id or not title:
@@ -1,16 +1,24 @@
 import logging
 import asyncio
 import re
-import subprocess
 from pathlib import Path
 from pytubefix import YouTube
-import yt_dlp
 
 from app.bot.extensions.get_random_cookie import get_all_youtube_cookies
 from app.core.extensions.enums import CookieType
+from app.core.monitoring.metrics import YTDLP_ATTEMPTS, YTDLP_SUCCESSES
+from app.core.utils.cancellation import DownloadCancelled
+from app.core.utils.formats import MediaTooLargeError, fit_format
+from app.core.utils.hedging import Hedge
+from app.core.utils.media import has_valid_duration
+from app.core.utils.transcoder import TranscodeError, transcoder
+from app.core.utils.ytdlp_pool import job_token, ydl_for, ytdlp_pool
 
 logger = logging.getLogger(__name__)
 
+# pytubefix starts once yt-dlp is slower than it usually is
+_shorts_hedge = Hedge("shorts", initial_delay=15, min_delay=3)
+
 
 class _YtDlpSilentLogger:
     def debug(self, msg):
@@ -29,16 +37,26 @@ class YouTubeShortsController:
         self.save_dir.mkdir(parents=True, exist_ok=True)
 
     async def download_video(self, url: str) -> str:
+        normalized_url = self._normalize_youtube_url(url)
+
+        async def with_ytdlp() -> str:
+            video_path = await ytdlp_pool.run(self._download_with_ytdlp, normalized_url)
+            YTDLP_SUCCESSES.inc(platform="shorts")
+            return video_path
+
         try:
-            normalized_url = self._normalize_youtube_url(url)
-            return await asyncio.to_thread(self._download_with_ytdlp, normalized_url)
-        except Exception as ytdlp_error:
-            logger.warning("yt-dlp failed for Shorts, falling back to pytubefix")
-            try:
-                return await asyncio.to_thread(self._download_with_pytubefix, url)
-            except Exception:
-                logger.exception(f"YouTube Shorts yuklab olishda xatolik: {url}")
-                raise ytdlp_error
+            video_path = await _shorts_hedge.run(
+                with_ytdlp,
+                lambda: ytdlp_pool.run(self._download_with_pytubefix, url),
+                # every format is over the limit, pytubefix would not do better
+                fatal=(MediaTooLargeError,),
+            )
+        except MediaTooLargeError:
+            raise
+        except Exception:
+            logger.exception(f"YouTube Shorts yuklab olishda xatolik: {url}")
+            raise
+        return str(await self._prepare_telegram_video(Path(video_path)))
 
     @staticmethod
     def _normalize_youtube_url(url: str) -> str:
@@ -96,38 +114,44 @@ class YouTubeShortsController:
                     if cookie_file:
                         ydl_opts["cookiefile"] = cookie_file
 
+                    YTDLP_ATTEMPTS.inc(platform="shorts")
                     try:
-                        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                            info = ydl.extract_info(url, download=True)
-                            if not info:
-                                raise ValueError("yt-dlp video ma'lumotlarini topa olmadi")
-
-                            video_id = info.get("id")
-                            prepared = Path(ydl.prepare_filename(info))
-                            candidates = [prepared, prepared.with_suffix(".mp4")]
-                            if video_id:
-                                candidates.extend(
-                                    self.save_dir / f"{video_id}.{ext}"
-                                    for ext in ("mp4", "webm", "mkv", "mov")
-                                )
-
-                            for candidate in candidates:
-                                if candidate.exists() and candidate.stat().st_size > 1024:
-                                    return str(self._prepare_telegram_video(candidate))
-
-                            if video_id:
-                                for candidate in sorted(
-                                    self.save_dir.glob(f"{video_id}.*"),
-                                    key=lambda p: p.stat().st_mtime,
-                                    reverse=True,
+                        ydl = ydl_for(ydl_opts)
+                        ydl.format_selector = fit_format(
+                            ydl, format_selector, max_height=1080
+                        )
+                        info = ydl.extract_info(url, download=True)
+                        if not info:
+                            raise ValueError("yt-dlp video ma'lumotlarini topa olmadi")
+
+                        video_id = info.get("id")
+                        prepared = Path(ydl.prepare_filename(info))
+                        candidates = [prepared, prepared.with_suffix(".mp4")]
+                        if video_id:
+                            candidates.extend(
+                                self.save_dir / f"{video_id}.{ext}"
+                                for ext in ("mp4", "webm", "mkv", "mov")
+                            )
+
+                        for candidate in candidates:
+                            if candidate.exists() and candidate.stat().st_size > 1024:
+                                return str(candidate)
+
+                        if video_id:
+                            for candidate in sorted(
+                                self.save_dir.glob(f"{video_id}.*"),
+                                key=lambda p: p.stat().st_mtime,
+                                reverse=True,
+                            ):
+                                if (
+                                    candidate.exists()
+                                    and candidate.stat().st_size > 1024
                                 ):
-                                    if (
-                                        candidate.exists()
-                                        and candidate.stat().st_size > 1024
-                                    ):
-                                        return str(self._prepare_telegram_video(candidate))
+                                    return str(candidate)
 
-                            raise ValueError("Downloaded shorts file not found")
+                        raise ValueError("Downloaded shorts file not found")
+                    except (MediaTooLargeError, DownloadCancelled):
+                        raise
                     except Exception as err:
                         last_error = err
                         error_text = str(err).lower()
@@ -149,9 +173,12 @@ class YouTubeShortsController:
             {"client": "IOS"},
         ]
         last_err = None
+        token = job_token()
         for client_opts in clients_to_try:
             try:
-                yt = YouTube(url, **client_opts)
+                yt = YouTube(
+                    url, on_progress_callback=token.pytube_progress, **client_opts
+                )
                 stream = (
                     yt.streams.filter(progressive=True, file_extension="mp4")
                     .order_by("resolution")
@@ -168,21 +195,25 @@ class YouTubeShortsController:
                 if not stream:
                     continue
 
-                filename = f"{yt.video_id}.mp4"
+                # not "{id}.mp4": yt-dlp may be writing that one at the same time
+                filename = f"pytubefix_{yt.video_id}.mp4"
                 filepath = self.save_dir / filename
 
                 if filepath.exists() and filepath.stat().st_size > 1024:
-                    if not self._has_valid_duration(filepath):
+                    if not has_valid_duration(filepath):
                         try:
                             filepath.unlink(missing_ok=True)
                         except Exception:
                             pass
                     else:
-                        return str(self._prepare_telegram_video(filepath))
+                        return str(filepath)
 
+                token.track(filepath)
                 stream.download(output_path=str(self.save_dir), filename=filename)
                 if filepath.exists() and filepath.stat().st_size > 1024:
-                    return str(self._prepare_telegram_video(filepath))
+                    return str(filepath)
+            except DownloadCancelled:
+                raise
             except Exception as e:
                 last_err = e
                 logger.warning(f"pytubefix {client_opts} failed: {e}")
@@ -190,84 +221,30 @@ class YouTubeShortsController:
 
         raise last_err or ValueError("Yuklab olinadigan video topilmadi")
 
-    @staticmethod
-    def _has_valid_duration(video_path: Path) -> bool:
-        try:
-            result = subprocess.run(
-                [
-                    "ffprobe",
-                    "-v",
-                    "error",
-                    "-show_entries",
-                    "format=duration",
-                    "-of",
-                    "default=noprint_wrappers=1:nokey=1",
-                    str(video_path),
-                ],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            if result.returncode != 0:
-                return False
-            duration = float((result.stdout or "0").strip() or "0")
-            return duration > 0.1
-        except Exception:
-            return False
+    async def _prepare_telegram_video(self, source_path: Path) -> Path:
+        info = await transcoder.probe(source_path)
+        if info is None or info.duration <= 0.1:
+            raise ValueError("Downloaded shorts file has invalid duration")
 
-    def _prepare_telegram_video(self, source_path: Path) -> Path:
         if source_path.suffix.lower() == ".mp4" and source_path.stem.endswith("_tg"):
-            if self._has_valid_duration(source_path):
-                return source_path
-
-        if not self._has_valid_duration(source_path):
-            raise ValueError("Downloaded shorts file has invalid duration")
+            return source_path
 
         target_path = source_path.with_name(f"{source_path.stem}_tg.mp4")
         if target_path.exists() and target_path.stat().st_size > 1024:
-            if self._has_valid_duration(target_path):
+            if await asyncio.to_thread(has_valid_duration, target_path):
                 return target_path
 
-        cmd = [
-            "ffmpeg",
-            "-hide_banner",
-            "-loglevel",
-            "error",
-            "-y",
-            "-i",
-            str(source_path),
-            "-map",
-            "0:v:0",
-            "-map",
-            "0:a?",
-            "-c:v",
-            "libx264",
-            "-preset",
-            "veryfast",
-            "-crf",
-            "23",
-            "-pix_fmt",
-            "yuv420p",
-            "-movflags",
-            "+faststart",
-            "-c:a",
-            "aac",
-            "-b:a",
-            "128k",
-            str(target_path),
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
-
-        if (
-            result.returncode == 0
-            and target_path.exists()
-            and target_path.stat().st_size > 1024
-            and self._has_valid_duration(target_path)
-        ):
-            return target_path
-
-        # Fallback to source if conversion is not needed and source is still valid
-        if self._has_valid_duration(source_path):
-            return source_path
+        # already H.264/AAC sources only get their moov atom moved up front
+        try:
+            await transcoder.to_telegram(
+                source_path, target_path, info=info, platform="shorts"
+            )
+            if target_path.stat().st_size > 1024 and await asyncio.to_thread(
+                has_valid_duration, target_path
+            ):
+                return target_path
+        except TranscodeError as e:
+            logger.warning(f"Shorts conversion failed, sending the source as is: {e}")
 
-        raise ValueError("Telegram-friendly Shorts video yaratib bo'lmadi")
+        # Fallback to source, it was probed as valid above
+        return source_path
@@ -1,7 +1,7 @@
+import asyncio
 import time
 import base64
 import logging
-import requests
 from pathlib import Path
 from uuid import uuid4
 from selenium import webdriver
@@ -9,6 +9,9 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 
+from app.core.utils.cancellation import close_in_background
+from app.core.utils.downloader import download_file
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,36 +28,34 @@ class SnapchatController:
             service=Service("/usr/bin/chromedriver"), options=chrome_options
         )
 
-    def download_snapchat_video(self, url: str, save_dir: Path) -> str | None:
+    def _find_video_url(self, url: str) -> str | None:
         try:
             self.driver.get(url)
             time.sleep(5)
 
             video_element = self.driver.find_element(By.TAG_NAME, "video")
-            video_url = video_element.get_attribute("src")
+            return video_element.get_attribute("src")
+        finally:
+            self.driver.quit()
+
+    async def download_snapchat_video(self, url: str, save_dir: Path) -> str | None:
+        try:
+            try:
+                video_url = await asyncio.to_thread(self._find_video_url, url)
+            except asyncio.CancelledError:
+                # ends the page load the thread is blocked in
+                close_in_background(self.driver.quit)
+                raise
 
             if not video_url:
                 logger.error("❌ No video URL found.")
                 return None
 
-            response = requests.get(video_url, stream=True)
-            if response.status_code != 200:
-                logger.error("❌ Failed to fetch video content.")
-                return None
-
-            filename = f"{uuid4().hex}.mp4"
-            file_path = save_dir / filename
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(file_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            file_path = save_dir / f"{uuid4().hex}.mp4"
+            await download_file(video_url, file_path)
 
             return str(file_path)
 
         except Exception as e:
             logger.error(f"Snapchat download error: {e}")
             return None
-        finally:
-            self.driver.quit()
@@ -1,5 +1,5 @@
+import asyncio
 import os
-import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -13,6 +13,9 @@ from pathlib import Path
 from typing import List, Tuple, Optional
 import logging
 
+from app.core.utils.cancellation import close_in_background
+from app.core.utils.downloader import download_file
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,13 +61,7 @@ class ThreadsController:
                 "Connection": "keep-alive",
                 "Upgrade-Insecure-Requests": "1",
             }
-            response = requests.get(url, headers=headers, stream=True, timeout=30)
-            response.raise_for_status()
-
-            filepath = self.download_path / filename
-            with open(filepath, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            await download_file(url, self.download_path / filename, headers=headers)
 
             logger.info(f"✓ Yuklandi: {filename}")
             return True
@@ -74,6 +71,16 @@ class ThreadsController:
 
     async def get_post_media(self, thread_url: str) -> List[Tuple[str, str]]:
         """Faqat asosiy post medialarini olish"""
+        try:
+            return await asyncio.to_thread(self._find_post_media, thread_url)
+        except asyncio.CancelledError:
+            # ends the page load the thread is blocked in, close() skips it
+            driver, self.driver = self.driver, None
+            if driver:
+                close_in_background(driver.quit)
+            raise
+
+    def _find_post_media(self, thread_url: str) -> List[Tuple[str, str]]:
         try:
             logger.info("Sahifa yuklanmoqda...")
             self.driver.get(thread_url)
@@ -6,6 +6,9 @@ import time
 from app.bot.extensions.get_random_cookie import get_random_cookie_for_instagram
 from app.core.extensions.enums import CookieType
 from app.core.extensions.utils import WORKDIR
+from app.core.monitoring.metrics import YTDLP_ATTEMPTS, YTDLP_SUCCESSES
+from app.core.utils.cancellation import CancelToken
+from app.core.utils.formats import fit_format
 
 
 class TikTokDownloader:
@@ -30,7 +33,13 @@ class TikTokDownloader:
             return f"{custom_name}.mp4"
         return f"tiktok_{self._extract_video_id(url)}.mp4"
 
-    def download_video(self, url, save_path: str, filename: str = None) -> str | None:
+    def download_video(
+        self,
+        url,
+        save_path: str,
+        filename: str = None,
+        cancel: CancelToken | None = None,
+    ) -> str | None:
         os.makedirs(save_path, exist_ok=True)
         output_path = os.path.join(save_path, self._generate_filename(url, filename))
 
@@ -43,13 +52,20 @@ class TikTokDownloader:
             "cookiefile": get_random_cookie_for_instagram(CookieType.TIKTOK.value),
             "verbose": True,  # Debug loglar uchun
         }
+        if cancel:
+            ydl_opts["progress_hooks"] = [cancel.progress_hook]
 
         try:
             print(f"📥 Downloading TikTok video: {url}")
             print(f"📁 Output path: {output_path}")
+            YTDLP_ATTEMPTS.inc(platform="tiktok")
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                ydl.format_selector = fit_format(ydl, ydl_opts["format"])
                 ydl.download([url])
-            return output_path if os.path.exists(output_path) else None
+            if not os.path.exists(output_path):
+                return None
+            YTDLP_SUCCESSES.inc(platform="tiktok")
+            return output_path
         except Exception as e:
             print(f"❌ TikTok download error: {e}")
             return None
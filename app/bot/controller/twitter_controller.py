@@ -4,6 +4,7 @@ import json
 import logging
 from pathlib import Path
 from app.core.settings.config import Settings, get_settings
+from app.core.utils.downloader import DownloadError, download_file
 
 logger = logging.getLogger(__name__)
 settings: Settings = get_settings()
@@ -62,7 +63,7 @@ class TwitterController:
                             logger.info(f"Eng yaxshi video URL: {video_url}")
 
                             filename = self.save_dir / f"video_{tweet_id}_{i + 1}.mp4"
-                            success = self._download_video_safe(video_url, filename)
+                            success = await self._download_video_safe(video_url, filename)
                             if success:
                                 download_paths.append(
                                     {"type": "video", "path": str(filename)}
@@ -84,7 +85,7 @@ class TwitterController:
                         logger.info(f"Eng yaxshi video URL: {video_url}")
 
                         filename = self.save_dir / f"video_{tweet_id}.mp4"
-                        success = self._download_video_safe(video_url, filename)
+                        success = await self._download_video_safe(video_url, filename)
                         if success:
                             download_paths.append(
                                 {"type": "video", "path": str(filename)}
@@ -97,7 +98,7 @@ class TwitterController:
 
                     if video_info["valid"]:
                         filename = self.save_dir / f"video_{tweet_id}.mp4"
-                        success = self._download_video_safe(video_data, filename)
+                        success = await self._download_video_safe(video_data, filename)
                         if success:
                             download_paths.append(
                                 {"type": "video", "path": str(filename)}
@@ -180,53 +181,33 @@ class TwitterController:
             logger.error(f"Video URL tekshirishda xatolik: {e}")
             return {"valid": False, "error": str(e)}
 
-    def _download_video_safe(self, video_url: str, filename: Path) -> bool:
+    async def _download_video_safe(self, video_url: str, filename: Path) -> bool:
         """Video faylini xavfsiz yuklab olish"""
         try:
             logger.info(f"Video yuklab olish boshlandi: {video_url}")
+            # video bo'lmagan javob yuklab olinmasdan rad etiladi
+            result = await download_file(
+                video_url,
+                filename,
+                timeout=300,
+                expect_type=None if video_url.endswith(".mp4") else "video",
+            )
+            logger.info(f"Content-Type: {result.content_type}")
+            logger.info(f"Yuklangan fayl o'lchami: {result.size} bytes")
 
-            with requests.get(video_url, stream=True, timeout=60) as response:
-                response.raise_for_status()
-
-                content_type = response.headers.get("content-type", "")
-                logger.info(f"Content-Type: {content_type}")
-
-                # Video formatini tekshirish
-                if "video" not in content_type.lower() and not video_url.endswith(
-                    ".mp4"
-                ):
-                    logger.warning(f"Bu video fayl emas: {content_type}")
-                    return False
-
-                total_size = int(response.headers.get("content-length", 0))
-                logger.info(f"Fayl o'lchami: {total_size} bytes")
-
-                # Fayl yuklab olish
-                with open(filename, "wb") as f:
-                    downloaded = 0
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded += len(chunk)
-
-                file_size = filename.stat().st_size
-                logger.info(f"Yuklangan fayl o'lchami: {file_size} bytes")
-
-                # Fayl o'lchamini tekshirish
-                if file_size == 0:
-                    logger.error("Fayl bo'sh!")
-                    filename.unlink(missing_ok=True)
-                    return False
+            # Fayl o'lchamini tekshirish
+            if result.size == 0:
+                logger.error("Fayl bo'sh!")
+                filename.unlink(missing_ok=True)
+                return False
 
-                # Minimum o'lcham tekshirish (1KB)
-                if file_size < 1024:
-                    logger.warning(f"Fayl juda kichik: {file_size} bytes")
+            # Minimum o'lcham tekshirish (1KB)
+            if result.size < 1024:
+                logger.warning(f"Fayl juda kichik: {result.size} bytes")
 
-                logger.info(f"Video muvaffaqiyatli yuklandi: {filename}")
-                return True
+            logger.info(f"Video muvaffaqiyatli yuklandi: {filename}")
+            return True
 
-        except Exception as e:
+        except DownloadError as e:
             logger.error(f"Video yuklab olishda xatolik: {e}")
-            if filename.exists():
-                filename.unlink(missing_ok=True)
             return False
@@ -0,0 +1,35 @@
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from aiogram.types import FSInputFile, InputMediaVideo
+
+# send_media_group takes 2-10 items
+ALBUM_SIZE = 10
+
+
+async def send_video_parts(
+    parts: list[Path],
+    send_video: Callable[..., Awaitable],
+    send_media_group: Callable[..., Awaitable],
+    caption: str | None = None,
+) -> None:
+    """
+    Sends the parts of a split video as consecutive albums of up to
+    ``ALBUM_SIZE``; a lone leftover part goes out with ``send_video``. The
+    ``caption`` is put on the first message only.
+    """
+    for start in range(0, len(parts), ALBUM_SIZE):
+        album = parts[start : start + ALBUM_SIZE]
+        if len(album) == 1:
+            await send_video(video=FSInputFile(str(album[0])), caption=caption)
+        else:
+            await send_media_group(
+                media=[
+                    InputMediaVideo(
+                        media=FSInputFile(str(part)),
+                        caption=caption if i == 0 else None,
+                    )
+                    for i, part in enumerate(album)
+                ]
+            )
+        caption = None
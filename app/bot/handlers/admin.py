@@ -1,10 +1,10 @@
 import asyncio
-from aiogram.types import ContentType
 from aiogram import Bot
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 from sqlalchemy import func, desc
-from app.bot.models import User
-from app.bot.keyboards.admin_keyboards import get_admin_panel_keyboard
+from app.bot.models import UsageDaily, User
+from app.bot.handlers.statistics_handler import statistics_aggregator
+from app.bot.controller.broadcast_controller import start_broadcast
 from app.bot.models import AdminRequirements
 from app.core.databases.postgres import get_general_session
 from sqlalchemy.future import select
@@ -54,66 +54,48 @@ async def update_premium_price(new_value: float) -> None:
 
 
 async def get_last_7_days_statistics() -> dict:
-    now = datetime.now()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    yesterday_start = today_start - timedelta(days=1)
-    week_start = now - timedelta(days=7)
-    month_start = now - timedelta(days=30)
-    year_start = now - timedelta(days=365)
+    await statistics_aggregator.flush()
+    today = date.today()
+
+    def signups_between(first_day: date | None = None, last_day: date | None = None):
+        conds = []
+        if first_day is not None:
+            conds.append(UsageDaily.day >= first_day)
+        if last_day is not None:
+            conds.append(UsageDaily.day <= last_day)
+        total = func.sum(UsageDaily.count)
+        if conds:
+            total = total.filter(*conds)
+        return func.coalesce(total, 0)
 
     async with get_general_session() as session:
-
-        def count_where(*conds):
-            q = (
-                select(func.count()).select_from(User).where(*conds)
-                if conds
-                else select(func.count()).select_from(User)
-            )
-            return session.execute(q)
-
-        today_res = await count_where(User.created_at >= today_start)
-        yesterday_res = await count_where(
-            User.created_at >= yesterday_start, User.created_at < today_start
-        )
-        week_res = await count_where(User.created_at >= week_start)
-        month_res = await count_where(User.created_at >= month_start)
-        year_res = await count_where(User.created_at >= year_start)
-        all_res = await count_where()
-
-        today = today_res.scalar_one()
-        yesterday = yesterday_res.scalar_one()
-        last_week = week_res.scalar_one()
-        last_month = month_res.scalar_one()
-        last_year = year_res.scalar_one()
-        all_time = all_res.scalar_one()
+        growth_q = select(
+            signups_between(today),
+            signups_between(today - timedelta(days=1), today - timedelta(days=1)),
+            signups_between(today - timedelta(days=7)),
+            signups_between(today - timedelta(days=30)),
+            signups_between(today - timedelta(days=365)),
+            signups_between(),
+        ).where(UsageDaily.platform == "bot", UsageDaily.event == "signup")
+        today_count, yesterday, last_week, last_month, last_year, all_time = (
+            await session.execute(growth_q)
+        ).one()
 
         ref_q = (
-            select(User.referred_by, func.count(User.id).label("ref_count"))
-            .where(User.referred_by != None)
-            .group_by(User.referred_by)
-            .order_by(desc("ref_count"))
+            select(User.tg_id, User.first_name, User.last_name, User.referral_count)
+            .where(User.referral_count > 0)
+            .order_by(desc(User.referral_count))
             .limit(10)
         )
         ref_rows = (await session.execute(ref_q)).all()
-        ref_ids = [row[0] for row in ref_rows]
-
-        # fetch names in one go
-        if ref_ids:
-            users_q = select(User.tg_id, User.first_name, User.last_name).where(
-                User.tg_id.in_(ref_ids)
-            )
-            users = (await session.execute(users_q)).all()
-            name_map = {tg: f"{fn} {ln or ''}".strip() for tg, fn, ln in users}
-        else:
-            name_map = {}
 
         top_referrers = [
-            {"tg_id": tg, "name": name_map.get(tg, str(tg)), "count": cnt}
-            for tg, cnt in ref_rows
+            {"tg_id": tg, "name": f"{fn} {ln or ''}".strip(), "count": cnt}
+            for tg, fn, ln, cnt in ref_rows
         ]
 
     return {
-        "today": today,
+        "today": today_count,
         "yesterday": yesterday,
         "last_week": last_week,
         "last_month": last_month,
@@ -128,42 +110,5 @@ bot = Bot(settings.BOT_TOKEN)
 
 async def run_broadcast(text: str, media: tuple[str, str] | None, admin_id: int):
     await asyncio.sleep(1)  # allow handler to return
-    batch = 1000
-
-    async with get_general_session() as session:
-        total = (await session.execute(select(User))).scalars().all()
-        total_count = len(total)
-
-    for offset in range(0, total_count, batch):
-        async with get_general_session() as session:
-            uids = (
-                (await session.execute(select(User.tg_id).offset(offset).limit(batch)))
-                .scalars()
-                .all()
-            )
-
-        for uid in uids:
-            try:
-                if media:
-                    ctype, fid = media
-                    if ctype == ContentType.PHOTO:
-                        await bot.send_photo(
-                            uid, photo=fid, caption=text, parse_mode="HTML"
-                        )
-                    elif ctype == ContentType.VIDEO:
-                        await bot.send_video(
-                            uid, video=fid, caption=text, parse_mode="HTML"
-                        )
-                    else:
-                        await bot.send_document(
-                            uid, document=fid, caption=text, parse_mode="HTML"
-                        )
-                else:
-                    await bot.send_message(uid, text, parse_mode="HTML")
-            except:
-                pass
-            await asyncio.sleep(0.05)
-
-    await bot.send_message(
-        admin_id, "📬 Broadcast complete!", reply_markup=get_admin_panel_keyboard()
-    )
+    task = await start_broadcast(bot, admin_id=admin_id, text=text, media=media)
+    await task
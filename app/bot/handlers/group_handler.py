@@ -1,7 +1,9 @@
+import asyncio
 import logging
 import time
+from functools import partial
 from pathlib import Path
-from aiogram import Router, F
+from aiogram import Bot, Router, F
 from aiogram.types import (
     Message,
     FSInputFile,
@@ -14,6 +16,7 @@ from aiogram.filters import Command, CommandStart
 from aiogram.utils.i18n import gettext as _
 
 from app.bot.controller.group_controller import GroupController
+from app.bot.extensions.albums import send_video_parts
 from app.bot.extensions.clear import atomic_clear
 from app.bot.handlers.statistics_handler import update_statistics
 from app.bot.handlers.tiktok_handler import extract_audio_from_tiktok_video_smart
@@ -24,16 +27,34 @@ from app.bot.routers.music_router import (
     create_keyboard,
     _cache,
 )
-from app.bot.keyboards.general_buttons import get_music_download_button
+from app.bot.keyboards.general_buttons import (
+    get_cancel_download_button,
+    get_music_download_button,
+)
+from app.bot.handlers.job_handler import (
+    cancel_job,
+    enqueue_download,
+    enqueue_job,
+    get_job,
+    refund_job_quota,
+)
+from app.core.extensions.enums import JobKind
+from app.bot.state.active_downloads import active_downloads
+from app.bot.state.session_store import session_store
+from app.core.settings.config import get_settings
+from app.core.utils.formats import MediaTooLargeError, upload_limit
+from app.core.utils.oversize import fit_to_limit
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 # Group router
 group_router = Router()
 group_controller = GroupController()
 
 # User sessions for music download
-user_sessions = {}
+user_sessions = session_store.namespace("group")
+MAX_SESSION_DOWNLOADS = 10
 
 
 # Guruh commandlari uchun alohida filterlar
@@ -116,20 +137,28 @@ async def handle_group_message(message: Message):
     if not urls:
         return
 
+    # Navbat yoqilgan bo'lsa, yuklashni worker bajaradi
+    if settings.USE_JOB_QUEUE:
+        await enqueue_download(message, urls)
+        return
+
     # Processing xabar yuborish
+    job_id = active_downloads.new_id()
     processing_msg = await message.reply(
-        "🔄 Media yuklab olinmoqda...",
-        reply_markup=InlineKeyboardMarkup(
-            inline_keyboard=[
-                [
-                    InlineKeyboardButton(
-                        text="❌ Bekor qilish", callback_data="cancel_download"
-                    )
-                ]
-            ]
-        ),
+        "🔄 Media yuklab olinmoqda...", reply_markup=get_cancel_download_button(job_id)
+    )
+    await active_downloads.run(
+        job_id,
+        message.from_user.id,
+        _download_and_send(message, urls, processing_msg),
     )
 
+
+async def _download_and_send(
+    message: Message, urls: list[str], processing_msg: Message
+):
+    """Linklarni yuklab olish va natijani yuborish"""
+    downloads = []
     try:
         downloaded_files = []
         failed_urls = []
@@ -140,13 +169,8 @@ async def handle_group_message(message: Message):
 
                 if result["success"] and result["files"]:
                     downloaded_files.extend(result["files"])
-                    # URL va platformani session'da saqlash
-                    user_id = message.from_user.id
-                    if user_id not in user_sessions:
-                        user_sessions[user_id] = []
-
                     platform = group_controller.detect_platform(url)
-                    user_sessions[user_id].append(
+                    downloads.append(
                         {
                             "url": url,
                             "platform": platform.value if platform else "unknown",
@@ -160,15 +184,19 @@ async def handle_group_message(message: Message):
                 logger.error(f"Download error for {url}: {e}")
                 failed_urls.append((url, f"Xatolik: {str(e)}"))
 
-        # Processing xabarini o'chirish
-        try:
-            await processing_msg.delete()
-        except:
-            pass
-
         # Natijalarni yuborish
         if downloaded_files:
+            # bekor qilish tugmasi fayllar yuborilguncha turadi
             await _send_media_files(message, downloaded_files)
+            await _delete_message(processing_msg)
+
+            # URL va platformani session'da saqlash
+            user_id = message.from_user.id
+            session = await user_sessions.get(user_id) or {}
+            stored = session.get("downloads", []) + downloads
+            await user_sessions.set(
+                user_id, {"downloads": stored[-MAX_SESSION_DOWNLOADS:]}
+            )
 
             # Muvaffaqiyat xabari music download tugmasi bilan
             success_text = f"✅ {len(downloaded_files)} ta fayl yuklandi"
@@ -191,6 +219,8 @@ async def handle_group_message(message: Message):
             await message.reply(success_text, reply_markup=keyboard)
 
         elif failed_urls:
+            await _delete_message(processing_msg)
+
             # Faqat xatolar bo'lsa
             error_text = "❌ Hech qanday media yuklanmadi:\n\n"
             for url, error in failed_urls:
@@ -206,6 +236,10 @@ async def handle_group_message(message: Message):
         except:
             pass
 
+    except asyncio.CancelledError:
+        # Bekor qilindi: hech narsa yuborilmaydi, fayllar o'chiriladi
+        remove_files(f for download in downloads for f in download["files"])
+        raise
     except Exception as e:
         logger.error(f"Group handler error: {e}")
         try:
@@ -216,9 +250,43 @@ async def handle_group_message(message: Message):
             pass
 
 
-@group_router.callback_query(F.data == "cancel_download")
-async def cancel_download(callback):
+async def _delete_message(message: Message) -> None:
+    try:
+        await message.delete()
+    except:
+        pass
+
+
+@group_router.callback_query(F.data.startswith("cancel_download"))
+async def cancel_download(callback: CallbackQuery):
     """Yuklab olishni bekor qilish"""
+    _, _, job_id = callback.data.partition(":")
+
+    if settings.USE_JOB_QUEUE:
+        job = await get_job(int(job_id)) if job_id.isdigit() else None
+        owner = job.payload.get("user_id") if job else None
+    else:
+        owner = active_downloads.owner(job_id)
+
+    if owner is None:
+        await callback.answer("Yuklab olish allaqachon tugagan")
+        return
+    if callback.from_user.id != owner:
+        await callback.answer(
+            "❌ Faqat xabar yuborgan foydalanuvchi bekor qila oladi", show_alert=True
+        )
+        return
+
+    if settings.USE_JOB_QUEUE:
+        cancelled = await cancel_job(int(job_id))
+        if cancelled:
+            await refund_job_quota(job)
+    else:
+        cancelled = active_downloads.cancel(job_id)
+    if not cancelled:
+        await callback.answer("Yuklab olish allaqachon tugagan")
+        return
+
     try:
         await callback.message.edit_text("❌ Yuklab olish bekor qilindi")
         await callback.answer()
@@ -244,7 +312,8 @@ async def handle_group_music_callback(callback_query: CallbackQuery):
 
     await callback_query.answer("🎵 Musiqa ajratib olinmoqda...")
 
-    session = user_sessions.get(user_id)
+    session = await user_sessions.get(user_id)
+    session = session["downloads"] if session else None
     if not session:
         await callback_query.message.reply("❌ Session tugadi. Qaytadan link yuboring.")
         return
@@ -330,7 +399,7 @@ async def handle_group_music_callback(callback_query: CallbackQuery):
                 logger.error(f"Failed to clear audio file: {e}")
 
         # Session'ni tozalash
-        user_sessions.pop(user_id, None)
+        await user_sessions.pop(user_id)
 
         # Video fayllarni tozalash (music extraction dan keyin)
         if session:
@@ -346,6 +415,44 @@ async def handle_group_music_callback(callback_query: CallbackQuery):
                 logger.error(f"Failed to clean video files: {e}")
 
 
+@group_router.callback_query(F.data.startswith("group_music_job:"))
+async def handle_group_music_job_callback(callback_query: CallbackQuery):
+    """Navbat rejimida: musiqa tanib olishni worker'ga topshirish"""
+    try:
+        _, job_id, user_id = callback_query.data.split(":")
+        job_id, user_id = int(job_id), int(user_id)
+    except ValueError:
+        await callback_query.answer("❌ Noto'g'ri callback data")
+        return
+
+    if callback_query.from_user.id != user_id:
+        await callback_query.answer(
+            "❌ Faqat xabar yuborgan foydalanuvchi music yuklay oladi", show_alert=True
+        )
+        return
+
+    job = await get_job(job_id)
+    downloads = (job.result or {}).get("downloads") if job else None
+    if not downloads:
+        await callback_query.answer(
+            "❌ Session tugadi. Qaytadan link yuboring.", show_alert=True
+        )
+        return
+
+    last_download = downloads[-1]
+    await enqueue_job(
+        JobKind.RECOGNIZE,
+        {
+            "chat_id": callback_query.message.chat.id,
+            "message_id": callback_query.message.message_id,
+            "url": last_download["url"],
+            "platform": last_download["platform"],
+            "files": last_download["files"],
+        },
+    )
+    await callback_query.answer("🎵 Musiqa ajratib olinmoqda...")
+
+
 async def extract_audio_for_platform(platform: str, url: str, files: list) -> str:
     """Platform bo'yicha audio ajratish"""
 
@@ -398,7 +505,7 @@ async def extract_audio_for_platform(platform: str, url: str, files: list) -> st
                 )
                 from app.core.utils.audio import extract_audio_from_video
 
-                return extract_audio_from_video(video_path)
+                return await extract_audio_from_video(video_path)
             else:
                 logger.warning(f"No video file found for {platform}")
                 return None
@@ -423,10 +530,25 @@ def get_video_file_path(files: list) -> str:
     return None
 
 
+def remove_files(files) -> None:
+    """Yuborilmaydigan fayllarni o'chirish"""
+    for file_info in files:
+        try:
+            Path(file_info["path"]).unlink(missing_ok=True)
+        except Exception as e:
+            logger.error(f"Failed to delete file {file_info['path']}: {e}")
+
+
 # group_handler.py dagi _send_media_files funksiyasini ham yangilash kerak:
 async def _send_media_files(message: Message, files: list):
     """Media fayllarni yuborish - yangilangan versiya"""
-    MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+    await send_media_files(message.bot, message.chat.id, message.message_id, files)
+
+
+async def send_media_files(bot: Bot, chat_id: int, reply_to: int, files: list):
+    """Media fayllarni chatga reply qilib yuborish (worker ham ishlatadi)"""
+    max_file_size = upload_limit()
+    via = f"🔗 Via @{bot.username if hasattr(bot, 'username') else ''}"
 
     for file_info in files:
         try:
@@ -437,27 +559,41 @@ async def _send_media_files(message: Message, files: list):
                 continue
 
             # Fayl hajmini tekshirish
-            if file_path.stat().st_size > MAX_FILE_SIZE:
-                await message.reply(f"❌ Fayl juda katta: {file_path.name}")
+            if file_path.stat().st_size > max_file_size:
+                if file_info["type"] == "video" and await _send_oversized_video(
+                    bot, chat_id, reply_to, file_path, file_info, via
+                ):
+                    continue
+                await bot.send_message(
+                    chat_id,
+                    f"❌ Fayl juda katta: {file_path.name}",
+                    reply_to_message_id=reply_to,
+                )
                 continue
 
             file_input = FSInputFile(str(file_path))
 
             # Media turini aniqlash va yuborish
             if file_info["type"] == "video":
-                await message.reply_video(
+                await bot.send_video(
+                    chat_id,
                     video=file_input,
-                    caption=f"📹 Video\n🔗 Via @{message.bot.username if hasattr(message.bot, 'username') else ''}",
+                    caption=f"📹 Video\n{via}",
+                    reply_to_message_id=reply_to,
                 )
             elif file_info["type"] == "image":
-                await message.reply_photo(
+                await bot.send_photo(
+                    chat_id,
                     photo=file_input,
-                    caption=f"🖼 Rasm\n🔗 Via @{message.bot.username if hasattr(message.bot, 'username') else ''}",
+                    caption=f"🖼 Rasm\n{via}",
+                    reply_to_message_id=reply_to,
                 )
             else:
-                await message.reply_document(
+                await bot.send_document(
+                    chat_id,
                     document=file_input,
-                    caption=f"📄 Media\n🔗 Via @{message.bot.username if hasattr(message.bot, 'username') else ''}",
+                    caption=f"📄 Media\n{via}",
+                    reply_to_message_id=reply_to,
                 )
 
             # MUHIM: Video fayllarni hozircha o'chirmang (music extraction uchun kerak)
@@ -476,6 +612,34 @@ async def _send_media_files(message: Message, files: list):
             continue
 
 
+async def _send_oversized_video(
+    bot: Bot, chat_id: int, reply_to: int, file_path: Path, file_info: dict, via: str
+) -> bool:
+    """Katta videoni siqib yoki qismlarga bo'lib yuborish"""
+    try:
+        parts = await fit_to_limit(file_path, file_info.get("platform", "group"))
+    except MediaTooLargeError:
+        return False
+
+    if len(parts) > 1:
+        caption = f"📹 Video ({len(parts)} qism)\n{via}"
+    else:
+        caption = f"📹 Video\n{via}"
+    try:
+        await send_video_parts(
+            parts,
+            partial(bot.send_video, chat_id, reply_to_message_id=reply_to),
+            partial(bot.send_media_group, chat_id, reply_to_message_id=reply_to),
+            caption,
+        )
+    finally:
+        # asl video music extraction uchun qoladi
+        for part in parts:
+            if part != file_path:
+                part.unlink(missing_ok=True)
+    return True
+
+
 async def _is_bot_mentioned(message: Message) -> bool:
     """Bot mention qilinganligini tekshirish"""
 
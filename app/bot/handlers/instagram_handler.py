@@ -9,6 +9,10 @@ from yt_dlp import YoutubeDL
 from app.bot.extensions.get_random_cookie import get_random_cookie_for_instagram
 from app.core.extensions.enums import CookieType
 from app.core.extensions.utils import WORKDIR, logger
+from app.core.monitoring.metrics import YTDLP_ATTEMPTS, YTDLP_SUCCESSES
+from app.core.utils.cancellation import CancelToken, run_cancellable
+from app.core.utils.formats import fit_format
+from app.core.utils.transcoder import transcoder
 
 
 async def download_instagram_video_only_mp4(url: str, target_folder=None) -> str:
@@ -36,14 +40,21 @@ async def download_instagram_video_only_mp4(url: str, target_folder=None) -> str
         },
     }
 
+    # stops the executor download when the caller times out or is cancelled
+    token = CancelToken()
+    ydl_opts["progress_hooks"] = [token.progress_hook]
+
     try:
+        YTDLP_ATTEMPTS.inc(platform="instagram")
         with YoutubeDL(ydl_opts) as ydl:
-            await asyncio.get_event_loop().run_in_executor(None, ydl.download, [url])
+            ydl.format_selector = fit_format(ydl, ydl_opts["format"])
+            await run_cancellable(ydl.download, [url], token=token)
 
         # Find the downloaded file
         for file in target_folder.glob(f"{filename}.*"):
             if file.suffix in [".mp4", ".webm", ".mkv", ".mov"]:
                 logger.info(f"Instagram video downloaded: {file}")
+                YTDLP_SUCCESSES.inc(platform="instagram")
                 return str(file)
 
         raise Exception("Downloaded file not found")
@@ -141,34 +152,10 @@ async def extract_audio_simple(video_path: str) -> str:
 async def extract_with_ffmpeg(video_path: str, audio_path: str) -> bool:
     """Extract audio using FFmpeg"""
     try:
-        command = [
-            "ffmpeg",
-            "-i",
-            video_path,
-            "-vn",
-            "-acodec",
-            "mp3",
-            "-ab",
-            "192k",
-            "-ar",
-            "44100",
-            "-y",
-            audio_path,
-        ]
-
-        process = await asyncio.create_subprocess_exec(
-            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
-
-        stdout, stderr = await process.communicate()
-
-        if process.returncode == 0 and Path(audio_path).exists():
-            return True
-
-        logger.warning(
-            f"FFmpeg failed: {stderr.decode() if stderr else 'Unknown error'}"
+        await transcoder.extract_audio(
+            video_path, audio_path, sample_rate=44100, platform="instagram"
         )
-        return False
+        return True
 
     except Exception as e:
         logger.warning(f"FFmpeg extraction failed: {e}")
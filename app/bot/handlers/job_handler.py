@@ -0,0 +1,258 @@
+from datetime import datetime, timedelta
+
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Message
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.future import select
+
+from app.bot.handlers.quota_handler import QuotaReservation, refund_quota
+from app.bot.keyboards.general_buttons import get_cancel_download_button
+from app.bot.models import Job
+from app.core.databases.postgres import get_general_session
+from app.core.extensions.enums import JobKind, JobStatus, QuotaSource
+from app.core.settings.config import get_settings
+
+settings = get_settings()
+
+MAX_BACKOFF = 600  # seconds
+# held by a worker
+_LOCKED = (JobStatus.RUNNING.value, JobStatus.SENDING.value)
+
+
+async def enqueue_job(
+    kind: JobKind, payload: dict, max_attempts: int | None = None
+) -> Job:
+    job = Job(
+        kind=kind.value,
+        payload=payload,
+        status=JobStatus.QUEUED.value,
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=datetime.now(),
+    )
+    async with get_general_session() as session:
+        session.add(job)
+        await session.commit()
+        return job
+
+
+async def enqueue_download(
+    message: Message,
+    urls: list[str],
+    statistics_field: str = "from_group",
+    quota: QuotaReservation | None = None,
+) -> Job:
+    """
+    Hands the links in ``message`` to a worker. The processing message gets
+    the job's cancel button; the worker sends the files and deletes it. The
+    request ``quota`` paid for is refunded if the job dies or is cancelled.
+    """
+    processing_msg = await message.reply("🔄 Media yuklab olinmoqda...")
+    payload = {
+        "chat_id": message.chat.id,
+        "message_id": message.message_id,
+        "user_id": message.from_user.id,
+        "urls": urls,
+        "processing_message_id": processing_msg.message_id,
+        "statistics_field": statistics_field,
+    }
+    if quota:
+        payload["quota"] = quota.source.value
+    job = await enqueue_job(JobKind.DOWNLOAD, payload)
+    try:
+        await processing_msg.edit_reply_markup(
+            reply_markup=get_cancel_download_button(job.id)
+        )
+    except TelegramAPIError:
+        # the worker was quicker and the message is gone
+        pass
+    return job
+
+
+async def refund_job_quota(job: Job) -> None:
+    """Gives back the request a dead or cancelled download was paid with."""
+    if job.payload.get("quota"):
+        await refund_quota(job.payload["user_id"], QuotaSource(job.payload["quota"]))
+
+
+async def get_job(job_id: int) -> Job | None:
+    async with get_general_session() as session:
+        result = await session.execute(select(Job).where(Job.id == job_id))
+        return result.scalar_one_or_none()
+
+
+async def claim_jobs(worker_id: str, limit: int) -> list[Job]:
+    """
+    Locks up to ``limit`` runnable jobs for ``worker_id``.
+
+    Queued jobs whose ``run_at`` has passed are claimed, as are running or
+    sending jobs whose lock expired because their worker died. ``SKIP
+    LOCKED`` lets any number of workers poll concurrently without handing
+    out the same job.
+    """
+    now = datetime.now()
+    runnable = (
+        select(Job.id)
+        .where(
+            or_(
+                and_(Job.status == JobStatus.QUEUED.value, Job.run_at <= now),
+                and_(Job.status.in_(_LOCKED), Job.locked_until < now),
+            )
+        )
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id.in_(runnable.scalar_subquery()))
+        .values(
+            status=JobStatus.RUNNING.value,
+            attempts=Job.attempts + 1,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT),
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    async with get_general_session() as session:
+        result = await session.execute(stmt)
+        jobs = list(result.scalars().all())
+        await session.commit()
+        return jobs
+
+
+async def extend_job_lock(job_id: int, worker_id: str) -> bool:
+    """Pushes the visibility timeout forward while a job is still running."""
+    async with get_general_session() as session:
+        result = await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id)
+            .values(
+                locked_until=datetime.now()
+                + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+async def start_delivery(job_id: int) -> bool:
+    """
+    Moves a running job to ``SENDING`` before its results go out, so a
+    cancel pressed from now on is turned down instead of refunding files
+    the user gets anyway. ``False`` when the job was cancelled first.
+    """
+    async with get_general_session() as session:
+        result = await session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.RUNNING.value)
+            .values(status=JobStatus.SENDING.value)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+async def complete_job(job_id: int, result: dict | None = None) -> None:
+    async with get_general_session() as session:
+        await session.execute(
+            update(Job)
+            # a job cancelled while it finished stays cancelled
+            .where(Job.id == job_id, Job.status.in_(_LOCKED))
+            .values(
+                status=JobStatus.DONE.value,
+                result=result,
+                locked_by=None,
+                locked_until=None,
+                finished_at=datetime.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def fail_job(job: Job, error: str) -> JobStatus:
+    """
+    Requeues the job with exponential backoff, or dead-letters it once it
+    has used all of its attempts. Returns the new status, ``CANCELLED`` if
+    the job was cancelled meanwhile.
+    """
+    if job.attempts >= job.max_attempts:
+        status = JobStatus.DEAD
+        values = {"finished_at": datetime.now()}
+    else:
+        status = JobStatus.QUEUED
+        delay = min(settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1), MAX_BACKOFF)
+        values = {"run_at": datetime.now() + timedelta(seconds=delay)}
+    async with get_general_session() as session:
+        result = await session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status.in_(_LOCKED))
+            .values(
+                status=status.value,
+                last_error=error[:2000],
+                locked_by=None,
+                locked_until=None,
+                **values,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+    return status if result.rowcount else JobStatus.CANCELLED
+
+
+async def cancel_job(job_id: int) -> bool:
+    """
+    Cancels a queued or running job; a running one is stopped by its worker
+    within ``JOB_POLL_INTERVAL``. ``False`` when the job already finished or
+    is sending its results.
+    """
+    async with get_general_session() as session:
+        result = await session.execute(
+            update(Job)
+            .where(
+                Job.id == job_id,
+                Job.status.in_((JobStatus.QUEUED.value, JobStatus.RUNNING.value)),
+            )
+            .values(
+                status=JobStatus.CANCELLED.value,
+                locked_by=None,
+                locked_until=None,
+                finished_at=datetime.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+async def is_job_cancelled(job_id: int) -> bool:
+    async with get_general_session() as session:
+        result = await session.execute(select(Job.status).where(Job.id == job_id))
+        return result.scalar_one_or_none() == JobStatus.CANCELLED.value
+
+
+async def get_queue_depth() -> int:
+    async with get_general_session() as session:
+        result = await session.execute(
+            select(func.count())
+            .select_from(Job)
+            .where(Job.status == JobStatus.QUEUED.value)
+        )
+        return result.scalar_one()
+
+
+async def get_active_job_counts() -> dict[str, int]:
+    """Queued, running and sending jobs by status; finished ones are left out."""
+    active = (JobStatus.QUEUED.value, *_LOCKED)
+    async with get_general_session() as session:
+        result = await session.execute(
+            select(Job.status, func.count())
+            .where(Job.status.in_(active))
+            .group_by(Job.status)
+        )
+        counts = dict.fromkeys(active, 0)
+        counts.update(result.all())
+        return counts
@@ -1,10 +1,10 @@
 import os
 from pathlib import Path
 from uuid import uuid4
-import moviepy as mp
 
 from app.bot.controller.like_controller import LikeeController
 from app.core.extensions.utils import WORKDIR
+from app.core.utils.transcoder import transcoder
 from app.core.settings.config import get_settings
 
 settings = get_settings()
@@ -16,7 +16,7 @@ def validate_likee_url(url: str) -> str:
 
 async def get_likee_video(url: str) -> str:
     controller = LikeeController(api_key=settings.LIKEE_API_KEY)
-    video_path = controller.download_video(url)
+    video_path = await controller.download_video(url)
     if not video_path or not Path(video_path).exists():
         raise Exception("❌ Likee video could not be downloaded.")
     return video_path
@@ -33,9 +33,7 @@ async def extract_audio_from_likee_video_smart(url: str) -> str:
     os.makedirs(audio_path.parent, exist_ok=True)
 
     try:
-        video = mp.VideoFileClip(video_path)
-        video.audio.write_audiofile(str(audio_path), logger=None)
-        video.close()
+        await transcoder.extract_audio(video_path, audio_path, platform="likee")
         os.remove(video_path)
         return str(audio_path)
     except Exception as e:
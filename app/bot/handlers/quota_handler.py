@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import case, or_, update
+from sqlalchemy.future import select
+
+from app.bot.models import User
+from app.core.databases.postgres import get_general_session
+from app.core.extensions.enums import QuotaSource
+
+
+@dataclass
+class QuotaReservation:
+    tg_id: int
+    source: QuotaSource
+    refunded: bool = False
+
+    async def refund(self) -> None:
+        """Give the consumed request back. Safe to call more than once."""
+        if self.refunded:
+            return
+        self.refunded = True
+        await refund_quota(self.tg_id, self.source)
+
+
+async def consume_quota(tg_id: int) -> QuotaSource | None:
+    """
+    Checks and decrements a user's quota in a single UPDATE ... RETURNING.
+
+    An active subscription costs nothing, otherwise a free request is spent
+    before a paid token. RETURNING only sees the row after the update, so
+    which column paid is decided from the pre-update values read by the
+    FROM sub-select.
+
+    Returns:
+        QuotaSource | None: What paid for the request, or None when the user
+        is unknown or has nothing left.
+    """
+    now = datetime.now()
+    current = (
+        select(
+            User.tg_id,
+            User.subscription_expiry,
+            User.free_requests_left,
+            User.tokens,
+        )
+        .where(User.tg_id == tg_id)
+        # Without the lock the sub-select keeps the values from the statement
+        # snapshot: a request that waited on a concurrent update would still
+        # see the old balance, pass the WHERE and spend a token that is gone.
+        # FOR UPDATE makes it wait and re-read the committed row instead.
+        .with_for_update()
+        .subquery("quota_row")
+    )
+    premium = current.c.subscription_expiry > now
+    has_free = current.c.free_requests_left > 0
+
+    stmt = (
+        update(User)
+        .where(User.tg_id == current.c.tg_id)
+        .where(or_(premium, has_free, current.c.tokens > 0))
+        .values(
+            free_requests_left=case(
+                (premium, User.free_requests_left),
+                (has_free, User.free_requests_left - 1),
+                else_=User.free_requests_left,
+            ),
+            tokens=case(
+                (premium, User.tokens),
+                (has_free, User.tokens),
+                else_=User.tokens - 1,
+            ),
+        )
+        .returning(
+            case(
+                (premium, QuotaSource.SUBSCRIPTION.value),
+                (has_free, QuotaSource.FREE.value),
+                else_=QuotaSource.TOKENS.value,
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    async with get_general_session() as session:
+        result = await session.execute(stmt)
+        source = result.scalar_one_or_none()
+        await session.commit()
+    return QuotaSource(source) if source else None
+
+
+async def refund_quota(tg_id: int, source: QuotaSource) -> None:
+    if source == QuotaSource.FREE:
+        values = {"free_requests_left": User.free_requests_left + 1}
+    elif source == QuotaSource.TOKENS:
+        values = {"tokens": User.tokens + 1}
+    else:
+        return
+    async with get_general_session() as session:
+        await session.execute(
+            update(User)
+            .where(User.tg_id == tg_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def reserve_quota(tg_id: int) -> QuotaReservation | None:
+    """Consume one request and return a handle that can refund it on failure."""
+    source = await consume_quota(tg_id)
+    if source is None:
+        return None
+    return QuotaReservation(tg_id=tg_id, source=source)
@@ -19,6 +19,10 @@ async def get_referral_by_tg_id(
 
 
 async def add_referral(tg_id: int, invited_tg_id: int) -> Referral | None:
+    """
+    Records the referral row only. ``User.referral_count`` is bumped once,
+    by ``add_tokens`` when the referred user registers.
+    """
     if tg_id == invited_tg_id:
         return None
     async with get_general_session() as session:
@@ -38,16 +42,23 @@ async def get_user_by_tg_id(tg_id: int) -> User | None:
 
 
 async def is_free_for_month(tg_id: int) -> bool:
-    user = await get_user_by_tg_id(tg_id)
-    if not user:
-        return False
+    required = (
+        select(AdminRequirements.referral_count_for_free_month)
+        .limit(1)
+        .scalar_subquery()
+    )
     async with get_general_session() as session:
-        result = await session.execute(select(AdminRequirements))
-        admin_req = result.scalars().first()
-        if not admin_req:
-            return True
-        referral_count = await session.execute(
-            select(Referral).where(Referral.tg_id == tg_id)
+        result = await session.execute(
+            select(User.referral_count, User.subscription_expiry, required).where(
+                User.tg_id == tg_id
+            )
         )
-        count = len(referral_count.scalars().all())
-        return count >= admin_req.referral_count_for_free_month or user.is_premium()
+        row = result.one_or_none()
+    if row is None:
+        return False
+    referral_count, subscription_expiry, required_count = row
+    if required_count is None:
+        return True
+    if subscription_expiry and subscription_expiry >= datetime.now():
+        return True
+    return referral_count >= required_count
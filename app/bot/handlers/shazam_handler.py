@@ -2,13 +2,15 @@ from __future__ import annotations
 import asyncio
 import logging
 import re
-import shlex
 import tempfile
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
-import aiohttp
 from app.core.extensions.utils import WORKDIR
+from app.core.monitoring.metrics import CACHE_LOOKUPS
+from app.core.monitoring.tracing import media_stage
+from app.core.utils.downloader import DownloadError, download_file
+from app.core.utils.transcoder import TranscodeError, transcoder
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +19,6 @@ MUSIC_DIR.mkdir(parents=True, exist_ok=True)
 
 # Reduced for faster response
 MAX_RESULTS, CHUNK = 30, 10
-FFMPEG_WAV = "-vn -acodec pcm_s16le -ac 1 -ar 16000 -t 7 -f wav"
 TOKEN_RE = re.compile(r"\w+")
 
 # Smaller cache for faster lookups
@@ -73,7 +74,9 @@ async def find_music_by_text(text: str) -> List[Dict]:
     if text in _text_search_cache:
         results, timestamp = _text_search_cache[text]
         if asyncio.get_event_loop().time() - timestamp < CACHE_TTL:
+            CACHE_LOOKUPS.inc(cache="shazam_search", result="hit")
             return results
+    CACHE_LOOKUPS.inc(cache="shazam_search", result="miss")
 
     try:
         shazam = _get_shazam_client()
@@ -129,26 +132,29 @@ async def recognise_music_from_audio(src_path: str) -> List[Dict]:
 
         try:
             # Faster ffmpeg conversion
-            cmd = f"ffmpeg -hide_banner -loglevel error -y -i {shlex.quote(src_path)} {FFMPEG_WAV} {shlex.quote(str(temp_wav))}"
-
-            process = await asyncio.create_subprocess_shell(
-                cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-            )
-
-            # Shorter timeout for conversion
             try:
-                await asyncio.wait_for(process.communicate(), timeout=15)
-            except asyncio.TimeoutError:
-                process.terminate()
-                return []
-
-            if process.returncode != 0 or not temp_wav.exists():
+                await transcoder.extract_audio(
+                    src_path,
+                    temp_wav,
+                    codec="pcm_s16le",
+                    bitrate=None,
+                    sample_rate=16000,
+                    channels=1,
+                    duration=7,
+                    output_format="wav",
+                    platform="music",
+                    stage="transcode",
+                    timeout=15,
+                )
+            except TranscodeError as e:
+                logger.warning(f"Recognition conversion failed: {e}")
                 return []
 
             # Faster recognition timeout
-            recognition_result = await asyncio.wait_for(
-                shazam.recognize(str(temp_wav)), timeout=12
-            )
+            with media_stage(platform="music", stage="recognize"):
+                recognition_result = await asyncio.wait_for(
+                    shazam.recognize(str(temp_wav)), timeout=12
+                )
 
             if not recognition_result:
                 return []
@@ -181,34 +187,12 @@ async def download_music(url: str, filename: Optional[str] = None) -> Optional[s
     file_path = MUSIC_DIR / filename
 
     try:
-        # Faster timeout and connection settings
-        timeout = aiohttp.ClientTimeout(total=20, connect=5)
-        connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
-
-        async with aiohttp.ClientSession(
-            timeout=timeout, connector=connector
-        ) as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-
-                # Larger chunks for faster download
-                with open(file_path, "wb") as fp:
-                    downloaded = 0
-                    async for chunk in response.content.iter_chunked(16384):
-                        fp.write(chunk)
-                        downloaded += len(chunk)
-
-                        # Size limit
-                        if downloaded > 40 * 1024 * 1024:  # 40MB
-                            break
-
-                if file_path.exists() and file_path.stat().st_size > 0:
-                    return str(file_path)
-
-    except Exception as e:
+        await download_file(url, file_path, max_bytes=40 * 1024 * 1024, timeout=20)
+        if file_path.stat().st_size > 0:
+            return str(file_path)
+        file_path.unlink(missing_ok=True)
+    except DownloadError as e:
         logger.error(f"Download error: {e}")
-        if file_path.exists():
-            file_path.unlink(missing_ok=True)
 
     return None
 
@@ -4,9 +4,10 @@ from aiogram.types import Message, FSInputFile
 from app.bot.controller.shorts_controller import YouTubeShortsController
 from app.bot.extensions.clear import atomic_clear
 from app.bot.keyboards.general_buttons import get_music_download_button
-from app.bot.state.session_store import user_sessions
+from app.bot.state.session_store import session_store
 
 logger = logging.getLogger(__name__)
+user_sessions = session_store.namespace("shorts")
 
 
 class YouTubeShortsHandler:
@@ -20,10 +21,10 @@ class YouTubeShortsHandler:
             status_msg = await message.answer("🔄 YouTube Shorts yuklab olinmoqda...")
 
             user_id = message.from_user.id
-            user_sessions[user_id] = {"url": url}
+            await user_sessions.set(user_id, {"url": url})
 
             video_path = await self.controller.download_video(url)
-            user_sessions[user_id]["video_path"] = video_path
+            await user_sessions.update(user_id, video_path=video_path)
 
             await status_msg.delete()
             await message.answer_video(
@@ -8,7 +8,7 @@ logger = logging.getLogger(__name__)
 async def download_snapchat_media(url: str) -> str | None:
     try:
         controller = SnapchatController()
-        file_path = controller.download_snapchat_video(
+        file_path = await controller.download_snapchat_video(
             url, WORKDIR.parent / "media" / "snapchat"
         )
         return file_path
@@ -1,8 +1,44 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
 from sqlalchemy.future import select
-from sqlalchemy import func
+from sqlalchemy import BigInteger, column, delete, func, values
+from sqlalchemy.dialects.postgresql import insert
 
-from app.bot.models import Statistics
+from app.bot.models import Statistics, UsageDaily, UsageDailyUser, User
 from app.core.databases.postgres import get_general_session
+from app.core.settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+COUNTER_FIELDS: tuple[str, ...] = tuple(
+    name for name in Statistics.__table__.columns.keys() if name.startswith("from_")
+)
+
+# statistics field -> (platform, event) in the usage_daily rollup
+USAGE_EVENTS: dict[str, tuple[str, str]] = {
+    "from_text": ("music", "search"),
+    "from_voice": ("music", "voice"),
+    "from_video": ("music", "video"),
+    "from_youtube": ("youtube", "download"),
+    "from_shorts": ("shorts", "download"),
+    "from_tiktok": ("tiktok", "download"),
+    "from_like": ("likee", "download"),
+    "from_likee": ("likee", "download"),
+    "from_snapchat": ("snapchat", "download"),
+    "from_instagram": ("instagram", "download"),
+    "from_twitter": ("twitter", "download"),
+    "from_pinterest": ("pinterest", "download"),
+    "from_threads": ("threads", "download"),
+    "from_group": ("group", "download"),
+}
+
+# days of usage_daily_users kept to dedupe unique_users: a batch counted
+# before midnight can still be flushed, or retried, after it
+USAGE_USERS_KEEP_DAYS = 2
 
 
 async def get_statistics_by_tg_id(tg_id: int) -> Statistics | None:
@@ -27,10 +63,237 @@ async def create_statistics(
         return statistics
 
 
-async def update_statistics(tg_id: int, field: str) -> Statistics:
+class _Batch:
+    def __init__(self) -> None:
+        self.counters: defaultdict[int, defaultdict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self.usage: defaultdict[tuple[date, str, str], int] = defaultdict(int)
+        self.usage_users: defaultdict[tuple[date, str, str], set[int]] = defaultdict(
+            set
+        )
+        self.events = 0
+
+    def merge(self, other: "_Batch") -> None:
+        for tg_id, deltas in other.counters.items():
+            for name, delta in deltas.items():
+                self.counters[tg_id][name] += delta
+        for key, count in other.usage.items():
+            self.usage[key] += count
+        for key, users in other.usage_users.items():
+            self.usage_users[key] |= users
+        self.events += other.events
+
+
+class StatisticsAggregator:
+    """
+    Write-behind buffer for per-user statistics counters and daily usage.
+
+    Events are accumulated in memory as ``(tg_id, field) -> delta`` and
+    ``(day, platform, event) -> count`` and written with bulk
+    ``INSERT ... ON CONFLICT DO UPDATE`` statements every ``flush_interval``
+    seconds, or as soon as ``max_events`` are pending.
+    """
+
+    def __init__(self, flush_interval: float, max_events: int) -> None:
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self._pending = _Batch()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._pruned_on: date | None = None
+
+    @property
+    def pending_events(self) -> int:
+        return self._pending.events
+
+    def add(self, tg_id: int, field: str, delta: int = 1) -> None:
+        usage = USAGE_EVENTS.get(field)
+        if field not in COUNTER_FIELDS and usage is None:
+            logger.debug(f"Ignoring unknown statistics field: {field}")
+            return
+        if field in COUNTER_FIELDS:
+            self._pending.counters[tg_id][field] += delta
+        if usage is not None:
+            self._add_usage(tg_id, *usage, count=delta)
+        self._pending.events += 1
+        self._wake_if_full()
+
+    def record_usage(
+        self, tg_id: int, platform: str, event: str, count: int = 1
+    ) -> None:
+        """Counts an event that only lives in the ``usage_daily`` rollup."""
+        self._add_usage(tg_id, platform, event, count)
+        self._pending.events += 1
+        self._wake_if_full()
+
+    def _add_usage(self, tg_id: int, platform: str, event: str, count: int) -> None:
+        today = date.today()
+        # every event also marks the user as active for the day
+        for key in {(today, platform, event), (today, "bot", "active")}:
+            self._pending.usage[key] += count
+            self._pending.usage_users[key].add(tg_id)
+
+    def _wake_if_full(self) -> None:
+        if self._pending.events >= self.max_events:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final statistics flush failed: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Statistics flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Write everything pending. Returns the number of buffered events."""
+        async with self._flush_lock:
+            await self._prune_usage_users()
+            if not self._pending.events:
+                return 0
+            batch, self._pending = self._pending, _Batch()
+            try:
+                await self._write(batch)
+            except Exception:
+                # keep the deltas so the next flush retries them
+                batch.merge(self._pending)
+                self._pending = batch
+                raise
+            return batch.events
+
+    async def _prune_usage_users(self) -> None:
+        """
+        Deletes the per-user rows behind ``unique_users`` once no event can
+        be counted for their day any more. Runs once a day per process.
+        """
+        today = date.today()
+        if self._pruned_on == today:
+            return
+        cutoff = today - timedelta(days=USAGE_USERS_KEEP_DAYS - 1)
+        try:
+            async with get_general_session() as session:
+                result = await session.execute(
+                    delete(UsageDailyUser).where(UsageDailyUser.day < cutoff)
+                )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Pruning usage_daily_users failed: {e}")
+            return
+        self._pruned_on = today
+        if result.rowcount:
+            logger.info(f"Pruned {result.rowcount} usage_daily_users rows")
+
+    @staticmethod
+    async def _write(batch: _Batch) -> None:
+        rows = [
+            (tg_id, *(deltas.get(name, 0) for name in COUNTER_FIELDS))
+            for tg_id, deltas in batch.counters.items()
+        ]
+        async with get_general_session() as session:
+            # chunks keep each statement well under the bind parameter limit
+            for start in range(0, len(rows), 1000):
+                await session.execute(_upsert_statement(rows[start : start + 1000]))
+            if batch.usage:
+                await _write_usage(session, batch)
+            await session.commit()
+
+
+def _upsert_statement(rows: list[tuple[int, ...]]):
+    deltas = values(
+        column("tg_id", BigInteger),
+        *(column(name, BigInteger) for name in COUNTER_FIELDS),
+        name="deltas",
+    ).data(rows)
+    # only known users, so events from unregistered chats don't violate the FK
+    source = select(deltas).where(deltas.c.tg_id.in_(select(User.tg_id)))
+    stmt = insert(Statistics).from_select(["tg_id", *COUNTER_FIELDS], source)
+    return stmt.on_conflict_do_update(
+        index_elements=[Statistics.tg_id],
+        set_={
+            name: getattr(Statistics, name) + getattr(stmt.excluded, name)
+            for name in COUNTER_FIELDS
+        },
+    )
+
+
+async def _write_usage(session, batch: _Batch) -> None:
+    # users seen for the first time today decide the unique_users increment
+    new_users: defaultdict[tuple[date, str, str], int] = defaultdict(int)
+    seen = [
+        {"day": day, "platform": platform, "event": event, "tg_id": tg_id}
+        for (day, platform, event), users in sorted(batch.usage_users.items())
+        for tg_id in sorted(users)
+    ]
+    for start in range(0, len(seen), 5000):
+        stmt = (
+            insert(UsageDailyUser)
+            .values(seen[start : start + 5000])
+            .on_conflict_do_nothing(
+                index_elements=["day", "platform", "event", "tg_id"]
+            )
+            .returning(
+                UsageDailyUser.day, UsageDailyUser.platform, UsageDailyUser.event
+            )
+        )
+        for row in await session.execute(stmt):
+            new_users[tuple(row)] += 1
+
+    rows = [
+        {
+            "day": key[0],
+            "platform": key[1],
+            "event": key[2],
+            "count": count,
+            "unique_users": new_users.get(key, 0),
+        }
+        for key, count in sorted(batch.usage.items())
+    ]
+    stmt = insert(UsageDaily).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "platform", "event"],
+        set_={
+            "count": UsageDaily.count + stmt.excluded.count,
+            "unique_users": UsageDaily.unique_users + stmt.excluded.unique_users,
+        },
+    )
+    await session.execute(stmt)
+
+
+statistics_aggregator = StatisticsAggregator(
+    flush_interval=settings.STATS_FLUSH_INTERVAL,
+    max_events=settings.STATS_FLUSH_MAX_EVENTS,
+)
+
+
+async def update_statistics(tg_id: int, field: str) -> None:
     """
+    Counts one event for the user. The write is buffered and flushed in
+    bulk by ``statistics_aggregator``.
+
     Fields:
-    - user_id: ID of the user
     - from_text: Count of text messages sent by the user
     - from_voice: Count of voice messages sent by the user
     - from_youtube: Count of YouTube links shared by the user
@@ -41,20 +304,11 @@ async def update_statistics(tg_id: int, field: str) -> Statistics:
     - from_twitter: Count of Twitter links shared by the user
     - from_video: Count of videos shared by the user
     """
-    async with get_general_session() as session:
-        query = select(Statistics).where(Statistics.tg_id == tg_id)
-        result = await session.execute(query)
-        statistics = result.scalar_one_or_none()
-        if not statistics:
-            statistics = Statistics(tg_id=tg_id)
-            session.add(statistics)
-            await session.flush()
-        statistics.add_one(field)
-        await session.commit()
-        return statistics
+    statistics_aggregator.add(tg_id, field)
 
 
 async def get_all_statistics() -> dict[str, int]:
+    await statistics_aggregator.flush()
     async with get_general_session() as session:
         query = select(
             func.coalesce(func.sum(Statistics.from_text), 0).label("from_text"),
@@ -82,3 +336,29 @@ async def get_all_statistics() -> dict[str, int]:
             "from_instagram": row.from_instagram,
             "from_twitter": row.from_twitter,
         }
+
+
+async def get_platform_usage(days: int = 7) -> list[dict]:
+    """
+    Per-platform totals over the last ``days`` days from the usage rollup.
+
+    ``users`` is the sum of daily unique users, not unique over the period.
+    """
+    await statistics_aggregator.flush()
+    since = date.today() - timedelta(days=days - 1)
+    async with get_general_session() as session:
+        query = (
+            select(
+                UsageDaily.platform,
+                func.sum(UsageDaily.count).label("count"),
+                func.sum(UsageDaily.unique_users).label("users"),
+            )
+            .where(UsageDaily.day >= since, UsageDaily.platform != "bot")
+            .group_by(UsageDaily.platform)
+            .order_by(func.sum(UsageDaily.count).desc())
+        )
+        result = await session.execute(query)
+        return [
+            {"platform": platform, "count": count, "users": users}
+            for platform, count, users in result.all()
+        ]
@@ -1,14 +1,17 @@
 import logging
 from aiogram import types
-from aiogram.types import FSInputFile, InputMediaPhoto, InputMediaVideo
+from aiogram.types import FSInputFile, InputMediaPhoto
 from aiogram.exceptions import TelegramBadRequest
 from app.bot.controller.threads_controller import ThreadsController
+from app.bot.extensions.albums import send_video_parts
 from aiogram.utils.i18n import gettext as _
 from pathlib import Path
 import re
 from typing import List, Optional
 
 from app.core.utils.audio import extract_audio_from_video
+from app.core.utils.formats import MediaTooLargeError, upload_limit
+from app.core.utils.oversize import fit_to_limit
 
 logger = logging.getLogger(__name__)
 
@@ -121,6 +124,19 @@ class ThreadHandler:
                 except Exception as inner:
                     logger.warning(f"Single image error: {inner}")
 
+    async def _send_oversized_video(self, message: types.Message, path: Path) -> bool:
+        try:
+            parts = await fit_to_limit(path, "threads")
+        except MediaTooLargeError:
+            return False
+        try:
+            await send_video_parts(parts, message.reply_video, message.reply_media_group)
+        finally:
+            for part in parts:
+                if part != path:
+                    part.unlink(missing_ok=True)
+        return True
+
     async def _send_videos(self, message: types.Message, videos: List[dict]) -> None:
         try:
             for video in videos:
@@ -131,7 +147,9 @@ class ThreadHandler:
                     continue
 
                 size = path.stat().st_size
-                if size > 50 * 1024 * 1024:
+                if size > upload_limit():
+                    if await self._send_oversized_video(message, path):
+                        continue
                     await message.reply(
                         _("threads_video_too_large").format(
                             name=video["filename"],
@@ -170,4 +188,4 @@ class ThreadHandler:
         return None
 
     async def extract_audio(self, video_path: str) -> Optional[str]:
-        return extract_audio_from_video(video_path)
+        return await extract_audio_from_video(video_path)
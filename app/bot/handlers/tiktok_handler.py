@@ -2,10 +2,9 @@ from uuid import uuid4
 import os
 from pathlib import Path
 
-import moviepy
-
 from app.bot.controller.tiktok_controller import TikTokDownloader
 from app.core.extensions.utils import WORKDIR
+from app.core.utils.transcoder import transcoder
 
 
 def validate_tiktok_url(url: str) -> str:
@@ -44,12 +43,7 @@ async def extract_audio_from_tiktok_video_smart(url: str) -> str:
     os.makedirs(os.path.dirname(audio_path), exist_ok=True)
 
     try:
-        video = moviepy.VideoFileClip(video_path)
-        audio = video.audio
-        audio.write_audiofile(audio_path, logger=None)
-
-        audio.close()
-        video.close()
+        await transcoder.extract_audio(video_path, audio_path, platform="tiktok")
         os.remove(video_path)
 
         return audio_path
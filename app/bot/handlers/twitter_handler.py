@@ -6,9 +6,10 @@ from aiogram.utils.i18n import gettext as _
 from app.bot.controller.twitter_controller import TwitterController
 from app.bot.extensions.clear import atomic_clear
 from app.bot.keyboards.general_buttons import get_music_download_button
+from app.bot.state.session_store import session_store
 
 logger = logging.getLogger(__name__)
-user_sessions = {}  # ⚠️ Lokal sessiya saqlovchi
+user_sessions = session_store.namespace("twitter")
 
 
 class TwitterHandler:
@@ -17,7 +18,7 @@ class TwitterHandler:
 
     async def handle(self, message: Message, url: str):
         user_id = message.from_user.id
-        user_sessions[user_id] = {"url": url}
+        await user_sessions.set(user_id, {"url": url})
 
         try:
             status = await message.answer(_("twitter_loading"))
@@ -40,7 +41,7 @@ class TwitterHandler:
                 await message.answer(_("twitter_no_files"))
                 return
 
-            user_sessions[user_id]["video_path"] = str(video_path)
+            await user_sessions.update(user_id, video_path=str(video_path))
 
             await status.delete()
             await message.answer_video(
@@ -59,5 +60,5 @@ class TwitterHandler:
     def get_sessions(self):
         return user_sessions
 
-    def pop_session(self, user_id: int):
-        user_sessions.pop(user_id, None)
+    async def pop_session(self, user_id: int):
+        await user_sessions.pop(user_id)
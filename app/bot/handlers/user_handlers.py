@@ -1,8 +1,11 @@
 from aiogram.types import Message
 from datetime import datetime, timedelta
 
+from app.bot.handlers.quota_handler import consume_quota
+from app.bot.handlers.statistics_handler import statistics_aggregator
 from app.bot.models import User, AdminRequirements
 from app.core.databases.postgres import get_general_session
+from sqlalchemy import func, update
 from sqlalchemy.future import select
 
 DEFAULT_FREE_REQUESTS = 10
@@ -55,6 +58,7 @@ async def create_user(message: Message, ref_id: int | None = None) -> User:
                     if message.from_user.is_premium
                     else False
                 ),
+                is_blocked=False,
             )
             await session.commit()
             return existing_user
@@ -71,13 +75,16 @@ async def create_user(message: Message, ref_id: int | None = None) -> User:
         )
         session.add(user)
         await session.commit()
-        return user
+    statistics_aggregator.record_usage(user.tg_id, "bot", "signup")
+    return user
 
 
 async def get_referral_count(tg_id: int) -> int:
     async with get_general_session() as session:
-        result = await session.execute(select(User).where(User.referred_by == tg_id))
-        return len(result.scalars().all())
+        result = await session.execute(
+            select(User.referral_count).where(User.tg_id == tg_id)
+        )
+        return result.scalar_one_or_none() or 0
 
 
 async def add_user_balance(tg_id: int, amount: float) -> User:
@@ -133,39 +140,30 @@ async def remove_user_balance(tg_id: int, amount: float) -> User:
 
 
 async def remove_token(message: Message) -> bool:
-    async with get_general_session() as session:
-        result = await session.execute(
-            select(User).where(User.tg_id == message.from_user.id)
-        )
-        user = result.scalar_one_or_none()
-        if not user:
-            return False
-        if user.subscription_expiry and user.subscription_expiry > datetime.now():
-            return True
-        if user.free_requests_left > 0:
-            user.free_requests_left -= 1
-            await session.commit()
-            return True
-        if user.tokens > 0:
-            user.tokens -= 1
-            await session.commit()
-            return True
-        return False
+    return await consume_quota(message.from_user.id) is not None
 
 
 async def add_tokens(user_id: int):
+    """Reward the referrer: grant tokens and bump referral_count atomically."""
+    token = func.coalesce(
+        select(AdminRequirements.referral_count_for_free_month)
+        .limit(1)
+        .scalar_subquery(),
+        10,
+    )
     async with get_general_session() as session:
-        result = await session.execute(select(User).where(User.tg_id == user_id))
+        result = await session.execute(
+            update(User)
+            .where(User.tg_id == user_id)
+            .values(
+                tokens=User.tokens + token,
+                referral_count=User.referral_count + 1,
+            )
+            .returning(User)
+        )
         user = result.scalar_one_or_none()
-
-        res = await session.execute(select(AdminRequirements))
-        token_obj = res.scalar_one_or_none()
-        token = token_obj.referral_count_for_free_month if token_obj else 10
-        if user:
-            user.tokens += token
-            await session.commit()
-            return user
-        return None
+        await session.commit()
+        return user
 
 
 async def update_user_premium_time(tg_id):
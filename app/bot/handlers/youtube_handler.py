@@ -1,28 +1,39 @@
 from __future__ import annotations
 import asyncio
-import concurrent.futures
 import logging
-import os
 import time
 from pathlib import Path
 from typing import Optional
-import yt_dlp
 
 from app.bot.extensions.get_random_cookie import (
     get_all_youtube_cookies,
 )
-from app.bot.handlers.youtube_handler_pytube import download_audio_with_pytube
+from app.bot.handlers.youtube_handler_pytube import (
+    download_audio_with_pytube,
+    download_audio_with_pytube_by_id,
+)
 from app.core.extensions.enums import CookieType
 from app.core.extensions.utils import WORKDIR
+from app.core.monitoring.metrics import YTDLP_ATTEMPTS, YTDLP_SUCCESSES
+from app.core.utils.audio import (
+    AudioProfile,
+    audio_profile,
+    ytdlp_audio_postprocessors,
+)
+from app.core.utils.cancellation import DownloadCancelled
+from app.core.utils.formats import MediaTooLargeError, fit_format
+from app.core.utils.hedging import Hedge
+from app.core.utils.transcoder import transcoder
+from app.core.utils.ytdlp_pool import ydl_for, ytdlp_pool
 
 logger = logging.getLogger(__name__)
 
 MUSIC_DIR = WORKDIR.parent / "media" / "music"
 MUSIC_DIR.mkdir(parents=True, exist_ok=True)
 
-_pool = concurrent.futures.ThreadPoolExecutor(
-    max_workers=min(16, (os.cpu_count() or 1) * 4), thread_name_prefix="yt-dl"
-)
+# pytubefix starts once yt-dlp is slower than it usually is
+_audio_hedge = Hedge("music", initial_delay=15, min_delay=3)
+_search_audio_hedge = Hedge("music_search", initial_delay=20, min_delay=3)
 
 
 class _YtDlpSilentLogger:
@@ -69,7 +80,7 @@ VIDEO_OPTS = {
 
 
 def _get_smart_audio_opts(
-    format_selector: str, cookie_file: str | None, convert_to_mp3: bool = True
+    format_selector: str, cookie_file: str | None, profile: AudioProfile
 ) -> dict:
     opts = AUDIO_OPTS_BASE.copy()
     opts["format"] = format_selector
@@ -77,20 +88,14 @@ def _get_smart_audio_opts(
     if cookie_file:
         opts["cookiefile"] = cookie_file
 
-    if convert_to_mp3:
-        opts["postprocessors"] = [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": "192",
-            }
-        ]
-        opts["postprocessor_args"] = [
-            "-threads",
-            str(min(4, os.cpu_count() or 1)),
-            "-loglevel",
-            "error",
-        ]
+    opts["writethumbnail"] = True
+    opts["postprocessors"] = ytdlp_audio_postprocessors(profile)
+    opts["postprocessor_args"] = [
+        "-threads",
+        str(transcoder.threads),
+        "-loglevel",
+        "error",
+    ]
 
     return opts
 
@@ -103,7 +108,9 @@ def _find_downloaded_file(base_path: Path) -> Optional[str]:
     return None
 
 
-def _audio_sync(query: str) -> Optional[str]:
+def _audio_sync(
+    query: str, profile: AudioProfile, video_id: str | None = None
+) -> Optional[str]:
     cookies = get_all_youtube_cookies(CookieType.YOUTUBE.value)
     # Try without cookies first, then with cookies
     cookie_candidates: list[str | None] = [None] + cookies
@@ -115,9 +122,15 @@ def _audio_sync(query: str) -> Optional[str]:
 
     for cookie_file in cookie_candidates:
         for format_selector in format_candidates:
-            opts = _get_smart_audio_opts(format_selector, cookie_file, convert_to_mp3=True)
+            opts = _get_smart_audio_opts(format_selector, cookie_file, profile)
+            YTDLP_ATTEMPTS.inc(platform="music")
             try:
-                with yt_dlp.YoutubeDL(opts) as ydl:
+                ydl = ydl_for(opts)
+                if video_id:
+                    # the video the user picked, no search round trip
+                    entry = {"id": video_id}
+                    entry_url = f"https://youtube.com/watch?v={video_id}"
+                else:
                     info = ydl.extract_info(f"ytsearch1:{query}", download=False)
                     if not info or not info.get("entries") or not info["entries"][0]:
                         continue
@@ -129,23 +142,27 @@ def _audio_sync(query: str) -> Optional[str]:
                     if not entry_url:
                         continue
 
-                    downloaded = ydl.extract_info(entry_url, download=True)
-                    effective = downloaded or entry
-                    prepared = Path(ydl.prepare_filename(effective))
-
-                    found = _find_downloaded_file(prepared)
-                    if found:
-                        return found
-
-                    if effective.get("id"):
-                        for candidate in sorted(
-                            MUSIC_DIR.glob(f"*{effective['id']}*"),
-                            key=lambda p: p.stat().st_mtime,
-                            reverse=True,
-                        ):
-                            if candidate.is_file() and candidate.stat().st_size > 1000:
-                                return str(candidate)
-
+                downloaded = ydl.extract_info(entry_url, download=True)
+                effective = downloaded or entry
+                prepared = Path(ydl.prepare_filename(effective))
+
+                found = _find_downloaded_file(prepared)
+                if found:
+                    YTDLP_SUCCESSES.inc(platform="music")
+                    return found
+
+                if effective.get("id"):
+                    for candidate in sorted(
+                        MUSIC_DIR.glob(f"*{effective['id']}*"),
+                        key=lambda p: p.stat().st_mtime,
+                        reverse=True,
+                    ):
+                        if candidate.is_file() and candidate.stat().st_size > 1000:
+                            YTDLP_SUCCESSES.inc(platform="music")
+                            return str(candidate)
+
+            except DownloadCancelled:
+                raise
             except Exception as e:
                 error_text = str(e).lower()
                 if "requested format is not available" in error_text:
@@ -155,7 +172,7 @@ def _audio_sync(query: str) -> Optional[str]:
                 )
                 continue
 
-    logger.warning(f"No valid audio file found for: {query}")
+    logger.warning(f"No valid audio file found for: {video_id or query}")
     return None
 
 
@@ -180,22 +197,30 @@ def _video_sync(video_id: str, title: str) -> Optional[str]:
             if cookie_file:
                 opts["cookiefile"] = cookie_file
 
+            YTDLP_ATTEMPTS.inc(platform="youtube")
             try:
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    url = f"https://youtube.com/watch?v={video_id}"
-                    ydl.download([url])
-
-                    base_patterns = [
-                        f"{safe_title}-{video_id}",
-                        f"*{video_id}*",
-                        f"{safe_title}*",
-                    ]
-
-                    for pattern in base_patterns:
-                        for ext in ("mp4", "webm", "mkv", "avi"):
-                            for file_path in MUSIC_DIR.glob(f"{pattern}.{ext}"):
-                                if file_path.exists() and file_path.stat().st_size > 1000:
-                                    return str(file_path)
+                ydl = ydl_for(opts)
+                ydl.format_selector = fit_format(ydl, format_selector, max_height=720)
+                url = f"https://youtube.com/watch?v={video_id}"
+                ydl.download([url])
+
+                base_patterns = [
+                    f"{safe_title}-{video_id}",
+                    f"*{video_id}*",
+                    f"{safe_title}*",
+                ]
+
+                for pattern in base_patterns:
+                    for ext in ("mp4", "webm", "mkv", "avi"):
+                        for file_path in MUSIC_DIR.glob(f"{pattern}.{ext}"):
+                            if file_path.exists() and file_path.stat().st_size > 1000:
+                                YTDLP_SUCCESSES.inc(platform="youtube")
+                                return str(file_path)
+            except MediaTooLargeError as e:
+                logger.info(f"Video {video_id} is too large to send: {e}")
+                return None
+            except DownloadCancelled:
+                raise
             except Exception as e:
                 error_text = str(e).lower()
                 if "requested format is not available" in error_text:
@@ -231,22 +256,32 @@ def _video_sync_with_quality(video_id: str, title: str, quality: int) -> Optiona
             else:
                 opts.pop("cookiefile", None)
 
+            YTDLP_ATTEMPTS.inc(platform="youtube")
             try:
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    url = f"https://youtube.com/watch?v={video_id}"
-                    ydl.download([url])
-
-                    base_patterns = [
-                        f"{safe_title}-{video_id}",
-                        f"*{video_id}*",
-                        f"{safe_title}*",
-                    ]
-
-                    for pattern in base_patterns:
-                        for ext in ("mp4", "webm", "mkv", "avi"):
-                            for file_path in MUSIC_DIR.glob(f"{pattern}.{ext}"):
-                                if file_path.exists() and file_path.stat().st_size > 1000:
-                                    return str(file_path)
+                ydl = ydl_for(opts)
+                ydl.format_selector = fit_format(
+                    ydl, format_selector, max_height=quality
+                )
+                url = f"https://youtube.com/watch?v={video_id}"
+                ydl.download([url])
+
+                base_patterns = [
+                    f"{safe_title}-{video_id}",
+                    f"*{video_id}*",
+                    f"{safe_title}*",
+                ]
+
+                for pattern in base_patterns:
+                    for ext in ("mp4", "webm", "mkv", "avi"):
+                        for file_path in MUSIC_DIR.glob(f"{pattern}.{ext}"):
+                            if file_path.exists() and file_path.stat().st_size > 1000:
+                                YTDLP_SUCCESSES.inc(platform="youtube")
+                                return str(file_path)
+            except MediaTooLargeError as e:
+                logger.info(f"Video {video_id} is too large to send: {e}")
+                return None
+            except DownloadCancelled:
+                raise
             except Exception as e:
                 error_text = str(e).lower()
                 if "requested format is not available" in error_text:
@@ -260,28 +295,51 @@ def _video_sync_with_quality(video_id: str, title: str, quality: int) -> Optiona
     return None
 
 
-async def download_music_from_youtube(title: str, artist: str) -> str | None:
-    """Audio download using yt-dlp + cookies, pytubefix fallback."""
+async def download_music_from_youtube(
+    title: str, artist: str, profile: AudioProfile | None = None
+) -> str | None:
+    """Audio download using yt-dlp + cookies, hedged with pytubefix."""
     if not title or not artist:
         return None
 
     query = f"{title} {artist}"
-    loop = asyncio.get_running_loop()
+    profile = audio_profile(profile)
 
     try:
-        file_path = await asyncio.wait_for(
-            loop.run_in_executor(_pool, _audio_sync, query),
+        return await asyncio.wait_for(
+            _search_audio_hedge.run(
+                lambda: ytdlp_pool.run(_audio_sync, query, profile),
+                lambda: ytdlp_pool.run(download_audio_with_pytube, query),
+            ),
             timeout=90,
         )
-        if file_path:
-            return file_path
+    except asyncio.TimeoutError:
+        logger.warning(f"Audio download timeout: {query}")
+        return None
+    except Exception as e:
+        logger.error(f"Audio download error: {e}")
+        return None
+
 
+async def download_music_by_id(
+    video_id: str, profile: AudioProfile | None = None
+) -> str | None:
+    """Audio of one YouTube video, for hits that already carry their id."""
+    if not video_id:
+        return None
+
+    profile = audio_profile(profile)
+
+    try:
         return await asyncio.wait_for(
-            loop.run_in_executor(None, download_audio_with_pytube, query),
-            timeout=30,
+            _audio_hedge.run(
+                lambda: ytdlp_pool.run(_audio_sync, video_id, profile, video_id),
+                lambda: ytdlp_pool.run(download_audio_with_pytube_by_id, video_id),
+            ),
+            timeout=90,
         )
     except asyncio.TimeoutError:
-        logger.warning(f"Audio download timeout: {query}")
+        logger.warning(f"Audio download timeout: {video_id}")
         return None
     except Exception as e:
         logger.error(f"Audio download error: {e}")
@@ -293,11 +351,9 @@ async def download_video_from_youtube(video_id: str, title: str) -> Optional[str
     if not video_id or not title:
         return None
 
-    loop = asyncio.get_running_loop()
-
     try:
         return await asyncio.wait_for(
-            loop.run_in_executor(_pool, _video_sync, video_id, title),
+            ytdlp_pool.run(_video_sync, video_id, title),
             timeout=90,
         )
     except asyncio.TimeoutError:
@@ -314,10 +370,9 @@ async def download_video_from_youtube_with_quality(
     if not video_id or not title:
         return None
 
-    loop = asyncio.get_running_loop()
     try:
         return await asyncio.wait_for(
-            loop.run_in_executor(_pool, _video_sync_with_quality, video_id, title, quality),
+            ytdlp_pool.run(_video_sync_with_quality, video_id, title, quality),
             timeout=90,
         )
     except asyncio.TimeoutError:
@@ -374,4 +429,4 @@ async def cleanup_old_files(max_age: int = 1800) -> None:
 
 async def shutdown_downloader() -> None:
     """Graceful shutdown."""
-    _pool.shutdown(wait=False)
+    await ytdlp_pool.stop()
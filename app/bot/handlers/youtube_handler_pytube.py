@@ -3,6 +3,9 @@ from pathlib import Path
 import os
 import logging
 
+from app.core.utils.cancellation import DownloadCancelled
+from app.core.utils.ytdlp_pool import job_token
+
 logger = logging.getLogger(__name__)
 
 # Media/music katalogi
@@ -23,44 +26,65 @@ def download_audio_with_pytube(query: str) -> str | None:
             logger.warning(f"No results for query: {query}")
             return None
 
-        video_url = videos[0].watch_url
-        video_id = videos[0].video_id
+        return _download_audio_stream(videos[0].watch_url, videos[0].video_id, query)
 
-        # Try WEB with PoToken first, then ANDROID fallback
-        clients_to_try = [
-            {"client": "WEB", "use_po_token": True},
-            {"client": "ANDROID"},
-            {"client": "IOS"},
-        ]
+    except DownloadCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"pytubefix download error for '{query}': {e}")
+        return None
 
-        for client_opts in clients_to_try:
-            try:
-                yt = YouTube(video_url, **client_opts)
-                stream = yt.streams.filter(only_audio=True).order_by("abr").desc().first()
 
-                if not stream:
-                    continue
+def download_audio_with_pytube_by_id(video_id: str) -> str | None:
+    try:
+        return _download_audio_stream(
+            f"https://youtube.com/watch?v={video_id}", video_id, video_id
+        )
+    except DownloadCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"pytubefix download error for '{video_id}': {e}")
+        return None
 
-                title = sanitize_filename(yt.title)
-                file_name = f"{title[:50]}-{video_id}.mp4"
-                out_path = MUSIC_DIR / file_name
 
-                if out_path.exists() and out_path.stat().st_size > 1024:
-                    logger.info(f"File already exists: {out_path.name}")
-                    return str(out_path)
+def _download_audio_stream(video_url: str, video_id: str, query: str) -> str | None:
+    # Try WEB with PoToken first, then ANDROID fallback
+    clients_to_try = [
+        {"client": "WEB", "use_po_token": True},
+        {"client": "ANDROID"},
+        {"client": "IOS"},
+    ]
 
-                stream.download(output_path=str(MUSIC_DIR), filename=out_path.name)
+    token = job_token()
+    for client_opts in clients_to_try:
+        try:
+            yt = YouTube(
+                video_url, on_progress_callback=token.pytube_progress, **client_opts
+            )
+            stream = yt.streams.filter(only_audio=True).order_by("abr").desc().first()
 
-                if out_path.exists() and out_path.stat().st_size > 1024:
-                    logger.info(f"Downloaded audio: {out_path.name}")
-                    return str(out_path)
-            except Exception as e:
-                logger.warning(f"pytubefix {client_opts} failed for '{query}': {e}")
+            if not stream:
                 continue
 
-        logger.error(f"All pytubefix clients failed for '{query}'")
-        return None
+            title = sanitize_filename(yt.title)
+            file_name = f"{title[:50]}-{video_id}.mp4"
+            out_path = MUSIC_DIR / file_name
 
-    except Exception as e:
-        logger.error(f"pytubefix download error for '{query}': {e}")
-        return None
+            if out_path.exists() and out_path.stat().st_size > 1024:
+                logger.info(f"File already exists: {out_path.name}")
+                return str(out_path)
+
+            token.track(out_path)
+            stream.download(output_path=str(MUSIC_DIR), filename=out_path.name)
+
+            if out_path.exists() and out_path.stat().st_size > 1024:
+                logger.info(f"Downloaded audio: {out_path.name}")
+                return str(out_path)
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            logger.warning(f"pytubefix {client_opts} failed for '{query}': {e}")
+            continue
+
+    logger.error(f"All pytubefix clients failed for '{query}'")
+    return None
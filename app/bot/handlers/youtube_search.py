@@ -1,17 +1,13 @@
 from __future__ import annotations
 import asyncio
-import concurrent.futures
 import logging
+import time
 from typing import List, Dict
-import yt_dlp
-import os
 
-logger = logging.getLogger(__name__)
+from app.core.monitoring.metrics import CACHE_LOOKUPS
+from app.core.utils.ytdlp_pool import ydl_for, ytdlp_search_pool
 
-# Optimized thread pool - increased workers for parallel processing
-_pool = concurrent.futures.ThreadPoolExecutor(
-    max_workers=min(8, (os.cpu_count() or 1) * 2), thread_name_prefix="yt-search"
-)
+logger = logging.getLogger(__name__)
 
 # Smaller, faster cache with TTL
 _search_cache: Dict[str, tuple] = {}  # (results, timestamp)
@@ -20,16 +16,7 @@ CACHE_TTL = 300  # 5 minutes
 
 
 def _search_sync(query: str, limit: int) -> List[Dict]:
-    """Optimized YouTube search with faster options."""
-    import time
-
-    # Check cache with TTL
-    cache_key = f"{query}:{limit}"
-    if cache_key in _search_cache:
-        results, timestamp = _search_cache[cache_key]
-        if time.time() - timestamp < CACHE_TTL:
-            return results
-
+    """Optimized YouTube search with faster options, runs in a yt-dlp worker."""
     # Faster yt-dlp options
     opts = {
         "quiet": True,
@@ -43,32 +30,19 @@ def _search_sync(query: str, limit: int) -> List[Dict]:
     }
 
     hits: List[Dict] = []
-    try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            data = ydl.extract_info(query, download=False)
-            if data and "entries" in data:
-                for entry in data["entries"][:limit]:  # Limit early
-                    if entry:
-                        hits.append(
-                            {
-                                "title": entry.get("title", "Unknown"),
-                                "artist": entry.get("uploader", "Unknown"),
-                                "duration": entry.get("duration") or 0,
-                                "id": entry.get("id", ""),
-                            }
-                        )
-
-        # Update cache with TTL
-        if len(_search_cache) >= CACHE_MAX_SIZE:
-            # Remove oldest entries
-            oldest_key = min(_search_cache.keys(), key=lambda k: _search_cache[k][1])
-            del _search_cache[oldest_key]
-
-        _search_cache[cache_key] = (hits, time.time())
-
-    except Exception as e:
-        logger.error(f"YouTube search error: {e}")
-
+    ydl = ydl_for(opts)
+    data = ydl.extract_info(query, download=False)
+    if data and "entries" in data:
+        for entry in data["entries"][:limit]:  # Limit early
+            if entry:
+                hits.append(
+                    {
+                        "title": entry.get("title", "Unknown"),
+                        "artist": entry.get("uploader", "Unknown"),
+                        "duration": entry.get("duration") or 0,
+                        "id": entry.get("id", ""),
+                    }
+                )
     return hits
 
 
@@ -79,20 +53,36 @@ async def youtube_search(query: str, limit: int = 30) -> List[Dict]:
 
     # Reduced limit for faster results
     limit = min(limit, 50)
+    query = query.strip()
+
+    # Check cache with TTL (kept here, worker processes come and go)
+    cache_key = f"{query}:{limit}"
+    if cache_key in _search_cache:
+        results, timestamp = _search_cache[cache_key]
+        if time.time() - timestamp < CACHE_TTL:
+            CACHE_LOOKUPS.inc(cache="youtube_search", result="hit")
+            return results
+    CACHE_LOOKUPS.inc(cache="youtube_search", result="miss")
 
-    loop = asyncio.get_running_loop()
     try:
-        # Shorter timeout for faster response
-        return await asyncio.wait_for(
-            loop.run_in_executor(_pool, _search_sync, query.strip(), limit), timeout=8
-        )
+        # Shorter timeout for faster response; a busy pool doesn't eat into it
+        hits = await ytdlp_search_pool.run_timed(8, _search_sync, query, limit)
     except asyncio.TimeoutError:
         logger.warning(f"Search timeout: {query}")
         return []
     except Exception as e:
-        logger.error(f"Search error: {e}")
+        logger.error(f"YouTube search error: {e}")
         return []
 
+    # Update cache with TTL
+    if len(_search_cache) >= CACHE_MAX_SIZE:
+        # Remove oldest entries
+        oldest_key = min(_search_cache.keys(), key=lambda k: _search_cache[k][1])
+        del _search_cache[oldest_key]
+
+    _search_cache[cache_key] = (hits, time.time())
+    return hits
+
 
 def clear_search_cache() -> None:
     """Clear search cache."""
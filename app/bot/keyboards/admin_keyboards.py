@@ -8,11 +8,16 @@ def get_admin_panel_keyboard() -> ReplyKeyboardMarkup:
             KeyboardButton(text="📁 Users excel"),
             KeyboardButton(text="📊 Statistics"),
         ],
+        [
+            KeyboardButton(text="📄 Users CSV"),
+            KeyboardButton(text="🗂 Users Parquet"),
+        ],
         [KeyboardButton(text="🔧 Settings"), KeyboardButton(text="📈 Channels")],
         [
             KeyboardButton(text="💲 Fill Balance"),
             KeyboardButton(text="Remove from balance"),
         ],
+        [KeyboardButton(text="🐢 Loop stalls")],
         [KeyboardButton(text="🔙 Back to Main Menu")],
     ]
 
@@ -21,6 +21,18 @@ def get_music_download_button(media_name: str):
     return InlineKeyboardMarkup(row_width=2, inline_keyboard=[buttons])
 
 
+def get_cancel_download_button(job_id: int | str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="❌ Bekor qilish", callback_data=f"cancel_download:{job_id}"
+                )
+            ]
+        ]
+    )
+
+
 def main_menu_keyboard(message: Message) -> ReplyKeyboardMarkup:
     buttons: list[list[KeyboardButton]] = []
 
@@ -4,6 +4,10 @@ from app.bot.models.channels import Channel
 from app.bot.models.statistics import Statistics
 from app.bot.models.referral import Referral
 from app.bot.models.backup import Backup
+from app.bot.models.usage import UsageDaily, UsageDailyUser
+from app.bot.models.broadcast import BroadcastCampaign
+from app.bot.models.jobs import Job
+from app.bot.models.sessions import UserSession
 
 __all__ = [
     "User",
@@ -12,4 +16,9 @@ __all__ = [
     "Statistics",
     "Referral",
     "Backup",
+    "UsageDaily",
+    "UsageDailyUser",
+    "BroadcastCampaign",
+    "Job",
+    "UserSession",
 ]
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from app.core.models import BaseModelWithData
+from sqlalchemy import BigInteger, DateTime, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class BroadcastCampaign(BaseModelWithData):
+    __tablename__ = "broadcast_campaigns"
+
+    admin_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    media_type: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    media_file_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, index=True)
+
+    # keyset checkpoint: every user with users.id <= last_user_id was handled
+    last_user_id: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    total: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    sent: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    blocked: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    progress_message_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # the bot process sending it; an expired lease is taken over on startup
+    locked_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<BroadcastCampaign id={self.id!r} status={self.status!r}>"
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from app.core.models import BaseModelWithData
+from sqlalchemy import BigInteger, DateTime, Index, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class UserSession(BaseModelWithData):
+    """A session entry of ``SESSION_BACKEND=postgres``, see ``session_store``."""
+
+    __tablename__ = "user_sessions"
+    __table_args__ = (
+        UniqueConstraint("namespace", "key", name="uq_user_sessions_namespace_key"),
+        Index("ix_user_sessions_owner_updated_at", "owner", "updated_at"),
+        Index("ix_user_sessions_expires_at", "expires_at"),
+    )
+
+    namespace: Mapped[str] = mapped_column(String(32), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Telegram user the entry counts against for SESSION_MAX_PER_USER
+    owner: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    data: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<UserSession namespace={self.namespace!r} key={self.key!r}>"
@@ -4,12 +4,13 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from app.bot.models.users import User
 from app.core.models import BaseModel
-from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy import BigInteger, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 
 class Statistics(BaseModel):
     __tablename__ = "statistics"
+    __table_args__ = (UniqueConstraint("tg_id", name="uq_statistics_tg_id"),)
 
     tg_id: Mapped[int] = mapped_column(
         BigInteger,
@@ -0,0 +1,55 @@
+from datetime import date
+
+from app.core.models import BaseModel
+from sqlalchemy import BigInteger, Date, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class UsageDaily(BaseModel):
+    """Pre-aggregated number of events per day, platform and event type."""
+
+    __tablename__ = "usage_daily"
+    __table_args__ = (
+        UniqueConstraint("day", "platform", "event", name="uq_usage_daily_key"),
+    )
+
+    day: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    platform: Mapped[str] = mapped_column(String(32), nullable=False)
+    event: Mapped[str] = mapped_column(String(32), nullable=False)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    unique_users: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return (
+            f"<UsageDaily day={self.day} platform={self.platform!r} "
+            f"event={self.event!r} count={self.count}>"
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "day": self.day,
+            "platform": self.platform,
+            "event": self.event,
+            "count": self.count,
+            "unique_users": self.unique_users,
+        }
+
+
+class UsageDailyUser(BaseModel):
+    """
+    Users already counted in ``UsageDaily.unique_users`` for a day. Only the
+    last ``USAGE_USERS_KEEP_DAYS`` days are kept, older rows are pruned by
+    the statistics aggregator.
+    """
+
+    __tablename__ = "usage_daily_users"
+    __table_args__ = (
+        UniqueConstraint(
+            "day", "platform", "event", "tg_id", name="uq_usage_daily_users_key"
+        ),
+    )
+
+    day: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    platform: Mapped[str] = mapped_column(String(32), nullable=False)
+    event: Mapped[str] = mapped_column(String(32), nullable=False)
+    tg_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
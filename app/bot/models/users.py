@@ -8,13 +8,14 @@ if TYPE_CHECKING:
     from app.bot.models.referral import Referral
 
 from app.core.models.base import BaseModelWithData
-from sqlalchemy import BigInteger, Boolean, String, DateTime, Float
+from sqlalchemy import BigInteger, Boolean, String, DateTime, Float, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
 
 class User(BaseModelWithData):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_at", "created_at"),)
 
     tg_id: Mapped[int] = mapped_column(
         BigInteger, primary_key=True, autoincrement=False, unique=True, index=True
@@ -38,6 +39,7 @@ class User(BaseModelWithData):
         nullable=False,
         onupdate=datetime.now,
         default=datetime.now,
+        index=True,
     )
 
     referred_by: Mapped[int | None] = mapped_column(
@@ -63,6 +65,15 @@ class User(BaseModelWithData):
     free_requests_left: Mapped[int] = mapped_column(
         BigInteger, default=10, nullable=False
     )
+    # set when a message to the user fails with "bot was blocked by the user"
+    is_blocked: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default="false", nullable=False, index=True
+    )
+    # denormalized number of users whose referred_by is this user; only
+    # add_tokens increments it, when a referred user registers
+    referral_count: Mapped[int] = mapped_column(
+        BigInteger, default=0, server_default="0", nullable=False, index=True
+    )
 
     @hybrid_property
     def full_name(self) -> str:
@@ -88,6 +99,8 @@ class User(BaseModelWithData):
             "language_code": self.language_code,
             "is_tg_premium": self.is_tg_premium,
             "free_requests_left": self.free_requests_left,
+            "referral_count": self.referral_count,
+            "is_blocked": self.is_blocked,
             "last_active": self.last_active,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
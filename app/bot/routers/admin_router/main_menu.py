@@ -1,13 +1,13 @@
 import os
 from datetime import datetime
 
-from aiogram import Router, F
+from aiogram import Router, F, html
 from aiogram.types import Message, FSInputFile
 from aiogram.enums.chat_action import ChatAction
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.i18n import gettext as _
 
-from app.bot.controller.admin_controller import export_users_to_excel
+from app.bot.controller.admin_controller import export_users
 from app.bot.filters.admin_filter import AdminFilter
 from app.bot.handlers.admin import (
     get_last_7_days_statistics,
@@ -15,13 +15,17 @@ from app.bot.handlers.admin import (
     get_token_per_referral,
 )
 from app.bot.handlers.channel_handler import get_all_channels
-from app.bot.handlers.statistics_handler import get_all_statistics
+from app.bot.handlers.statistics_handler import (
+    get_all_statistics,
+    get_platform_usage,
+)
 from app.bot.keyboards.admin_keyboards import (
     get_admin_panel_keyboard,
     get_channel_crud_keyboard,
 )
 from app.bot.keyboards.general_buttons import main_menu_keyboard
 from app.bot.models import Channel
+from app.core.monitoring.watchdog import loop_watchdog
 
 main_menu_router = Router()
 
@@ -35,13 +39,19 @@ async def handle_admin_panel(message: Message):
     )
 
 
-@main_menu_router.message(AdminFilter(), F.text == "📁 Users excel")
+USER_EXPORTS = {
+    "📁 Users excel": ("xlsx", "Users_report.xlsx"),
+    "📄 Users CSV": ("csv", "Users_report.csv.gz"),
+    "🗂 Users Parquet": ("parquet", "Users_report.parquet"),
+}
+
+
+@main_menu_router.message(AdminFilter(), F.text.in_(USER_EXPORTS))
 async def handle_statistics(message: Message):
     await message.bot.send_chat_action(message.chat.id, ChatAction.UPLOAD_DOCUMENT)
-    file_path: str = await export_users_to_excel()
+    fmt, file_name = USER_EXPORTS[message.text]
+    file_path: str = await export_users(fmt)
     try:
-        file_name = "Users_report.xlsx"
-
         doc = FSInputFile(path=file_path, filename=file_name)
         caption = _("user_export_caption").format(
             file_name=file_name,
@@ -108,6 +118,18 @@ async def handle_last_users(message: Message):
     lines.append(_("usage_from_instagram").format(count=statistics["from_instagram"]))
     lines.append(_("usage_from_twitter").format(count=statistics["from_twitter"]))
 
+    platform_usage = await get_platform_usage(days=7)
+    if platform_usage:
+        lines.append(_("usage_last_7_days_header"))
+        for item in platform_usage:
+            lines.append(
+                _("usage_last_7_days_item").format(
+                    platform=item["platform"].capitalize(),
+                    count=item["count"],
+                    users=item["users"],
+                )
+            )
+
     await message.answer(
         "\n".join(lines), parse_mode="HTML", disable_web_page_preview=True
     )
@@ -119,6 +141,28 @@ async def handle_last_users(message: Message):
     )
 
 
+@main_menu_router.message(AdminFilter(), F.text == "🐢 Loop stalls")
+async def handle_loop_stalls(message: Message):
+    sites = loop_watchdog.report(limit=10)
+    if not sites:
+        await message.answer(_("loop_stalls_empty"), parse_mode="HTML")
+        return
+
+    lines = [
+        _("loop_stalls_header").format(
+            stalls=loop_watchdog.stalls, threshold=loop_watchdog.threshold
+        )
+    ]
+    for idx, site in enumerate(sites, start=1):
+        lines.append(
+            f"\n{idx}. <code>{html.quote(site.site)}</code>\n"
+            f"   ⏱ {site.total_seconds:.1f}s / {site.count}x,"
+            f" max {site.max_seconds:.2f}s\n"
+            f"   ↳ <code>{html.quote(site.blocking)}</code>"
+        )
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+
 @main_menu_router.message(AdminFilter(), F.text == "🔧 Settings")
 async def handle_settings(message: Message):
     await message.answer(_("settings_page"), parse_mode="HTML")
@@ -148,4 +192,3 @@ async def handle_back_to_admin_panel(message: Message):
         parse_mode="HTML",
         reply_markup=main_menu_keyboard(message),
     )
-
@@ -9,7 +9,8 @@ from app.bot.handlers.instagram_handler import (
     extract_audio_from_instagram_video,
 )
 from app.bot.handlers.statistics_handler import update_statistics
-from app.bot.handlers.user_handlers import remove_token
+from app.bot.handlers.job_handler import enqueue_download
+from app.bot.handlers.quota_handler import reserve_quota
 from app.bot.keyboards.general_buttons import get_music_download_button
 from app.bot.keyboards.payment_keyboard import get_payment_keyboard
 from app.bot.routers.music_router import (
@@ -18,21 +19,23 @@ from app.bot.routers.music_router import (
     get_controller,
     _cache,
 )
+from app.bot.state.session_store import session_store
+from app.core.monitoring.tracing import media_stage
 from app.core.settings.config import get_settings, Settings
 from app.bot.handlers import shazam_handler as shz
 
 settings: Settings = get_settings()
 
 instagram_router = Router()
-user_sessions = {}  # Session storage
+user_sessions = session_store.namespace("instagram")
 
 import time
 
 
 @instagram_router.message(F.text.contains("instagram.com"))
 async def handle_instagram_link(message: Message):
-    res = await remove_token(message)
-    if not res:
+    reservation = await reserve_quota(message.from_user.id)
+    if not reservation:
         await message.answer(
             _(
                 "No requests left. Please top up your balance or invite friends."
@@ -44,16 +47,30 @@ async def handle_instagram_link(message: Message):
 
     user_id = message.from_user.id
     instagram_url = validate_instagram_url(message.text)
+    if settings.USE_JOB_QUEUE:
+        await enqueue_download(
+            message,
+            [instagram_url],
+            statistics_field="from_instagram",
+            quota=reservation,
+        )
+        return
 
-    user_sessions[user_id] = {"url": instagram_url}
-    video_path = await download_instagram_video_only_mp4(instagram_url)
-    user_sessions[user_id]["video_path"] = video_path
-
-    await message.answer_video(
-        FSInputFile(video_path),
-        caption=_("ig_video_ready"),
-        reply_markup=get_music_download_button("instagram"),
-    )
+    await user_sessions.set(user_id, {"url": instagram_url})
+    try:
+        with media_stage(platform="instagram", stage="download"):
+            video_path = await download_instagram_video_only_mp4(instagram_url)
+    except Exception:
+        await reservation.refund()
+        raise
+    await user_sessions.update(user_id, video_path=video_path)
+
+    with media_stage(platform="instagram", stage="upload"):
+        await message.answer_video(
+            FSInputFile(video_path),
+            caption=_("ig_video_ready"),
+            reply_markup=get_music_download_button("instagram"),
+        )
     await update_statistics(message.from_user.id, field="from_instagram")
 
 
@@ -68,7 +85,7 @@ async def handle_instagram_callback(callback_query: CallbackQuery):
 
     await callback_query.answer(_("ig_extracting"))
 
-    session = user_sessions.get(user_id)
+    session = await user_sessions.get(user_id)
     if not session or not session.get("url"):
         await callback_query.message.answer(_("ig_session_expired"))
         return
@@ -124,4 +141,4 @@ async def handle_instagram_callback(callback_query: CallbackQuery):
         print(f"Error during recognition: {str(e)}")
         await callback_query.message.answer(_("ig_recognition_error"))
 
-    user_sessions.pop(user_id, None)
+    await user_sessions.pop(user_id)
@@ -23,6 +23,7 @@ from app.bot.handlers import shazam_handler as shz
 from app.bot.handlers.statistics_handler import update_statistics
 from app.bot.handlers.user_handlers import remove_token
 from app.bot.keyboards.payment_keyboard import get_payment_keyboard
+from app.core.monitoring.tracing import media_stage
 
 logger = logging.getLogger(__name__)
 
@@ -419,9 +420,15 @@ async def handle_callbacks(callback: CallbackQuery):
 async def download_and_send_audio(destination: Message, status: Message, info: Dict):
     """Download and send audio with comprehensive error handling."""
     try:
-        file_path = await get_controller().download_full_track(
-            info["title"], info["artist"]
-        )
+        with media_stage(platform="music", stage="download"):
+            if info.get("id"):
+                # a YouTube search hit: fetch exactly the video that was picked
+                file_path = await get_controller().download_track_by_id(info["id"])
+            else:
+                # recognised by Shazam only, find it on YouTube by name
+                file_path = await get_controller().download_full_track(
+                    info["title"], info["artist"]
+                )
 
         if file_path and os.path.exists(file_path):
             # Verify file size and content
@@ -430,13 +437,14 @@ async def download_and_send_audio(destination: Message, status: Message, info: D
                 await status.edit_text(_("❌ Downloaded file is empty."))
                 return
 
-            await destination.answer_audio(
-                FSInputFile(file_path),
-                title=info["title"][:100],  # Telegram limits
-                performer=info["artist"][:100],
-                caption=f"🎵 <b>{info['title'][:100]}</b>\n👤 {info['artist'][:100]}",
-                parse_mode="HTML",
-            )
+            with media_stage(platform="music", stage="upload"):
+                await destination.answer_audio(
+                    FSInputFile(file_path),
+                    title=info["title"][:100],  # Telegram limits
+                    performer=info["artist"][:100],
+                    caption=f"🎵 <b>{info['title'][:100]}</b>\n👤 {info['artist'][:100]}",
+                    parse_mode="HTML",
+                )
 
             await atomic_clear(file_path)
             await status.delete()
@@ -461,7 +469,8 @@ async def download_and_send_video(destination: Message, status: Message, info: D
             await status.edit_text(_("❌ Video ID not available."))
             return
 
-        file_path = await get_controller().download_video(video_id, info["title"])
+        with media_stage(platform="youtube", stage="download"):
+            file_path = await get_controller().download_video(video_id, info["title"])
 
         if file_path and os.path.exists(file_path):
             # Verify file
@@ -470,12 +479,13 @@ async def download_and_send_video(destination: Message, status: Message, info: D
                 await status.edit_text(_("❌ Downloaded video is empty."))
                 return
 
-            await destination.answer_video(
-                FSInputFile(file_path),
-                caption=f"🎬 <b>{info['title'][:100]}</b>",
-                parse_mode="HTML",
-                supports_streaming=True,
-            )
+            with media_stage(platform="youtube", stage="upload"):
+                await destination.answer_video(
+                    FSInputFile(file_path),
+                    caption=f"🎬 <b>{info['title'][:100]}</b>",
+                    parse_mode="HTML",
+                    supports_streaming=True,
+                )
 
             await atomic_clear(file_path)
             await status.delete()
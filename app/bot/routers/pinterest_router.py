@@ -7,7 +7,8 @@ from app.bot.extensions.clear import atomic_clear
 from app.bot.handlers.statistics_handler import update_statistics
 from app.bot.handlers.pinterest_handler import download_pinterest_media
 from app.bot.handlers import shazam_handler as shz
-from app.bot.handlers.user_handlers import remove_token
+from app.bot.handlers.job_handler import enqueue_download
+from app.bot.handlers.quota_handler import reserve_quota
 from app.bot.keyboards.payment_keyboard import get_payment_keyboard
 from app.bot.routers.music_router import (
     get_controller,
@@ -16,35 +17,25 @@ from app.bot.routers.music_router import (
     _cache,
 )
 from app.bot.keyboards.general_buttons import get_music_download_button
+from app.bot.state.session_store import session_store
+from app.core.monitoring.tracing import media_stage
 from app.core.settings.config import get_settings, Settings
+from app.core.utils.audio import extract_audio_from_video
 from pathlib import Path
 import logging
-import moviepy
 
 settings: Settings = get_settings()
 pinterest_router = Router()
 logger = logging.getLogger(__name__)
-user_sessions = {}
-
-
-def extract_audio_from_video(video_path: str) -> str | None:
-    try:
-        audio_path = str(Path(video_path).with_suffix(".mp3"))
-        clip = moviepy.VideoFileClip(video_path)
-        clip.audio.write_audiofile(audio_path, logger=None)
-        clip.close()
-        return audio_path
-    except Exception as e:
-        logger.error(f"Audio extraction failed: {e}")
-        return None
+user_sessions = session_store.namespace("pinterest")
 
 
 @pinterest_router.message(
     F.text.regexp(r"(https?://)?(www\.)?(pin\.it|pinterest\.com)/[^\s]+")
 )
 async def handle_pinterest_link(message: Message):
-    res = await remove_token(message)
-    if not res:
+    reservation = await reserve_quota(message.from_user.id)
+    if not reservation:
         await message.answer(
             _(
                 "No requests left. Please top up your balance or invite friends."
@@ -56,33 +47,43 @@ async def handle_pinterest_link(message: Message):
 
     user_id = message.from_user.id
     url = message.text.strip()
-    user_sessions[user_id] = {"url": url}
+    if settings.USE_JOB_QUEUE:
+        await enqueue_download(
+            message, [url], statistics_field="from_pinterest", quota=reservation
+        )
+        return
+
+    await user_sessions.set(user_id, {"url": url})
 
     try:
-        result = await download_pinterest_media(url)
+        with media_stage(platform="pinterest", stage="download"):
+            result = await download_pinterest_media(url)
         if not result:
+            await reservation.refund()
             await message.answer(_("pinterest_download_failed"))
             return
 
         file_path, media_type = result
-        user_sessions[user_id]["video_path"] = file_path
-
-        if media_type == "video":
-            await message.answer_video(
-                FSInputFile(file_path),
-                caption=_("pinterest_video_ready"),
-                reply_markup=get_music_download_button("pinterest"),
-                supports_streaming=True,
-            )
-        elif media_type == "image":
-            await message.answer_photo(FSInputFile(file_path))
-        else:
-            await message.answer_document(FSInputFile(file_path))
+        await user_sessions.update(user_id, video_path=file_path)
+
+        with media_stage(platform="pinterest", stage="upload"):
+            if media_type == "video":
+                await message.answer_video(
+                    FSInputFile(file_path),
+                    caption=_("pinterest_video_ready"),
+                    reply_markup=get_music_download_button("pinterest"),
+                    supports_streaming=True,
+                )
+            elif media_type == "image":
+                await message.answer_photo(FSInputFile(file_path))
+            else:
+                await message.answer_document(FSInputFile(file_path))
 
         await update_statistics(user_id, field="from_pinterest")
 
     except Exception as e:
         logger.error(f"Pinterest error: {e}")
+        await reservation.refund()
         await message.answer(_("pinterest_download_error"))
 
 
@@ -97,13 +98,13 @@ async def handle_pinterest_callback(callback_query: CallbackQuery):
 
     await callback_query.answer(_("extracting"))
 
-    session = user_sessions.get(user_id)
+    session = await user_sessions.get(user_id)
     if not session or not session.get("video_path"):
         await callback_query.message.answer(_("session_expired"))
         return
 
     try:
-        audio_path = extract_audio_from_video(session["video_path"])
+        audio_path = await extract_audio_from_video(session["video_path"])
         if not audio_path or not Path(audio_path).exists():
             await callback_query.message.answer(_("extract_failed"))
             return
@@ -152,4 +153,4 @@ async def handle_pinterest_callback(callback_query: CallbackQuery):
             _("recognition_error") + f": {str(e)[:100]}"
         )
 
-    user_sessions.pop(user_id, None)
+    await user_sessions.pop(user_id)
@@ -12,7 +12,8 @@ from aiogram.utils.i18n import gettext as _
 from app.bot.controller.shorts_controller import YouTubeShortsController
 from app.bot.extensions.clear import atomic_clear
 from app.bot.handlers.statistics_handler import update_statistics
-from app.bot.handlers.user_handlers import remove_token
+from app.bot.handlers.job_handler import enqueue_download
+from app.bot.handlers.quota_handler import reserve_quota
 from app.bot.handlers.youtube_handler import download_video_from_youtube_with_quality
 from app.bot.keyboards.general_buttons import get_music_download_button
 from app.bot.keyboards.payment_keyboard import get_payment_keyboard
@@ -22,12 +23,16 @@ from app.bot.routers.music_router import (
     format_page_text,
     get_controller,
 )
-from app.bot.state.session_store import user_sessions
+from app.bot.state.session_store import session_store
 from app.core.extensions.utils import WORKDIR
 from app.core.utils.audio import extract_audio_from_video
+from app.core.monitoring.tracing import media_stage
+from app.core.settings.config import get_settings, Settings
 
 shorts_router = Router()
 logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+user_sessions = session_store.namespace("shorts")
 
 
 def extract_youtube_url(text: str) -> str:
@@ -87,8 +92,8 @@ def get_youtube_quality_keyboard(video_id: str) -> InlineKeyboardMarkup:
     | F.text.contains("youtu.be")
 )
 async def handle_youtube_link(message: Message):
-    res = await remove_token(message)
-    if not res:
+    reservation = await reserve_quota(message.from_user.id)
+    if not reservation:
         await message.answer(
             _("No requests left. Please top up your balance or invite friends."),
             reply_markup=get_payment_keyboard(),
@@ -97,11 +102,13 @@ async def handle_youtube_link(message: Message):
 
     url = extract_youtube_url(message.text or "")
     if not url:
+        await reservation.refund()
         await message.answer(_("invalid_url"))
         return
 
     video_id = extract_youtube_video_id(url)
     if not video_id:
+        await reservation.refund()
         await message.answer(_("invalid_url"))
         return
 
@@ -112,30 +119,40 @@ async def handle_youtube_link(message: Message):
         )
         return
 
+    if settings.USE_JOB_QUEUE:
+        await enqueue_download(
+            message, [url], statistics_field="from_shorts", quota=reservation
+        )
+        return
+
     progress_message = await message.answer(_("shorts_loading"))
 
     user_id = message.from_user.id
-    user_sessions[user_id] = {"url": url}
+    await user_sessions.set(user_id, {"url": url})
 
     controller = YouTubeShortsController(WORKDIR.parent / "media" / "youtube_shorts")
     try:
-        video_path = await asyncio.wait_for(controller.download_video(url), timeout=75)
+        with media_stage(platform="shorts", stage="download"):
+            video_path = await asyncio.wait_for(controller.download_video(url), timeout=75)
         if not video_path:
+            await reservation.refund()
             await message.answer(_("shorts_no_files"))
             return
 
-        user_sessions[user_id]["video_path"] = video_path
+        await user_sessions.update(user_id, video_path=video_path)
 
-        await message.answer_video(
-            FSInputFile(video_path),
-            caption=_("shorts_video_ready"),
-            reply_markup=get_music_download_button("shorts"),
-            supports_streaming=True,
-        )
+        with media_stage(platform="shorts", stage="upload"):
+            await message.answer_video(
+                FSInputFile(video_path),
+                caption=_("shorts_video_ready"),
+                reply_markup=get_music_download_button("shorts"),
+                supports_streaming=True,
+            )
 
         await update_statistics(user_id, field="from_shorts")
 
     except Exception as e:
+        await reservation.refund()
         error_text = str(e).lower()
         if (
             "not available on this app" in error_text
@@ -178,21 +195,23 @@ async def handle_youtube_quality_choice(callback_query: CallbackQuery):
     )
 
     try:
-        file_path = await download_video_from_youtube_with_quality(
-            video_id=video_id,
-            title=f"youtube_{video_id}",
-            quality=quality,
-        )
+        with media_stage(platform="youtube", stage="download"):
+            file_path = await download_video_from_youtube_with_quality(
+                video_id=video_id,
+                title=f"youtube_{video_id}",
+                quality=quality,
+            )
 
         if not file_path or not Path(file_path).exists() or Path(file_path).stat().st_size <= 1000:
             await status.edit_text("Video yuklab bo'lmadi. Boshqa sifatni sinab ko'ring.")
             return
 
-        await callback_query.message.answer_video(
-            FSInputFile(file_path),
-            caption=f"YouTube video tayyor ({quality}p)",
-            supports_streaming=True,
-        )
+        with media_stage(platform="youtube", stage="upload"):
+            await callback_query.message.answer_video(
+                FSInputFile(file_path),
+                caption=f"YouTube video tayyor ({quality}p)",
+                supports_streaming=True,
+            )
         await update_statistics(callback_query.from_user.id, field="from_youtube")
 
         await atomic_clear(file_path)
@@ -209,7 +228,7 @@ async def handle_shorts_music(callback_query: CallbackQuery):
     from app.bot.handlers import shazam_handler as shz
 
     user_id = callback_query.from_user.id
-    session = user_sessions.get(user_id)
+    session = await user_sessions.get(user_id)
 
     if not session or not session.get("video_path"):
         await callback_query.message.answer(_("session_expired"))
@@ -217,7 +236,7 @@ async def handle_shorts_music(callback_query: CallbackQuery):
 
     try:
         video_path = session["video_path"]
-        audio_path = extract_audio_from_video(video_path)
+        audio_path = await extract_audio_from_video(video_path)
 
         if not audio_path:
             await callback_query.message.answer(_("extract_failed"))
@@ -266,4 +285,4 @@ async def handle_shorts_music(callback_query: CallbackQuery):
         logger.exception("Shorts Shazam xatolik:")
         await callback_query.message.answer(_("recognition_error") + f": {str(e)}")
 
-    user_sessions.pop(user_id, None)
+    await user_sessions.pop(user_id)
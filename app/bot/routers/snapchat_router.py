@@ -10,7 +10,8 @@ from app.bot.handlers.snapchat_handler import download_snapchat_media
 from app.bot.extensions.clear import atomic_clear
 from app.bot.handlers.statistics_handler import update_statistics
 from app.bot.handlers import shazam_handler as shz
-from app.bot.handlers.user_handlers import remove_token
+from app.bot.handlers.job_handler import enqueue_download
+from app.bot.handlers.quota_handler import reserve_quota
 from app.bot.keyboards.payment_keyboard import get_payment_keyboard
 from app.bot.routers.music_router import (
     get_controller,
@@ -19,19 +20,21 @@ from app.bot.routers.music_router import (
     _cache,
 )
 from app.bot.keyboards.general_buttons import get_music_download_button
+from app.bot.state.session_store import session_store
+from app.core.monitoring.tracing import media_stage
 from app.core.settings.config import get_settings, Settings
 from app.core.utils.audio import extract_audio_from_video
 
 settings: Settings = get_settings()
 snapchat_router = Router()
 logger = logging.getLogger(__name__)
-user_sessions = {}
+user_sessions = session_store.namespace("snapchat")
 
 
 @snapchat_router.message(F.text.contains("snapchat.com"))
 async def handle_snapchat_link(message: Message):
-    res = await remove_token(message)
-    if not res:
+    reservation = await reserve_quota(message.from_user.id)
+    if not reservation:
         await message.answer(
             _(
                 "No requests left. Please top up your balance or invite friends."
@@ -44,27 +47,37 @@ async def handle_snapchat_link(message: Message):
 
     user_id = message.from_user.id
     url = message.text.strip()
-    user_sessions[user_id] = {"url": url}
+    if settings.USE_JOB_QUEUE:
+        await enqueue_download(
+            message, [url], statistics_field="from_snapchat", quota=reservation
+        )
+        return
+
+    await user_sessions.set(user_id, {"url": url})
 
     try:
-        file_path = await download_snapchat_media(url)
+        with media_stage(platform="snapchat", stage="download"):
+            file_path = await download_snapchat_media(url)
         if not file_path or not Path(file_path).exists():
+            await reservation.refund()
             await message.answer(_("snapchat_download_failed"))
             return
 
-        user_sessions[user_id]["video_path"] = file_path
+        await user_sessions.update(user_id, video_path=file_path)
 
-        await message.answer_video(
-            FSInputFile(file_path),
-            caption=_("snapchat_video_ready"),
-            reply_markup=get_music_download_button("snapchat"),
-            supports_streaming=True,
-        )
+        with media_stage(platform="snapchat", stage="upload"):
+            await message.answer_video(
+                FSInputFile(file_path),
+                caption=_("snapchat_video_ready"),
+                reply_markup=get_music_download_button("snapchat"),
+                supports_streaming=True,
+            )
 
         await update_statistics(user_id, field="from_snapchat")
 
     except Exception as e:
         logger.error(f"Snapchat download error: {e}")
+        await reservation.refund()
         await message.answer(_("snapchat_download_error"))
 
 
@@ -79,13 +92,13 @@ async def handle_snapchat_callback(callback_query: CallbackQuery):
 
     await callback_query.answer(_("extracting"))
 
-    session = user_sessions.get(user_id)
+    session = await user_sessions.get(user_id)
     if not session or not session.get("video_path"):
         await callback_query.message.answer(_("session_expired"))
         return
 
     try:
-        audio_path = extract_audio_from_video(session["video_path"])
+        audio_path = await extract_audio_from_video(session["video_path"])
         if not audio_path or not Path(audio_path).exists():
             await callback_query.message.answer(_("extract_failed"))
             return
@@ -134,4 +147,4 @@ async def handle_snapchat_callback(callback_query: CallbackQuery):
             _("recognition_error") + f": {str(e)[:100]}"
         )
 
-    user_sessions.pop(user_id, None)
+    await user_sessions.pop(user_id)
@@ -7,7 +7,8 @@ from aiogram import Router, F
 from aiogram.types import Message, FSInputFile, CallbackQuery
 from aiogram.utils.i18n import gettext as _
 
-from app.bot.handlers.user_handlers import remove_token
+from app.bot.handlers.job_handler import enqueue_download
+from app.bot.handlers.quota_handler import reserve_quota
 from app.bot.keyboards.payment_keyboard import get_payment_keyboard
 from app.core.utils.audio import extract_audio_from_video
 from app.bot.controller.threads_controller import ThreadsController
@@ -21,10 +22,14 @@ from app.bot.routers.music_router import (
 from app.bot.keyboards.general_buttons import get_music_download_button
 from app.bot.handlers.statistics_handler import update_statistics
 from app.bot.extensions.clear import atomic_clear
+from app.bot.state.session_store import session_store
+from app.core.monitoring.tracing import media_stage
+from app.core.settings.config import get_settings, Settings
 
 threads_router = Router()
 logger = logging.getLogger(__name__)
-user_sessions = {}
+settings: Settings = get_settings()
+user_sessions = session_store.namespace("threads")
 
 
 # URL ajratish
@@ -43,8 +48,8 @@ def extract_threads_url(text: str) -> str:
 
 @threads_router.message(F.text.contains("threads.com"))
 async def handle_threads_link(message: Message):
-    res = await remove_token(message)
-    if not res:
+    reservation = await reserve_quota(message.from_user.id)
+    if not reservation:
         await message.answer(
             _(
                 "No requests left. Please top up your balance or invite friends."
@@ -54,46 +59,60 @@ async def handle_threads_link(message: Message):
         return
     url = extract_threads_url(message.text)
     if not url:
+        await reservation.refund()
         await message.answer(_("threads_invalid_url"))
         return
 
+    if settings.USE_JOB_QUEUE:
+        await enqueue_download(
+            message, [url], statistics_field="from_threads", quota=reservation
+        )
+        return
+
     await message.answer(_("threads_loading"))
 
     user_id = message.from_user.id
-    user_sessions[user_id] = {"url": url}
+    await user_sessions.set(user_id, {"url": url})
 
     controller = ThreadsController(Path.cwd().parent / "media" / "threads")
     try:
-        result = await controller.download_media(url)
+        with media_stage(platform="threads", stage="download"):
+            result = await controller.download_media(url)
         if not result["success"]:
+            await reservation.refund()
             await message.answer(result["message"])
             return
 
         files = result["downloaded_files"]
         if not files:
+            await reservation.refund()
             await message.answer(_("threads_no_files"))
             return
 
         video_file = next((f for f in files if f["type"] == "video"), None)
         if not video_file:
+            await reservation.refund()
             await message.answer(_("threads_no_files"))
             return
 
         video_path = Path(video_file["path"])
         if not video_path.exists():
+            await reservation.refund()
             await message.answer(_("threads_no_files"))
             return
 
-        user_sessions[user_id]["video_path"] = str(video_path)
+        await user_sessions.update(user_id, video_path=str(video_path))
 
-        await message.answer_video(
-            FSInputFile(video_path),
-            caption=_("threads_video_ready"),
-            reply_markup=get_music_download_button("threads"),
-        )
+        with media_stage(platform="threads", stage="upload"):
+            await message.answer_video(
+                FSInputFile(video_path),
+                caption=_("threads_video_ready"),
+                reply_markup=get_music_download_button("threads"),
+            )
 
     except Exception as e:
         logger.exception("Threads download error")
+        await reservation.refund()
         await message.answer(_("threads_error") + f"\n{e}")
     finally:
         controller.close()
@@ -105,14 +124,14 @@ async def handle_threads_callback(callback_query: CallbackQuery):
     await callback_query.answer(_("extracting"))
 
     user_id = callback_query.from_user.id
-    session = user_sessions.get(user_id)
+    session = await user_sessions.get(user_id)
     if not session or not session.get("video_path"):
         await callback_query.message.answer(_("session_expired"))
         return
 
     try:
         video_path = session["video_path"]
-        audio_path = extract_audio_from_video(
+        audio_path = await extract_audio_from_video(
             video_path
         )  # Use same smart extract method
 
@@ -163,4 +182,4 @@ async def handle_threads_callback(callback_query: CallbackQuery):
         logger.exception("Threads music recognition error")
         await callback_query.message.answer(_("recognition_error") + f": {str(e)}")
 
-    user_sessions.pop(user_id, None)
+    await user_sessions.pop(user_id)
@@ -12,7 +12,8 @@ from app.bot.handlers.tiktok_handler import (
     extract_audio_from_tiktok_video_smart,
 )
 from app.bot.handlers import shazam_handler as shz
-from app.bot.handlers.user_handlers import remove_token
+from app.bot.handlers.job_handler import enqueue_download
+from app.bot.handlers.quota_handler import reserve_quota
 from app.bot.keyboards.payment_keyboard import get_payment_keyboard
 from app.bot.routers.music_router import (
     get_controller,
@@ -21,17 +22,19 @@ from app.bot.routers.music_router import (
     _cache,
 )
 from app.bot.keyboards.general_buttons import get_music_download_button
+from app.bot.state.session_store import session_store
+from app.core.monitoring.tracing import media_stage
 from app.core.settings.config import get_settings, Settings
 
 settings: Settings = get_settings()
 tiktok_router = Router()
-user_sessions = {}
+user_sessions = session_store.namespace("tiktok")
 
 
 @tiktok_router.message(F.text.contains("tiktok.com"))
 async def handle_tiktok_link(message: Message):
-    res = await remove_token(message)
-    if not res:
+    reservation = await reserve_quota(message.from_user.id)
+    if not reservation:
         await message.answer(
             _(
                 "No requests left. Please top up your balance or invite friends."
@@ -44,20 +47,29 @@ async def handle_tiktok_link(message: Message):
 
     user_id = message.from_user.id
     tiktok_url = validate_tiktok_url(message.text)
-    user_sessions[user_id] = {"url": tiktok_url}
+    if settings.USE_JOB_QUEUE:
+        await enqueue_download(
+            message, [tiktok_url], statistics_field="from_tiktok", quota=reservation
+        )
+        return
+
+    await user_sessions.set(user_id, {"url": tiktok_url})
     try:
-        video_path = await get_tiktok_video(tiktok_url)
-        user_sessions[user_id]["video_path"] = video_path
+        with media_stage(platform="tiktok", stage="download"):
+            video_path = await get_tiktok_video(tiktok_url)
+        await user_sessions.update(user_id, video_path=video_path)
 
-        await message.answer_video(
-            FSInputFile(video_path),
-            caption=_("tiktok_video_ready"),
-            reply_markup=get_music_download_button("tiktok"),
-        )
+        with media_stage(platform="tiktok", stage="upload"):
+            await message.answer_video(
+                FSInputFile(video_path),
+                caption=_("tiktok_video_ready"),
+                reply_markup=get_music_download_button("tiktok"),
+            )
 
         await atomic_clear(video_path)
 
     except Exception as e:
+        await reservation.refund()
         await message.answer(_("download_failed") + f": {e}")
     await update_statistics(user_id, field="from_tiktok")
 
@@ -73,7 +85,7 @@ async def handle_tiktok_callback(callback_query: CallbackQuery):
 
     await callback_query.answer(_("extracting"))
 
-    session = user_sessions.get(user_id)
+    session = await user_sessions.get(user_id)
     if not session or not session.get("url"):
         await callback_query.message.answer(_("session_expired"))
         return
@@ -129,4 +141,4 @@ async def handle_tiktok_callback(callback_query: CallbackQuery):
             _("recognition_error") + f": {str(e)[:100]}"
         )
 
-    user_sessions.pop(user_id, None)
+    await user_sessions.pop(user_id)
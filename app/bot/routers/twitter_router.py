@@ -10,7 +10,8 @@ from aiogram.utils.i18n import gettext as _
 from app.bot.controller.twitter_controller import TwitterController
 from app.bot.handlers import shazam_handler as shz
 from app.bot.handlers.twitter_handler import TwitterHandler
-from app.bot.handlers.user_handlers import remove_token
+from app.bot.handlers.job_handler import enqueue_download
+from app.bot.handlers.quota_handler import reserve_quota
 from app.bot.keyboards.payment_keyboard import get_payment_keyboard
 from app.core.utils.audio import extract_audio_from_video
 from app.bot.extensions.clear import atomic_clear
@@ -22,8 +23,11 @@ from app.bot.routers.music_router import (
 )
 from app.bot.keyboards.general_buttons import get_music_download_button
 from app.bot.handlers.statistics_handler import update_statistics
+from app.core.monitoring.tracing import media_stage
+from app.core.settings.config import get_settings, Settings
 
 logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
 twitter_router = Router()
 controller = TwitterController(Path.cwd().parent / "media" / "twitter")
 twitter_handler = TwitterHandler()
@@ -36,8 +40,8 @@ def extract_twitter_url(text: str) -> str:
 
 @twitter_router.message(F.text.contains("twitter.com") | F.text.contains("x.com"))
 async def handle_twitter_message(message: Message):
-    res = await remove_token(message)
-    if not res:
+    reservation = await reserve_quota(message.from_user.id)
+    if not reservation:
         await message.answer(
             _(
                 "No requests left. Please top up your balance or invite friends."
@@ -51,15 +55,24 @@ async def handle_twitter_message(message: Message):
     user_id = message.from_user.id
     url = extract_twitter_url(message.text)
     if not url:
+        await reservation.refund()
         await message.answer(_("twitter_invalid_url"))
         return
 
-    twitter_handler.get_sessions()[user_id] = {"url": url}
+    if settings.USE_JOB_QUEUE:
+        await enqueue_download(
+            message, [url], statistics_field="from_twitter", quota=reservation
+        )
+        return
+
+    await twitter_handler.get_sessions().set(user_id, {"url": url})
 
     try:
-        result = await controller.download_media(url)
+        with media_stage(platform="twitter", stage="download"):
+            result = await controller.download_media(url)
 
         if not result["success"] or not result["downloaded_files"]:
+            await reservation.refund()
             await message.answer(result["message"])
             return
 
@@ -67,26 +80,30 @@ async def handle_twitter_message(message: Message):
             (f for f in result["downloaded_files"] if f["type"] == "video"), None
         )
         if not video:
+            await reservation.refund()
             await message.answer(_("twitter_no_files"))
             return
 
         video_path = Path(video["path"])
         if not video_path.exists():
+            await reservation.refund()
             await message.answer(_("twitter_no_files"))
             return
 
-        twitter_handler.get_sessions()[user_id]["video_path"] = str(video_path)
+        await twitter_handler.get_sessions().update(user_id, video_path=str(video_path))
 
-        await message.answer_video(
-            FSInputFile(video_path),
-            caption=_("twitter_video_ready"),
-            reply_markup=get_music_download_button("twitter"),
-        )
+        with media_stage(platform="twitter", stage="upload"):
+            await message.answer_video(
+                FSInputFile(video_path),
+                caption=_("twitter_video_ready"),
+                reply_markup=get_music_download_button("twitter"),
+            )
 
         await atomic_clear(video_path)
 
     except Exception as e:
         logger.exception("Twitter download error")
+        await reservation.refund()
         await message.answer(_("twitter_error") + f"\n{e}")
     await update_statistics(user_id, field="from_twitter")
 
@@ -96,13 +113,13 @@ async def handle_twitter_callback(callback_query: CallbackQuery):
     await callback_query.answer(_("extracting"))
     user_id = callback_query.from_user.id
 
-    session = twitter_handler.get_sessions().get(user_id)
+    session = await twitter_handler.get_sessions().get(user_id)
     if not session or not session.get("video_path"):
         await callback_query.message.answer(_("session_expired"))
         return
 
     try:
-        audio_path = extract_audio_from_video(session["video_path"])
+        audio_path = await extract_audio_from_video(session["video_path"])
         if not audio_path:
             await callback_query.message.answer(_("extract_failed"))
             return
@@ -151,4 +168,4 @@ async def handle_twitter_callback(callback_query: CallbackQuery):
         await callback_query.message.answer(_("recognition_error") + f": {str(e)}")
 
     finally:
-        twitter_handler.pop_session(user_id)
+        await twitter_handler.pop_session(user_id)
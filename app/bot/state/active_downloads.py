@@ -0,0 +1,68 @@
+"""
+Group downloads in flight, so the "Bekor qilish" button can stop them.
+
+Each download runs in its own task under an id that the button carries as
+``cancel_download:<id>``. Cancelling the task reaches whatever it awaits:
+yt-dlp jobs stop at their next progress hook, HTTP downloads and ffmpeg runs
+are aborted, browser sessions are closed::
+
+    job_id = active_downloads.new_id()
+    finished = await active_downloads.run(job_id, user_id, process(...))
+
+The registry is per process. With ``USE_JOB_QUEUE`` the button carries the
+queued job's id instead, and the worker running it stops it.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable
+from uuid import uuid4
+
+
+@dataclass
+class _Download:
+    task: asyncio.Future
+    owner: int
+    cancelled: bool = False
+
+
+class ActiveDownloads:
+    def __init__(self) -> None:
+        self._downloads: dict[str, _Download] = {}
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid4().hex[:12]
+
+    async def run(self, job_id: str, owner: int, work: Awaitable) -> bool:
+        """
+        Runs ``work`` until it is done or cancelled with ``cancel``. Returns
+        ``False`` when it was cancelled.
+        """
+        download = _Download(asyncio.ensure_future(work), owner)
+        self._downloads[job_id] = download
+        try:
+            await download.task
+        except asyncio.CancelledError:
+            if not download.cancelled:
+                raise
+            return False
+        finally:
+            self._downloads.pop(job_id, None)
+        return True
+
+    def owner(self, job_id: str) -> int | None:
+        download = self._downloads.get(job_id)
+        return download.owner if download else None
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels the download; ``False`` when it already finished."""
+        download = self._downloads.get(job_id)
+        if download is None or download.task.done():
+            return False
+        download.cancelled = True
+        download.task.cancel()
+        return True
+
+
+active_downloads = ActiveDownloads()
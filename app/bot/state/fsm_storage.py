@@ -0,0 +1,63 @@
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from app.bot.state.session_store import SessionStore
+
+
+class SessionFSMStorage(BaseStorage):
+    """
+    aiogram FSM storage on top of ``SessionStore``, so FSM state lives in the
+    same backend (and obeys the same limits) as the router sessions.
+    """
+
+    namespace = "fsm"
+
+    def __init__(self, store: SessionStore, ttl: int) -> None:
+        self.store = store
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return ":".join(
+            str(part)
+            for part in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id or "",
+                key.business_connection_id or "",
+                key.destiny,
+            )
+        )
+
+    async def _get(self, key: StorageKey) -> dict:
+        return await self.store.backend.get(self.namespace, self._key(key)) or {}
+
+    async def _set(self, key: StorageKey, entry: dict) -> None:
+        if entry.get("state") is None and not entry.get("data"):
+            await self.store.backend.delete(self.namespace, self._key(key))
+            return
+        await self.store.backend.set(
+            self.namespace, self._key(key), key.user_id, entry, self.ttl
+        )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._get(key)
+        entry["state"] = state.state if isinstance(state, State) else state
+        await self._set(key, entry)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._get(key)).get("state")
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        entry = await self._get(key)
+        entry["data"] = dict(data)
+        await self._set(key, entry)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict((await self._get(key)).get("data") or {})
+
+    async def close(self) -> None:
+        pass
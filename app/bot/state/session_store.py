@@ -1,2 +1,266 @@
-user_sessions = {}
-user_sessions_twitter = {}
+"""
+Per-user session storage shared by all routers and the FSM.
+
+Routers keep short-lived state (the last link a user sent, the downloaded
+video path) between a message and its follow-up callback. Every router gets
+its own namespace of one ``SessionStore``:
+
+    user_sessions = session_store.namespace("tiktok")
+    await user_sessions.set(user_id, {"url": url})
+    session = await user_sessions.get(user_id)
+
+Entries expire after ``SESSION_TTL`` seconds and each user holds at most
+``SESSION_MAX_PER_USER`` entries across namespaces; the least recently used
+ones are evicted first. ``SESSION_BACKEND=postgres`` keeps sessions in the
+database so that several bot processes can share them.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from app.core.settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class SessionBackend(ABC):
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> Any | None: ...
+
+    @abstractmethod
+    async def set(
+        self, namespace: str, key: str, owner: int, value: Any, ttl: int
+    ) -> None: ...
+
+    @abstractmethod
+    async def delete(self, namespace: str, key: str) -> Any | None: ...
+
+    @abstractmethod
+    async def purge_expired(self) -> int: ...
+
+
+class MemorySessionBackend(SessionBackend):
+    """Process-local LRU with TTL, a per-user cap and a global cap."""
+
+    def __init__(self, max_per_user: int, max_entries: int) -> None:
+        self.max_per_user = max_per_user
+        self.max_entries = max_entries
+        # (namespace, key) -> (owner, expires_at, value), oldest first
+        self._entries: OrderedDict[tuple[str, str], tuple[int, float, Any]] = (
+            OrderedDict()
+        )
+        self._by_owner: dict[int, OrderedDict[tuple[str, str], None]] = {}
+
+    async def get(self, namespace: str, key: str) -> Any | None:
+        entry_key = (namespace, key)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        owner, expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(entry_key)
+            return None
+        self._entries.move_to_end(entry_key)
+        self._by_owner[owner].move_to_end(entry_key)
+        return value
+
+    async def set(
+        self, namespace: str, key: str, owner: int, value: Any, ttl: int
+    ) -> None:
+        entry_key = (namespace, key)
+        if entry_key in self._entries:
+            self._remove(entry_key)
+        self._entries[entry_key] = (owner, time.monotonic() + ttl, value)
+        owned = self._by_owner.setdefault(owner, OrderedDict())
+        owned[entry_key] = None
+
+        while len(owned) > self.max_per_user:
+            self._remove(next(iter(owned)))
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    async def delete(self, namespace: str, key: str) -> Any | None:
+        entry_key = (namespace, key)
+        if entry_key not in self._entries:
+            return None
+        _, expires_at, value = self._entries[entry_key]
+        self._remove(entry_key)
+        return value if expires_at >= time.monotonic() else None
+
+    async def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [k for k, (_, exp, _) in self._entries.items() if exp < now]
+        for entry_key in expired:
+            self._remove(entry_key)
+        return len(expired)
+
+    def _remove(self, entry_key: tuple[str, str]) -> None:
+        owner, _, _ = self._entries.pop(entry_key)
+        owned = self._by_owner.get(owner)
+        if owned is not None:
+            owned.pop(entry_key, None)
+            if not owned:
+                del self._by_owner[owner]
+
+
+class PostgresSessionBackend(SessionBackend):
+    """Sessions in the ``user_sessions`` table, shared by every bot process."""
+
+    async def get(self, namespace: str, key: str) -> Any | None:
+        from app.bot.models import UserSession
+        from app.core.databases.postgres import get_general_session
+
+        async with get_general_session() as session:
+            result = await session.execute(
+                select(UserSession.data).where(
+                    UserSession.namespace == namespace,
+                    UserSession.key == key,
+                    UserSession.expires_at > datetime.now(),
+                )
+            )
+            return result.scalar_one_or_none()
+
+    async def set(
+        self, namespace: str, key: str, owner: int, value: Any, ttl: int
+    ) -> None:
+        from app.bot.models import UserSession
+        from app.core.databases.postgres import get_general_session
+
+        now = datetime.now()
+        data = json.loads(json.dumps(value, default=str))
+        stmt = insert(UserSession).values(
+            namespace=namespace,
+            key=key,
+            owner=owner,
+            data=data,
+            expires_at=now + timedelta(seconds=ttl),
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserSession.namespace, UserSession.key],
+            set_={
+                "owner": stmt.excluded.owner,
+                "data": stmt.excluded.data,
+                "expires_at": stmt.excluded.expires_at,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        # keep only the user's most recently used entries
+        newest = (
+            select(UserSession.id)
+            .where(UserSession.owner == owner)
+            .order_by(UserSession.updated_at.desc())
+            .limit(settings.SESSION_MAX_PER_USER)
+        )
+        trim = delete(UserSession).where(
+            UserSession.owner == owner, UserSession.id.not_in(newest.scalar_subquery())
+        )
+        async with get_general_session() as session:
+            await session.execute(stmt)
+            await session.execute(trim)
+            await session.commit()
+
+    async def delete(self, namespace: str, key: str) -> Any | None:
+        from app.bot.models import UserSession
+        from app.core.databases.postgres import get_general_session
+
+        async with get_general_session() as session:
+            result = await session.execute(
+                delete(UserSession)
+                .where(UserSession.namespace == namespace, UserSession.key == key)
+                .returning(UserSession.data, UserSession.expires_at)
+            )
+            row = result.one_or_none()
+            await session.commit()
+        if row is None or row.expires_at <= datetime.now():
+            return None
+        return row.data
+
+    async def purge_expired(self) -> int:
+        from app.bot.models import UserSession
+        from app.core.databases.postgres import get_general_session
+
+        async with get_general_session() as session:
+            result = await session.execute(
+                delete(UserSession).where(UserSession.expires_at <= func.now())
+            )
+            await session.commit()
+            return result.rowcount
+
+
+class SessionNamespace:
+    """Sessions of one router, keyed by Telegram user id."""
+
+    def __init__(self, store: "SessionStore", name: str) -> None:
+        self.store = store
+        self.name = name
+
+    async def get(self, user_id: int) -> dict | None:
+        return await self.store.backend.get(self.name, str(user_id))
+
+    async def set(self, user_id: int, data: dict) -> None:
+        await self.store.backend.set(
+            self.name, str(user_id), user_id, data, self.store.ttl
+        )
+
+    async def update(self, user_id: int, **fields) -> dict:
+        """Merges ``fields`` into the session, creating it if needed."""
+        data = dict(await self.get(user_id) or {})
+        data.update(fields)
+        await self.set(user_id, data)
+        return data
+
+    async def pop(self, user_id: int) -> dict | None:
+        return await self.store.backend.delete(self.name, str(user_id))
+
+
+class SessionStore:
+    def __init__(self, backend: SessionBackend, ttl: int) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self._janitor: asyncio.Task | None = None
+
+    def namespace(self, name: str) -> SessionNamespace:
+        return SessionNamespace(self, name)
+
+    async def start(self) -> None:
+        if self._janitor is None or self._janitor.done():
+            self._janitor = asyncio.create_task(self._purge_loop())
+
+    async def stop(self) -> None:
+        if self._janitor is not None:
+            self._janitor.cancel()
+            self._janitor = None
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.ttl / 4, 60))
+            try:
+                purged = await self.backend.purge_expired()
+                if purged:
+                    logger.debug(f"Purged {purged} expired sessions")
+            except Exception as e:
+                logger.error(f"Session purge failed: {e}")
+
+
+def create_backend() -> SessionBackend:
+    if settings.SESSION_BACKEND == "postgres":
+        return PostgresSessionBackend()
+    return MemorySessionBackend(
+        max_per_user=settings.SESSION_MAX_PER_USER,
+        max_entries=settings.SESSION_MAX_ENTRIES,
+    )
+
+
+session_store = SessionStore(create_backend(), ttl=settings.SESSION_TTL)
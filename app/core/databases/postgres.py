@@ -2,6 +2,7 @@ from contextlib import asynccontextmanager
 from functools import cache
 from typing import AsyncGenerator
 
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -15,6 +16,9 @@ settings: Settings = get_settings()
 
 @cache
 def get_async_engine():
+    if settings.DATABASE_URL:
+        # PostgreSQL-only statements (upserts, FOR UPDATE) won't run elsewhere
+        return create_async_engine(settings.DATABASE_URL, future=True, echo=False)
     return create_async_engine(
         settings.get_async_postgres_url(),
         pool_size=3,
@@ -24,6 +28,17 @@ def get_async_engine():
     )
 
 
+@cache
+def get_sync_engine() -> Engine:
+    """Blocking engine for work that runs outside the event loop (exports)."""
+    return create_engine(
+        settings.get_sync_postgres_url(),
+        pool_size=1,
+        max_overflow=1,
+        pool_pre_ping=True,
+    )
+
+
 @cache
 def get_session_maker() -> async_sessionmaker[AsyncSession]:
     return async_sessionmaker(
@@ -5,3 +5,31 @@ class CookieType(Enum):
     INSTAGRAM = "instagram"
     YOUTUBE = "youtube"
     TIKTOK = "tiktok"
+
+
+class QuotaSource(Enum):
+    SUBSCRIPTION = "subscription"
+    FREE = "free"
+    TOKENS = "tokens"
+
+
+class BroadcastStatus(Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    # the files are being sent, it can no longer be cancelled
+    SENDING = "sending"
+    DONE = "done"
+    DEAD = "dead"
+    CANCELLED = "cancelled"
+
+
+class JobKind(Enum):
+    DOWNLOAD = "download"
+    TRANSCODE = "transcode"
+    RECOGNIZE = "recognize"
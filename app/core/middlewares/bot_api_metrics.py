@@ -0,0 +1,27 @@
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from app.core.monitoring.metrics import BOT_API_ERRORS, BOT_API_REQUESTS
+
+
+class BotAPIMetricsMiddleware(BaseRequestMiddleware):
+    """Counts outgoing Bot API requests and their failures by exception type."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = method.__api_method__
+        BOT_API_REQUESTS.inc(method=name)
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            BOT_API_ERRORS.inc(method=name, error=type(e).__name__)
+            raise
@@ -0,0 +1,45 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from app.core.monitoring.tracing import span, trace
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Opens the root span of every update (outer middleware on ``update``)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        chat = data.get("event_chat")
+        with trace(
+            f"update.{event.event_type}",
+            update_id=event.update_id,
+            user_id=user.id if user else None,
+            chat_id=chat.id if chat else None,
+        ):
+            return await handler(event, data)
+
+
+class BotAPITracingMiddleware(BaseRequestMiddleware):
+    """A ``telegram.<method>`` span around every Bot API request."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with span(f"telegram.{method.__api_method__}"):
+            return await make_request(bot, method)
@@ -0,0 +1,53 @@
+"""add denormalized referral count to users
+
+Revision ID: 3c7d2e9b41f0
+Revises: 8a2f1f0d9a7e
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c7d2e9b41f0"
+down_revision: Union[str, None] = "8a2f1f0d9a7e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column(
+            "referral_count",
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("0"),
+        ),
+    )
+    op.create_index(
+        op.f("ix_users_referral_count"), "users", ["referral_count"], unique=False
+    )
+    # backfill from the users each referrer has brought in
+    op.execute(
+        """
+        UPDATE users AS u
+        SET referral_count = r.cnt
+        FROM (
+            SELECT referred_by, COUNT(*) AS cnt
+            FROM users
+            WHERE referred_by IS NOT NULL
+            GROUP BY referred_by
+        ) AS r
+        WHERE u.tg_id = r.referred_by
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_users_referral_count"), table_name="users")
+    op.drop_column("users", "referral_count")
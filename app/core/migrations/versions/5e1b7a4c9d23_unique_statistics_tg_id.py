@@ -0,0 +1,61 @@
+"""unique statistics per user for bulk upserts
+
+Revision ID: 5e1b7a4c9d23
+Revises: 3c7d2e9b41f0
+Create Date: 2026-10-19 11:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e1b7a4c9d23"
+down_revision: Union[str, None] = "3c7d2e9b41f0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = (
+    "from_text",
+    "from_voice",
+    "from_youtube",
+    "from_tiktok",
+    "from_like",
+    "from_snapchat",
+    "from_instagram",
+    "from_twitter",
+    "from_video",
+)
+
+
+def upgrade() -> None:
+    # fold duplicate rows into the oldest one before adding the constraint
+    sums = ", ".join(f"{c} = d.{c}" for c in COUNTERS)
+    totals = ", ".join(f"SUM({c}) AS {c}" for c in COUNTERS)
+    op.execute(
+        f"""
+        UPDATE statistics AS s
+        SET {sums}
+        FROM (
+            SELECT tg_id, MIN(id) AS keep_id, {totals}
+            FROM statistics
+            GROUP BY tg_id
+            HAVING COUNT(*) > 1
+        ) AS d
+        WHERE s.tg_id = d.tg_id AND s.id = d.keep_id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM statistics AS s
+        USING statistics AS k
+        WHERE s.tg_id = k.tg_id AND s.id > k.id
+        """
+    )
+    op.create_unique_constraint("uq_statistics_tg_id", "statistics", ["tg_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_statistics_tg_id", "statistics", type_="unique")
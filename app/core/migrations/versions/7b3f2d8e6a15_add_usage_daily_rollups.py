@@ -0,0 +1,81 @@
+"""add daily usage rollups and users activity indexes
+
+Revision ID: 7b3f2d8e6a15
+Revises: 5e1b7a4c9d23
+Create Date: 2026-10-19 12:40:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b3f2d8e6a15"
+down_revision: Union[str, None] = "5e1b7a4c9d23"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "usage_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("platform", sa.String(length=32), nullable=False),
+        sa.Column("event", sa.String(length=32), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column("unique_users", sa.BigInteger(), nullable=False),
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("day", "platform", "event", name="uq_usage_daily_key"),
+    )
+    op.create_index(op.f("ix_usage_daily_id"), "usage_daily", ["id"], unique=False)
+    op.create_index(op.f("ix_usage_daily_day"), "usage_daily", ["day"], unique=False)
+
+    op.create_table(
+        "usage_daily_users",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("platform", sa.String(length=32), nullable=False),
+        sa.Column("event", sa.String(length=32), nullable=False),
+        sa.Column("tg_id", sa.BigInteger(), nullable=False),
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "day", "platform", "event", "tg_id", name="uq_usage_daily_users_key"
+        ),
+    )
+    op.create_index(
+        op.f("ix_usage_daily_users_id"), "usage_daily_users", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_usage_daily_users_day"), "usage_daily_users", ["day"], unique=False
+    )
+
+    op.create_index("ix_users_created_at", "users", ["created_at"], unique=False)
+    op.create_index(
+        op.f("ix_users_last_active"), "users", ["last_active"], unique=False
+    )
+
+    # seed signups so the admin growth numbers keep their history
+    op.execute(
+        """
+        INSERT INTO usage_daily (day, platform, event, count, unique_users)
+        SELECT created_at::date, 'bot', 'signup', COUNT(*), COUNT(*)
+        FROM users
+        WHERE created_at IS NOT NULL
+        GROUP BY created_at::date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_users_last_active"), table_name="users")
+    op.drop_index("ix_users_created_at", table_name="users")
+    op.drop_index(op.f("ix_usage_daily_users_day"), table_name="usage_daily_users")
+    op.drop_index(op.f("ix_usage_daily_users_id"), table_name="usage_daily_users")
+    op.drop_table("usage_daily_users")
+    op.drop_index(op.f("ix_usage_daily_day"), table_name="usage_daily")
+    op.drop_index(op.f("ix_usage_daily_id"), table_name="usage_daily")
+    op.drop_table("usage_daily")
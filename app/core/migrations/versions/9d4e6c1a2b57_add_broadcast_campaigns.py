@@ -0,0 +1,71 @@
+"""add broadcast campaigns and users.is_blocked
+
+Revision ID: 9d4e6c1a2b57
+Revises: 7b3f2d8e6a15
+Create Date: 2026-10-19 14:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4e6c1a2b57"
+down_revision: Union[str, None] = "7b3f2d8e6a15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column(
+            "is_blocked",
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.text("false"),
+        ),
+    )
+    op.create_index(op.f("ix_users_is_blocked"), "users", ["is_blocked"], unique=False)
+
+    op.create_table(
+        "broadcast_campaigns",
+        sa.Column("admin_id", sa.BigInteger(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("media_type", sa.String(length=16), nullable=True),
+        sa.Column("media_file_id", sa.String(), nullable=True),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("last_user_id", sa.BigInteger(), nullable=False),
+        sa.Column("total", sa.BigInteger(), nullable=False),
+        sa.Column("sent", sa.BigInteger(), nullable=False),
+        sa.Column("failed", sa.BigInteger(), nullable=False),
+        sa.Column("blocked", sa.BigInteger(), nullable=False),
+        sa.Column("progress_message_id", sa.BigInteger(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_broadcast_campaigns_id"), "broadcast_campaigns", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_broadcast_campaigns_status"),
+        "broadcast_campaigns",
+        ["status"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_broadcast_campaigns_status"), table_name="broadcast_campaigns"
+    )
+    op.drop_index(op.f("ix_broadcast_campaigns_id"), table_name="broadcast_campaigns")
+    op.drop_table("broadcast_campaigns")
+    op.drop_index(op.f("ix_users_is_blocked"), table_name="users")
+    op.drop_column("users", "is_blocked")
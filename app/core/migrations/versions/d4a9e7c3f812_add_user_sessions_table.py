@@ -0,0 +1,53 @@
+"""add user_sessions table for the session store
+
+Revision ID: d4a9e7c3f812
+Revises: b2c8f1e4d390
+Create Date: 2026-10-19 16:05:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a9e7c3f812"
+down_revision: Union[str, None] = "b2c8f1e4d390"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_sessions",
+        sa.Column("namespace", sa.String(length=32), nullable=False),
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("owner", sa.BigInteger(), nullable=False),
+        sa.Column("data", postgresql.JSONB(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("namespace", "key", name="uq_user_sessions_namespace_key"),
+    )
+    op.create_index(op.f("ix_user_sessions_id"), "user_sessions", ["id"], unique=False)
+    op.create_index(
+        "ix_user_sessions_owner_updated_at",
+        "user_sessions",
+        ["owner", "updated_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_user_sessions_expires_at", "user_sessions", ["expires_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_sessions_expires_at", table_name="user_sessions")
+    op.drop_index("ix_user_sessions_owner_updated_at", table_name="user_sessions")
+    op.drop_index(op.f("ix_user_sessions_id"), table_name="user_sessions")
+    op.drop_table("user_sessions")
@@ -0,0 +1,35 @@
+"""add a lease to broadcast campaigns
+
+Revision ID: e6b2a9d4c718
+Revises: d4a9e7c3f812
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e6b2a9d4c718"
+down_revision: Union[str, None] = "d4a9e7c3f812"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "broadcast_campaigns",
+        sa.Column("locked_by", sa.String(length=64), nullable=True),
+    )
+    op.add_column(
+        "broadcast_campaigns",
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("broadcast_campaigns", "locked_until")
+    op.drop_column("broadcast_campaigns", "locked_by")
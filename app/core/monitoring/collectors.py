@@ -0,0 +1,106 @@
+"""Collectors that refresh the on-demand gauges on every scrape."""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from app.core.extensions.utils import WORKDIR
+from app.core.monitoring.metrics import (
+    CACHE_ENTRIES,
+    DB_POOL_CONNECTIONS,
+    MEDIA_DISK_BYTES,
+    QUEUE_DEPTH,
+    add_collector,
+)
+
+MEDIA_DIR = WORKDIR.parent / "media"
+MEDIA_SCAN_INTERVAL = 60  # seconds; walking media/ on every scrape is wasteful
+
+_media_scanned_at = 0.0
+
+
+async def collect_queues() -> None:
+    from app.bot.handlers.job_handler import get_active_job_counts
+    from app.bot.handlers.statistics_handler import statistics_aggregator
+    from app.core.utils.transcoder import transcoder
+    from app.core.utils.ytdlp_pool import ytdlp_pool, ytdlp_search_pool
+
+    QUEUE_DEPTH.set(statistics_aggregator.pending_events, queue="statistics")
+    QUEUE_DEPTH.set(transcoder.waiting, queue="transcode")
+    QUEUE_DEPTH.set(transcoder.active, queue="transcode_running")
+    QUEUE_DEPTH.set(ytdlp_pool.waiting, queue="ytdlp")
+    QUEUE_DEPTH.set(ytdlp_pool.active, queue="ytdlp_running")
+    QUEUE_DEPTH.set(ytdlp_search_pool.waiting, queue="ytdlp_search")
+    QUEUE_DEPTH.set(ytdlp_search_pool.active, queue="ytdlp_search_running")
+    for status, count in (await get_active_job_counts()).items():
+        QUEUE_DEPTH.set(count, queue=f"jobs_{status}")
+
+
+async def collect_db_pool() -> None:
+    from app.core.databases.postgres import get_async_engine
+
+    pool = get_async_engine().pool
+    # only QueuePool keeps these counters, NullPool/StaticPool have none
+    if not hasattr(pool, "checkedout"):
+        return
+    DB_POOL_CONNECTIONS.set(pool.checkedout(), state="checked_out")
+    DB_POOL_CONNECTIONS.set(pool.checkedin(), state="idle")
+    DB_POOL_CONNECTIONS.set(max(pool.overflow(), 0), state="overflow")
+    DB_POOL_CONNECTIONS.set(pool.size(), state="pool_size")
+
+
+async def collect_caches() -> None:
+    from app.bot.handlers import shazam_handler, youtube_search
+    from app.core.utils import media
+
+    CACHE_ENTRIES.set(len(youtube_search._search_cache), cache="youtube_search")
+    CACHE_ENTRIES.set(len(shazam_handler._text_search_cache), cache="shazam_search")
+    CACHE_ENTRIES.set(len(media._probe_cache), cache="media_probe")
+
+
+def _directory_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                # cleaned up between listing and stat
+                continue
+    return total
+
+
+def _media_usage() -> dict[str, int]:
+    usage = {".": 0}
+    with os.scandir(MEDIA_DIR) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                usage[entry.name] = _directory_size(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                usage["."] += entry.stat().st_size
+    return usage
+
+
+async def collect_media_disk() -> None:
+    global _media_scanned_at
+    if time.monotonic() - _media_scanned_at < MEDIA_SCAN_INTERVAL:
+        return
+    _media_scanned_at = time.monotonic()
+    if not MEDIA_DIR.exists():
+        return
+    usage = await asyncio.to_thread(_media_usage)
+    # directories can disappear, don't keep reporting their last size
+    MEDIA_DISK_BYTES.clear()
+    for directory, size in usage.items():
+        MEDIA_DISK_BYTES.set(size, directory=directory)
+
+
+def register_default_collectors() -> None:
+    for collector in (
+        collect_queues,
+        collect_db_pool,
+        collect_caches,
+        collect_media_disk,
+    ):
+        add_collector(collector)
@@ -0,0 +1,310 @@
+"""
+Prometheus metrics without the client library.
+
+Metrics are module-level objects that the code updates in place::
+
+    with MEDIA_STAGE_SECONDS.time(platform="tiktok", stage="download"):
+        video_path = await get_tiktok_video(url)
+    CACHE_LOOKUPS.inc(cache="youtube_search", result="hit")
+
+Values that are cheaper to read on demand (queue depths, DB pool, disk usage)
+are refreshed by collectors that run on every scrape. ``render()`` returns the
+text exposition format served on ``GET /metrics``.
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+Collector = Callable[[], Awaitable[None]]
+
+# seconds; downloads and uploads of large videos take minutes
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    20,
+    40,
+    80,
+    160,
+    320,
+)
+COLLECTOR_TIMEOUT = 5  # seconds
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: "Registry | None" = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # yt-dlp and ffmpeg stages are timed from worker threads
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        return "\n".join([*header, *self.samples()])
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+        if not self.labelnames:
+            # unlabelled series are reported as 0 before their first update
+            self._values[()] = 0
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def clear(self) -> None:
+        """Drops every label set, for gauges rebuilt on each scrape."""
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._values: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or (
+                [0] * len(self.buckets),
+                0.0,
+                0,
+            )
+            if index < len(self.buckets):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observes the duration of the block, whether it raises or not."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        names = (*self.labelnames, "le")
+        with self._lock:
+            values = [
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in sorted(self._values.items())
+            ]
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                labels = _format_labels(names, (*key, _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(names, (*key, "+Inf"))
+            yield f"{self.name}_bucket{labels} {count}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Collector] = []
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Collector) -> None:
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def counter_values(self) -> dict[str, dict[tuple[str, ...], float]]:
+        """Counter values by metric, to carry a child process's increments home."""
+        values = {}
+        for name, metric in self._metrics.items():
+            if type(metric) is Counter:
+                with metric._lock:
+                    values[name] = dict(metric._values)
+        return values
+
+    def add_counter_values(
+        self, values: dict[str, dict[tuple[str, ...], float]]
+    ) -> None:
+        for name, series in values.items():
+            metric = self._metrics.get(name)
+            if type(metric) is not Counter:
+                continue
+            with metric._lock:
+                for key, amount in series.items():
+                    metric._values[key] = metric._values.get(key, 0) + amount
+
+    async def collect(self) -> None:
+        async def run(collector: Collector) -> None:
+            try:
+                await asyncio.wait_for(collector(), COLLECTOR_TIMEOUT)
+            except Exception as e:
+                # a broken collector must not take the whole scrape down
+                logger.warning(f"Metrics collector {collector.__name__} failed: {e}")
+
+        await asyncio.gather(*(run(collector) for collector in self._collectors))
+
+    async def render(self) -> str:
+        await self.collect()
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+MEDIA_STAGE_SECONDS = Histogram(
+    "media_stage_seconds",
+    "Time spent per platform in the download, transcode and upload stages.",
+    ("platform", "stage"),
+)
+YTDLP_ATTEMPTS = Counter(
+    "ytdlp_attempts_total",
+    "yt-dlp extraction attempts, one per client/cookie/format combination tried.",
+    ("platform",),
+)
+YTDLP_SUCCESSES = Counter(
+    "ytdlp_successes_total",
+    "Downloads that yt-dlp finished, the denominator of attempts per success.",
+    ("platform",),
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Search and recognition cache lookups by result (hit or miss).",
+    ("cache", "result"),
+)
+CACHE_ENTRIES = Gauge(
+    "cache_entries",
+    "Entries currently held by in-process caches.",
+    ("cache",),
+)
+BOT_API_REQUESTS = Counter(
+    "bot_api_requests_total",
+    "Bot API requests by method.",
+    ("method",),
+)
+BOT_API_ERRORS = Counter(
+    "bot_api_errors_total",
+    "Failed Bot API requests by method and exception type.",
+    ("method", "error"),
+)
+QUEUE_DEPTH = Gauge(
+    "queue_depth",
+    "Items waiting in internal queues (jobs by status, statistics buffer).",
+    ("queue",),
+)
+WORKER_ACTIVE_JOBS = Gauge(
+    "worker_active_jobs",
+    "Jobs currently executed by this worker process.",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections of the async SQLAlchemy pool by state.",
+    ("state",),
+)
+MEDIA_DISK_BYTES = Gauge(
+    "media_disk_bytes",
+    "Bytes used under media/ per top-level directory.",
+    ("directory",),
+)
+
+
+def add_collector(collector: Collector) -> None:
+    REGISTRY.add_collector(collector)
+
+
+async def render() -> str:
+    return await REGISTRY.render()
@@ -0,0 +1,367 @@
+"""
+Lightweight per-update tracing.
+
+``TracingMiddleware`` opens a root span for every update. Code further down
+opens child spans; the current span travels in a ``contextvars`` variable,
+so it follows ``await`` and ``asyncio.to_thread`` on its own::
+
+    with span("ffmpeg.transcode", path=str(source)):
+        ...
+
+    with media_stage("tiktok", "download"):  # span + latency histogram
+        video_path = await get_tiktok_video(url)
+
+Spans outside a trace are no-ops, so instrumented code costs a context
+variable lookup when tracing is off. Finished spans go to a rotating JSON
+lines file and, if ``TRACE_OTLP_ENDPOINT`` is set, to an OTLP/HTTP collector.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Iterator
+
+import aiohttp
+
+from app.core.extensions.utils import WORKDIR
+from app.core.monitoring.metrics import MEDIA_STAGE_SECONDS
+from app.core.settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SERVICE_NAME = "media-downloader-bot"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"[:500]
+        tracer.export(self)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["duration_ms"] = round(self.duration_ms, 3)
+        return data
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+class JsonFileExporter:
+    """One JSON object per finished span, in a size-rotated file."""
+
+    def __init__(self, path: Path, max_bytes: int, backups: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._logger = logging.getLogger(f"{__name__}.spans")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+        )
+        self._logger.addHandler(self._handler)
+
+    def export(self, span: Span) -> None:
+        self._logger.info(json.dumps(span.to_dict(), default=str))
+
+    async def shutdown(self) -> None:
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+def otlp_payload(spans: list[Span]) -> dict:
+    """OTLP/HTTP JSON body (``ExportTraceServiceRequest``) for ``spans``."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _otlp_attributes({"service.name": SERVICE_NAME})
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [
+                            {
+                                "traceId": s.trace_id,
+                                "spanId": s.span_id,
+                                "parentSpanId": s.parent_id or "",
+                                "name": s.name,
+                                # SPAN_KIND_SERVER for roots, INTERNAL otherwise
+                                "kind": 2 if s.parent_id is None else 1,
+                                "startTimeUnixNano": str(s.start_ns),
+                                "endTimeUnixNano": str(s.end_ns),
+                                "attributes": _otlp_attributes(s.attributes),
+                                "status": (
+                                    {"code": 2, "message": s.error or ""}
+                                    if s.status == "error"
+                                    else {"code": 1}
+                                ),
+                            }
+                            for s in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class OTLPHttpExporter:
+    """
+    Batches spans and posts them to ``<endpoint>/v1/traces`` as OTLP JSON.
+
+    Spans can finish on worker threads, so they are queued under a lock and
+    shipped from the event loop every ``interval`` seconds.
+    """
+
+    def __init__(
+        self, endpoint: str, interval: float = 2.0, max_queue: int = 10000
+    ) -> None:
+        self.url = f"{endpoint.rstrip('/')}/v1/traces"
+        self.interval = interval
+        self.max_queue = max_queue
+        self._queue: list[Span] = []
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self._session: aiohttp.ClientSession | None = None
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            if len(self._queue) < self.max_queue:
+                self._queue.append(span)
+
+    async def start(self) -> None:
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        with self._lock:
+            spans, self._queue = self._queue, []
+        if not spans or self._session is None:
+            return
+        try:
+            async with self._session.post(self.url, json=otlp_payload(spans)) as r:
+                if r.status >= 300:
+                    logger.warning(f"OTLP export rejected with {r.status}")
+        except Exception as e:
+            # tracing must never break the bot, drop the batch
+            logger.warning(f"OTLP export of {len(spans)} spans failed: {e}")
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.exporters: list = []
+
+    def export(self, span: Span) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.debug(f"Span export failed: {e}")
+
+    def start_trace(self, name: str, **attributes) -> Span | None:
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        return Span(
+            name=name,
+            trace_id=secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=None,
+            attributes=attributes,
+        )
+
+
+tracer = Tracer()
+
+
+@contextmanager
+def _activate(new: Span) -> Iterator[Span]:
+    token = _current_span.set(new)
+    try:
+        yield new
+    except BaseException as e:
+        _current_span.reset(token)
+        new.finish(error=e)
+        raise
+    _current_span.reset(token)
+    new.finish()
+
+
+@contextmanager
+def trace(name: str, **attributes) -> Iterator[Span | None]:
+    """Root span of a new trace, or nothing when tracing is off or unsampled."""
+    root = tracer.start_trace(name, **attributes)
+    if root is None:
+        yield None
+        return
+    with _activate(root):
+        yield root
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span | None]:
+    """Child of the current span; a no-op outside of a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(
+        name=name,
+        trace_id=parent.trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id,
+        attributes=attributes,
+    )
+    with _activate(child):
+        yield child
+
+
+@contextmanager
+def media_stage(platform: str, stage: str, **attributes) -> Iterator[None]:
+    """Times a media stage in ``media_stage_seconds`` and traces it."""
+    with MEDIA_STAGE_SECONDS.time(platform=platform, stage=stage):
+        with span(f"{platform}.{stage}", platform=platform, **attributes):
+            yield
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    parent = _current_span.get()
+    if parent is None or context is None:
+        return
+    # the listener runs in SQLAlchemy's greenlet, which shares the caller's
+    # context, so the span is kept on the execution context instead
+    context._trace_span = Span(
+        name="db.query",
+        trace_id=parent.trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id,
+        attributes={"db.statement": statement.split(None, 1)[0].upper()},
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    query_span = getattr(context, "_trace_span", None)
+    if query_span is not None:
+        query_span.set(rows=getattr(cursor, "rowcount", None))
+        query_span.finish()
+
+
+def _handle_error(exception_context) -> None:
+    context = exception_context.execution_context
+    query_span = getattr(context, "_trace_span", None)
+    if query_span is not None:
+        query_span.finish(error=exception_context.original_exception)
+
+
+def instrument_engine(sync_engine) -> None:
+    """One ``db.query`` span per SQL statement executed inside a trace."""
+    from sqlalchemy import event
+
+    for name, listener in (
+        ("before_cursor_execute", _before_cursor_execute),
+        ("after_cursor_execute", _after_cursor_execute),
+        ("handle_error", _handle_error),
+    ):
+        if not event.contains(sync_engine, name, listener):
+            event.listen(sync_engine, name, listener)
+
+
+async def setup_tracing() -> None:
+    if not settings.TRACING_ENABLED or tracer.enabled:
+        return
+    from app.core.databases.postgres import get_async_engine
+
+    path = Path(settings.TRACE_FILE)
+    if not path.is_absolute():
+        path = WORKDIR.parent / path
+    tracer.exporters.append(
+        JsonFileExporter(
+            path, settings.TRACE_FILE_MAX_BYTES, settings.TRACE_FILE_BACKUPS
+        )
+    )
+    if settings.TRACE_OTLP_ENDPOINT:
+        exporter = OTLPHttpExporter(settings.TRACE_OTLP_ENDPOINT)
+        await exporter.start()
+        tracer.exporters.append(exporter)
+    tracer.sample_rate = settings.TRACE_SAMPLE_RATE
+    instrument_engine(get_async_engine().sync_engine)
+    tracer.enabled = True
+    logger.info(f"Tracing to {path} (pid {os.getpid()})")
+
+
+async def shutdown_tracing() -> None:
+    tracer.enabled = False
+    exporters, tracer.exporters = tracer.exporters, []
+    for exporter in exporters:
+        await exporter.shutdown()
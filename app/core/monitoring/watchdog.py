@@ -0,0 +1,201 @@
+"""
+Event-loop stall detector.
+
+A heartbeat coroutine wakes up every ``interval`` seconds and measures how
+late it was. A monitor thread watches the heartbeat; once it is overdue by
+more than ``threshold`` the loop is stalled, and the thread samples the loop
+thread's stack until the heartbeat comes back. Each stall is charged to the
+call site seen most often in its samples: the innermost frame in this
+project's code, next to the library frame that actually blocked.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.core.extensions.utils import WORKDIR
+from app.core.monitoring.metrics import Counter as MetricCounter
+from app.core.monitoring.metrics import Histogram
+from app.core.settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PROJECT_ROOT = WORKDIR.parent
+UNKNOWN_SITE = "<not sampled>"
+
+LOOP_STALL_SECONDS = Histogram(
+    "event_loop_stall_seconds",
+    "Duration of event loop stalls longer than WATCHDOG_THRESHOLD.",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+LOOP_STALLS = MetricCounter(
+    "event_loop_stalls_total",
+    "Event loop stalls by the project call site that was blocking.",
+    ("site",),
+)
+
+
+@dataclass
+class StallSite:
+    site: str
+    blocking: str
+    stack: list[str]
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seen: float = field(default_factory=time.time)
+
+
+def _frame_label(frame: traceback.FrameSummary) -> str:
+    path = Path(frame.filename)
+    try:
+        path = path.relative_to(PROJECT_ROOT)
+    except ValueError:
+        # library code, keep it short
+        path = Path(*path.parts[-2:])
+    return f"{path}:{frame.lineno} in {frame.name}"
+
+
+def _is_project_frame(frame: traceback.FrameSummary) -> bool:
+    return frame.filename.startswith(str(PROJECT_ROOT)) and (
+        "site-packages" not in frame.filename
+    )
+
+
+class LoopWatchdog:
+    def __init__(
+        self, threshold: float, interval: float = 0.05, max_sites: int = 200
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval
+        self.max_sites = max_sites
+        self.sites: dict[str, StallSite] = {}
+        self.stalls = 0
+        self._beat = time.monotonic()
+        # (site, blocking frame) -> samples of the stall in progress
+        self._samples: Counter[tuple[str, str]] = Counter()
+        self._stacks: dict[tuple[str, str], list[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._task: asyncio.Task | None = None
+        self._loop_thread_id: int | None = None
+
+    async def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(
+            target=self._monitor, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Loop watchdog started (threshold {self.threshold}s)")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = now - expected
+            if lag >= self.threshold:
+                self._record(lag)
+            elif self._samples:
+                # sampled right at the edge of the threshold, not a stall
+                with self._lock:
+                    self._samples.clear()
+                    self._stacks.clear()
+
+    def _monitor(self) -> None:
+        # sample a few times per threshold so short stalls are still caught
+        period = min(self.interval, self.threshold / 4)
+        while not self._stop.wait(period):
+            if time.monotonic() - self._beat > self.interval + self.threshold:
+                self._sample()
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        project = [f for f in stack if _is_project_frame(f)]
+        blocking = _frame_label(stack[-1]) if stack else UNKNOWN_SITE
+        site = _frame_label(project[-1]) if project else blocking
+        key = (site, blocking)
+        with self._lock:
+            self._samples[key] += 1
+            if key not in self._stacks:
+                self._stacks[key] = [_frame_label(f) for f in stack[-12:]]
+
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            samples, self._samples = self._samples, Counter()
+            stacks, self._stacks = self._stacks, {}
+        if samples:
+            key = samples.most_common(1)[0][0]
+            site, blocking = key
+            stack = stacks[key]
+        else:
+            site = blocking = UNKNOWN_SITE
+            stack = []
+
+        self.stalls += 1
+        LOOP_STALL_SECONDS.observe(seconds)
+        LOOP_STALLS.inc(site=site)
+        entry = self.sites.get(site)
+        if entry is None:
+            if len(self.sites) >= self.max_sites:
+                # forget the site that hurt least
+                del self.sites[min(self.sites.values(), key=_weight).site]
+            entry = self.sites[site] = StallSite(site, blocking, stack)
+        entry.count += 1
+        entry.total_seconds += seconds
+        entry.max_seconds = max(entry.max_seconds, seconds)
+        entry.last_seen = time.time()
+        entry.blocking, entry.stack = blocking, stack or entry.stack
+        logger.warning(f"Event loop stalled {seconds:.2f}s at {site} ({blocking})")
+
+    def report(self, limit: int = 10) -> list[StallSite]:
+        """Call sites ordered by the total time they kept the loop blocked."""
+        return sorted(self.sites.values(), key=_weight, reverse=True)[:limit]
+
+
+def _weight(site: StallSite) -> float:
+    return site.total_seconds
+
+
+loop_watchdog = LoopWatchdog(
+    threshold=settings.WATCHDOG_THRESHOLD, interval=settings.WATCHDOG_INTERVAL
+)
+
+
+async def start_watchdog() -> None:
+    if settings.WATCHDOG_ENABLED:
+        await loop_watchdog.start()
+
+
+async def stop_watchdog() -> None:
+    await loop_watchdog.stop()
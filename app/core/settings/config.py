@@ -12,14 +12,104 @@ class Settings(BaseSettings):
     TELEGRAM_API_ID: str | None = None
     TELEGRAM_API_HASH: str | None = None
 
+    # Webhook mode (polling is used when USE_WEBHOOK is false)
+    USE_WEBHOOK: bool = False
+    WEBHOOK_BASE_URL: str | None = None
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_SECRET: str | None = None
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8443
+    WEBHOOK_SSL_CERT: str | None = None
+    WEBHOOK_SSL_KEY: str | None = None
+    # one-off switches for a single start: drop the updates Telegram queued,
+    # or register the webhook again (after a secret or certificate change)
+    WEBHOOK_DROP_PENDING_UPDATES: bool = False
+    WEBHOOK_FORCE_SET: bool = False
+
     # POSTGRES CREDENTIALS
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     POSTGRES_HOST: str
     POSTGRES_PORT: int
+    # overrides the async PostgreSQL URL, e.g. sqlite+aiosqlite for benchmarks
+    DATABASE_URL: str | None = None
     DEBUG: bool = False
 
+    # Statistics write-behind buffer
+    STATS_FLUSH_INTERVAL: float = 5.0
+    STATS_FLUSH_MAX_EVENTS: int = 500
+
+    # Broadcasts (Bot API allows roughly 30 messages per second)
+    BROADCAST_RATE_PER_SECOND: float = 25.0
+    BROADCAST_CONCURRENCY: int = 20
+    # seconds a bot process holds a running campaign without renewing it
+    BROADCAST_LEASE_TIMEOUT: int = 60
+
+    # Job queue: heavy work is executed by `python -m app.worker`
+    USE_JOB_QUEUE: bool = False
+    WORKER_CONCURRENCY: int = 2
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_VISIBILITY_TIMEOUT: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF: int = 10
+
+    # Router sessions and FSM state ("memory" or "postgres")
+    SESSION_BACKEND: str = "memory"
+    SESSION_TTL: int = 3600
+    SESSION_MAX_PER_USER: int = 20
+    SESSION_MAX_ENTRIES: int = 100000
+    FSM_TTL: int = 86400
+
+    # Prometheus /metrics; the webhook server always serves it, polling bots
+    # and workers only when METRICS_PORT is set
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int | None = None
+
+    # Event loop watchdog: stalls longer than the threshold (seconds) are
+    # sampled and reported by call site
+    WATCHDOG_ENABLED: bool = True
+    WATCHDOG_THRESHOLD: float = 0.25
+    WATCHDOG_INTERVAL: float = 0.05
+
+    # Per-update tracing: JSON spans in a rotating file, optionally also sent
+    # to an OTLP/HTTP collector (e.g. http://otel-collector:4318)
+    TRACING_ENABLED: bool = False
+    TRACE_SAMPLE_RATE: float = 1.0
+    TRACE_FILE: str = "logs/traces.jsonl"
+    TRACE_FILE_MAX_BYTES: int = 50 * 1024 * 1024
+    TRACE_FILE_BACKUPS: int = 5
+    TRACE_OTLP_ENDPOINT: str | None = None
+
+    # Shared ffmpeg pool, per process: concurrent ffmpeg runs and the threads
+    # each one gets (default: half the cores, the cores split between them)
+    TRANSCODE_WORKERS: int | None = None
+    TRANSCODE_THREADS: int | None = None
+
+    # yt-dlp worker processes for downloads (default min(16, 4 x cores) +
+    # min(32, cores + 4), as many as the thread pools they replaced) and for
+    # searches (default twice the cores, at most 8), each replaced after
+    # YTDLP_MAX_JOBS jobs
+    YTDLP_WORKERS: int | None = None
+    YTDLP_SEARCH_WORKERS: int | None = None
+    YTDLP_MAX_JOBS: int = 50
+
+    # Audio delivery: "native" (AAC remuxed into m4a with tags and cover) or
+    # "mp3" (encoded at 192 kbps)
+    AUDIO_PROFILE: str = "native"
+
+    # Videos over the upload limit: "auto", "reencode", "split" or "reject",
+    # overridden per platform with e.g. "youtube=split,tiktok=reencode"
+    OVERSIZE_STRATEGY: str = "auto"
+    OVERSIZE_PLATFORM_STRATEGIES: str = ""
+    OVERSIZE_MIN_VIDEO_KBPS: int = 500
+    OVERSIZE_MAX_PARTS: int = 10
+
+    # Direct URL downloads: files of at least DOWNLOAD_RANGE_MIN_SIZE bytes are
+    # fetched as DOWNLOAD_CONNECTIONS parallel ranges when the server allows it
+    DOWNLOAD_CONNECTIONS: int = 4
+    DOWNLOAD_RANGE_MIN_SIZE: int = 4 * 1024 * 1024
+
     # Selenium Credentials
     SELENIUM_REMOTE_URL: str
 
@@ -37,6 +127,19 @@ class Settings(BaseSettings):
             admins.append(int(admin))
         return admins
 
+    @property
+    def oversize_strategies(self) -> dict[str, str]:
+        strategies = {}
+        for item in self.OVERSIZE_PLATFORM_STRATEGIES.split(","):
+            if "=" in item:
+                platform, strategy = item.split("=", 1)
+                strategies[platform.strip()] = strategy.strip()
+        return strategies
+
+    @property
+    def webhook_url(self) -> str:
+        return f"{(self.WEBHOOK_BASE_URL or '').rstrip('/')}{self.WEBHOOK_PATH}"
+
     def get_async_postgres_url(self) -> str:
         return (
             f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
@@ -1,18 +1,74 @@
+"""
+Audio delivery profiles.
+
+``native`` sends the AAC stream a platform already serves, remuxed into m4a
+(which Telegram plays as audio) with its tags and cover attached; only a
+source without AAC is encoded. ``mp3`` encodes to 192 kbps MP3 as before.
+The default is ``AUDIO_PROFILE``, a caller can ask for another one.
+"""
+
+from enum import Enum
 from pathlib import Path
 import logging
-import moviepy
+
+from app.core.settings.config import get_settings
+from app.core.utils.transcoder import transcoder
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MP3_BITRATE = "192k"
+
 
+class AudioProfile(str, Enum):
+    NATIVE = "native"
+    MP3 = "mp3"
 
-def extract_audio_from_video(video_path: str) -> str | None:
+
+def audio_profile(name: str | None = None) -> AudioProfile:
+    name = name or settings.AUDIO_PROFILE
     try:
-        video = moviepy.VideoFileClip(video_path)
-        audio_path = str(Path(video_path).with_suffix(".mp3"))
+        return AudioProfile(name)
+    except ValueError:
+        logger.warning(f"Unknown audio profile {name!r}, using native")
+        return AudioProfile.NATIVE
+
+
+def ytdlp_audio_postprocessors(profile: AudioProfile) -> list[dict]:
+    """yt-dlp postprocessors for a tagged track with its thumbnail as cover."""
+    if profile is AudioProfile.MP3:
+        extract = {
+            "key": "FFmpegExtractAudio",
+            "preferredcodec": "mp3",
+            "preferredquality": MP3_BITRATE.rstrip("k"),
+        }
+    else:
+        # AAC is only moved into an m4a container, anything else is encoded
+        extract = {"key": "FFmpegExtractAudio", "preferredcodec": "m4a"}
+    return [
+        # YouTube thumbnails are webp, which audio containers cannot hold
+        {"key": "FFmpegThumbnailsConvertor", "format": "jpg", "when": "before_dl"},
+        extract,
+        {"key": "FFmpegMetadata", "add_metadata": True},
+        {"key": "EmbedThumbnail", "already_have_thumbnail": False},
+    ]
 
-        video.audio.write_audiofile(audio_path, logger=None)
-        video.close()
-        return audio_path
+
+async def extract_audio_from_video(
+    video_path: str, profile: AudioProfile | None = None
+) -> str | None:
+    profile = profile or audio_profile()
+    try:
+        info = await transcoder.probe(video_path)
+        if profile is AudioProfile.NATIVE and info and info.audio_codec == "aac":
+            audio_path = Path(video_path).with_suffix(".m4a")
+            await transcoder.extract_audio(
+                video_path, audio_path, codec="copy", bitrate=None
+            )
+        else:
+            audio_path = Path(video_path).with_suffix(".mp3")
+            await transcoder.extract_audio(video_path, audio_path)
+        return str(audio_path)
     except Exception as e:
         logger.error(f"❌ Audio extraction failed: {e}")
         return None
@@ -0,0 +1,129 @@
+"""
+Cooperative cancellation for downloads running outside the event loop.
+
+yt-dlp and pytubefix cannot be interrupted from another thread, but both
+call back into us for every chunk they write. A ``CancelToken`` hooked into
+those callbacks raises ``DownloadCancelled`` there once it is cancelled, so
+a timed-out or cancelled download stops within a chunk and the partial
+files it reported can be removed::
+
+    token = CancelToken()
+    opts["progress_hooks"] = [token.progress_hook]
+    with YoutubeDL(opts) as ydl:
+        await run_cancellable(ydl.download, [url], token=token)
+
+Jobs in ``ytdlp_pool`` get their token from ``job_token()`` instead.
+"""
+
+import asyncio
+import glob
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from yt_dlp.utils import DownloadCancelled as _YtDlpDownloadCancelled
+
+from app.core.monitoring.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+CANCELLED_DOWNLOADS = Counter(
+    "cancelled_downloads_total",
+    "Downloads cancelled by their caller, by runner (worker, thread) and "
+    "whether they stopped within the grace period.",
+    ("runner", "result"),
+)
+
+# how long a cancelled download gets to reach its next progress callback
+CANCEL_GRACE = 1.0
+
+
+class DownloadCancelled(_YtDlpDownloadCancelled):
+    """Raised from a progress callback; yt-dlp passes it through unwrapped."""
+
+    msg = "Download cancelled"
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._partials: set[Path] = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise DownloadCancelled()
+
+    def track(self, path: str | Path) -> None:
+        """Marks ``path`` for removal if the download is cancelled."""
+        self._partials.add(Path(path))
+
+    def progress_hook(self, d: dict) -> None:
+        """A yt-dlp ``progress_hooks`` / ``postprocessor_hooks`` entry."""
+        for key in ("tmpfilename", "filename"):
+            if d.get(key):
+                self.track(d[key])
+        self.raise_if_cancelled()
+
+    def pytube_progress(self, stream, chunk: bytes, bytes_remaining: int) -> None:
+        """A pytubefix ``on_progress_callback``."""
+        self.raise_if_cancelled()
+
+    def cleanup(self) -> None:
+        """Removes the tracked files with their ``.part``/``.ytdl`` leftovers."""
+        for path in self._partials:
+            pattern = str(path.parent / glob.escape(path.name)) + "*"
+            for leftover in [path, *map(Path, glob.glob(pattern))]:
+                try:
+                    leftover.unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning(f"Could not remove {leftover}: {e}")
+        self._partials.clear()
+
+
+async def run_cancellable(
+    func: Callable, *args, token: CancelToken, **kwargs
+) -> Any:
+    """
+    ``asyncio.to_thread`` for a download that checks ``token``. Cancelling
+    the caller cancels the token and waits up to ``CANCEL_GRACE`` for the
+    thread to stop; its partial files are removed once it has.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        token.cancel()
+        await asyncio.wait({future}, timeout=CANCEL_GRACE)
+        result = "stopped" if future.done() else "late"
+        CANCELLED_DOWNLOADS.inc(runner="thread", result=result)
+
+        def finished(done: asyncio.Future) -> None:
+            if not done.cancelled():
+                done.exception()
+            token.cleanup()
+
+        future.add_done_callback(finished)
+        raise
+
+
+def close_in_background(close: Callable[[], Any]) -> None:
+    """
+    Runs a blocking ``close`` (a browser's ``quit``, say) in its own thread
+    without waiting for it, so a cancelled caller returns at once.
+    """
+
+    def run() -> None:
+        try:
+            close()
+        except Exception as e:
+            logger.debug(f"Closing after cancellation failed: {e}")
+
+    threading.Thread(target=run, name="cancel-close", daemon=True).start()
@@ -0,0 +1,135 @@
+"""
+Size-aware yt-dlp format selection.
+
+yt-dlp knows every format's ``filesize`` or ``filesize_approx`` (it fills
+the latter from ``tbr`` x duration) before it downloads anything, so a file
+that could never be uploaded is caught before the download, not after::
+
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        ydl.format_selector = fit_format(ydl, opts["format"], max_height=720)
+        ydl.download([url])
+"""
+
+import logging
+from typing import Callable, Iterator
+
+from app.core.settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CLOUD_BOT_API_LIMIT = 50 * 1024 * 1024
+LOCAL_BOT_API_LIMIT = 2000 * 1024 * 1024
+# muxing two streams into mp4 adds a little on top of their sizes
+MUX_OVERHEAD = 1.02
+
+
+class MediaTooLargeError(Exception):
+    def __init__(self, size: int, limit: int) -> None:
+        self.size = size
+        self.limit = limit
+        super().__init__(
+            f"{size / 1024 / 1024:.1f} MB is over the "
+            f"{limit / 1024 / 1024:.0f} MB upload limit"
+        )
+
+    def __reduce__(self):
+        # raised in yt-dlp worker processes and pickled back to the caller
+        return type(self), (self.size, self.limit)
+
+
+def upload_limit() -> int:
+    """Largest file the bot can send with the active Bot API server."""
+    return LOCAL_BOT_API_LIMIT if settings.USE_LOCAL_BOT_API else CLOUD_BOT_API_LIMIT
+
+
+def estimate_size(fmt: dict) -> int | None:
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    return int(size) if size else None
+
+
+def _has(fmt: dict, kind: str) -> bool:
+    # yt-dlp leaves the codec unset when it does not know, which means "maybe"
+    return fmt.get(f"{kind}codec") != "none"
+
+
+def _rank(fmt: dict) -> tuple:
+    return fmt.get("height") or 0, fmt.get("tbr") or 0
+
+
+def pick_format(
+    formats: list[dict], limit: int, max_height: int | None = None
+) -> str | None:
+    """
+    Format spec of the best video (or video+audio pair) that fits ``limit``.
+
+    Returns ``None`` when no sizes are known, so the caller can fall back to
+    its usual selector; raises ``MediaTooLargeError`` when sizes are known
+    and none of them fits.
+    """
+    videos = [
+        f
+        for f in formats
+        if _has(f, "v") and (not max_height or (f.get("height") or 0) <= max_height)
+    ]
+    audios = sorted(
+        (f for f in formats if not _has(f, "v") and _has(f, "a")),
+        # mp4 merges keep m4a audio as is, prefer it over better webm audio
+        key=lambda f: (f.get("ext") == "m4a", f.get("abr") or 0),
+        reverse=True,
+    )
+    fitting: list[tuple[tuple, str]] = []
+    smallest: int | None = None
+    for video in videos:
+        video_size = estimate_size(video)
+        if video_size is None:
+            continue
+        if _has(video, "a"):
+            pairs = [(video["format_id"], video_size)]
+        else:
+            pairs = [
+                (f"{video['format_id']}+{audio['format_id']}", video_size + size)
+                for audio in audios
+                if (size := estimate_size(audio)) is not None
+            ]
+        for spec, size in pairs:
+            size = int(size * MUX_OVERHEAD) if "+" in spec else size
+            smallest = size if smallest is None else min(smallest, size)
+            if size <= limit:
+                fitting.append((_rank(video), spec))
+                # audios are ordered best first, the first pair that fits wins
+                break
+    if fitting:
+        return max(fitting, key=lambda item: item[0])[1]
+    if smallest is not None:
+        raise MediaTooLargeError(smallest, limit)
+    return None
+
+
+def fit_format(
+    ydl, spec: str, limit: int | None = None, max_height: int | None = None
+) -> Callable[[dict], Iterator[dict]]:
+    """
+    A ``YoutubeDL.format_selector`` that picks what ``spec`` would, unless
+    that is over ``limit``; then the best format that is not.
+    """
+    limit = limit or upload_limit()
+    default = ydl.build_format_selector(spec)
+
+    def select(ctx: dict) -> Iterator[dict]:
+        chosen = list(default(ctx))
+        size = estimate_size(chosen[0]) if chosen else None
+        if size is None or size <= limit:
+            yield from chosen
+            return
+        smaller = pick_format(ctx["formats"], limit, max_height)
+        if smaller is None:
+            yield from chosen
+            return
+        logger.info(
+            f"Format {chosen[0].get('format_id')} is {size / 1024 / 1024:.1f} MB, "
+            f"using {smaller} instead"
+        )
+        yield from ydl.build_format_selector(smaller)(ctx)
+
+    return select
@@ -0,0 +1,139 @@
+"""
+Hedged requests between two download backends.
+
+The primary backend starts alone. If it has not produced a result after
+``delay`` seconds (the primary's recent p90, so only the slow tail is
+hedged) or fails before that, the secondary starts too; the first valid
+result wins and the other one is cancelled::
+
+    path = await _audio_hedge.run(
+        lambda: ytdlp_pool.run(_audio_sync, query, profile),
+        lambda: ytdlp_pool.run(download_audio_with_pytube, query),
+    )
+
+When the secondary wins, the primary's time so far still counts as a
+sample, so a primary that keeps losing pulls the delay down and gets
+hedged sooner.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+
+from app.core.monitoring.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HEDGED_REQUESTS = Counter(
+    "hedged_requests_total",
+    "Hedged requests by operation, winning backend and whether the secondary ran.",
+    ("operation", "winner", "hedged"),
+)
+HEDGE_DELAY_SECONDS = Gauge(
+    "hedge_delay_seconds",
+    "Current wait before the secondary backend is started, per operation.",
+    ("operation",),
+)
+
+# samples needed before the observed quantile replaces the initial delay
+MIN_SAMPLES = 10
+
+
+class Hedge:
+    def __init__(
+        self,
+        operation: str,
+        initial_delay: float,
+        min_delay: float = 1.0,
+        max_delay: float = 60.0,
+        quantile: float = 0.9,
+        window: int = 200,
+    ) -> None:
+        self.operation = operation
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.quantile = quantile
+        self._samples: deque[float] = deque(maxlen=window)
+        self.delay = initial_delay
+
+    def _observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        if len(self._samples) >= MIN_SAMPLES:
+            ordered = sorted(self._samples)
+            observed = ordered[int(self.quantile * (len(ordered) - 1))]
+            self.delay = min(self.max_delay, max(self.min_delay, observed))
+        HEDGE_DELAY_SECONDS.set(self.delay, operation=self.operation)
+
+    def _record(self, winner: str, hedged: bool) -> None:
+        HEDGED_REQUESTS.inc(
+            operation=self.operation,
+            winner=winner,
+            hedged=str(hedged).lower(),
+        )
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        secondary: Callable[[], Awaitable[T]],
+        *,
+        valid: Callable[[Any], bool] = bool,
+        fatal: tuple[type[BaseException], ...] = (),
+    ) -> T | None:
+        """
+        The first valid result of the two. ``fatal`` errors end the race
+        at once; when both fail the primary's error is raised, when neither
+        result is valid ``None`` is returned.
+        """
+        started = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        roles = {first: "primary"}
+        errors: dict[str, BaseException] = {}
+        hedged = False
+        try:
+            # the primary alone until the delay is up or it finishes
+            done, pending = await asyncio.wait({first}, timeout=self.delay)
+            while True:
+                for task in done:
+                    role = roles[task]
+                    try:
+                        result = task.result()
+                    except fatal:
+                        raise
+                    except Exception as e:
+                        logger.info(f"{self.operation} {role} backend failed: {e}")
+                        errors[role] = e
+                        continue
+                    if role == "primary":
+                        self._observe(time.monotonic() - started)
+                    if valid(result):
+                        if role == "secondary" and not first.done():
+                            # the primary took at least this long
+                            self._observe(time.monotonic() - started)
+                        self._record(role, hedged)
+                        return result
+                if not hedged:
+                    hedged = True
+                    second = asyncio.ensure_future(secondary())
+                    roles[second] = "secondary"
+                    pending.add(second)
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            losers = [task for task in roles if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+
+        self._record("none", hedged)
+        if errors:
+            raise errors.get("primary") or errors["secondary"]
+        return None
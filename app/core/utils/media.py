@@ -0,0 +1,161 @@
+"""
+One ffprobe per file.
+
+``probe_media`` returns codecs, duration, dimensions and bitrate in a single
+call and caches the result by path, size and mtime, so checking a file
+before and after a remux costs one subprocess each instead of one per check.
+"""
+
+import json
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.core.monitoring.metrics import CACHE_LOOKUPS
+from app.core.monitoring.tracing import span
+
+logger = logging.getLogger(__name__)
+
+PROBE_CACHE_MAX_SIZE = 256
+PROBE_TIMEOUT = 30
+
+# what Telegram plays inline without converting
+TELEGRAM_VIDEO_CODECS = {"h264"}
+TELEGRAM_AUDIO_CODECS = {"aac", "mp3"}
+TELEGRAM_PIXEL_FORMATS = {"yuv420p", "yuvj420p"}
+MP4_FORMAT_NAMES = {"mov", "mp4", "m4a", "3gp", "3g2", "mj2"}
+
+_probe_cache: OrderedDict[tuple, "MediaInfo | None"] = OrderedDict()
+_probe_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    format_names: tuple[str, ...]
+    duration: float
+    bit_rate: int | None
+    video_codec: str | None
+    audio_codec: str | None
+    width: int | None
+    height: int | None
+    pix_fmt: str | None
+
+    @property
+    def has_video(self) -> bool:
+        return self.video_codec is not None
+
+    @property
+    def is_mp4(self) -> bool:
+        return bool(MP4_FORMAT_NAMES.intersection(self.format_names))
+
+    @property
+    def is_telegram_compatible(self) -> bool:
+        """H.264 (+ AAC/MP3) in an mp4 container: a remux is enough."""
+        return (
+            self.video_codec in TELEGRAM_VIDEO_CODECS
+            and self.pix_fmt in TELEGRAM_PIXEL_FORMATS
+            and (self.audio_codec is None or self.audio_codec in TELEGRAM_AUDIO_CODECS)
+        )
+
+
+def _int_or_none(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_probe(data: dict) -> MediaInfo:
+    fmt = data.get("format") or {}
+    video = next(
+        (
+            s
+            for s in data.get("streams", [])
+            if s.get("codec_type") == "video"
+            # cover art is reported as a video stream too
+            and not (s.get("disposition") or {}).get("attached_pic")
+        ),
+        {},
+    )
+    audio = next(
+        (s for s in data.get("streams", []) if s.get("codec_type") == "audio"), {}
+    )
+    try:
+        duration = float(fmt.get("duration") or video.get("duration") or 0)
+    except ValueError:
+        duration = 0.0
+    return MediaInfo(
+        format_names=tuple((fmt.get("format_name") or "").split(",")),
+        duration=duration,
+        bit_rate=_int_or_none(fmt.get("bit_rate")),
+        video_codec=video.get("codec_name"),
+        audio_codec=audio.get("codec_name"),
+        width=_int_or_none(video.get("width")),
+        height=_int_or_none(video.get("height")),
+        pix_fmt=video.get("pix_fmt"),
+    )
+
+
+def _run_ffprobe(path: Path) -> MediaInfo | None:
+    with span("ffprobe", path=str(path)):
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "format=format_name,duration,bit_rate:"
+                "stream=codec_type,codec_name,width,height,pix_fmt,duration"
+                ":stream_disposition=attached_pic",
+                "-of",
+                "json",
+                str(path),
+            ],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=PROBE_TIMEOUT,
+        )
+    if result.returncode != 0:
+        logger.debug(f"ffprobe failed for {path}: {result.stderr.strip()[-200:]}")
+        return None
+    return _parse_probe(json.loads(result.stdout or "{}"))
+
+
+def probe_media(path: str | Path) -> MediaInfo | None:
+    """
+    Blocking; call it from a worker thread. Returns ``None`` when the file
+    is missing or ffprobe cannot read it.
+    """
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    with _probe_lock:
+        if key in _probe_cache:
+            _probe_cache.move_to_end(key)
+            CACHE_LOOKUPS.inc(cache="media_probe", result="hit")
+            return _probe_cache[key]
+    CACHE_LOOKUPS.inc(cache="media_probe", result="miss")
+
+    try:
+        info = _run_ffprobe(path)
+    except Exception as e:
+        logger.warning(f"ffprobe error for {path}: {e}")
+        info = None
+
+    with _probe_lock:
+        _probe_cache[key] = info
+        while len(_probe_cache) > PROBE_CACHE_MAX_SIZE:
+            _probe_cache.popitem(last=False)
+    return info
+
+
+def has_valid_duration(path: str | Path, minimum: float = 0.1) -> bool:
+    info = probe_media(path)
+    return info is not None and info.duration > minimum
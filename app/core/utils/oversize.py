@@ -0,0 +1,186 @@
+"""
+What to do with a video that is over the upload limit.
+
+``reencode`` brings it under the limit with a CRF encode whose bitrate is
+capped at what the duration allows, scaling down the resolution to match.
+``split`` stream-copies it into keyframe-aligned parts that are sent as an
+album. ``auto`` re-encodes unless the bitrate that would leave is below
+``OVERSIZE_MIN_VIDEO_KBPS``, where the picture falls apart, and splits
+otherwise. ``reject`` keeps the old behaviour.
+
+The strategy is ``OVERSIZE_STRATEGY``, overridden per platform with
+``OVERSIZE_PLATFORM_STRATEGIES`` (``youtube=split,tiktok=reencode``).
+"""
+
+import logging
+import math
+from enum import Enum
+from pathlib import Path
+
+from app.core.monitoring.metrics import Counter
+from app.core.settings.config import get_settings
+from app.core.utils.formats import MediaTooLargeError, upload_limit
+from app.core.utils.media import MediaInfo
+from app.core.utils.transcoder import TranscodeError, transcoder
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+OVERSIZE_MEDIA = Counter(
+    "oversize_media_total",
+    "Videos over the upload limit by platform, strategy and outcome.",
+    ("platform", "strategy", "result"),
+)
+
+AUDIO_KBPS = 128
+# container overhead and rate control overshoot
+SIZE_HEADROOM = 0.92
+# lowest bitrate (kbps) each output height still looks acceptable at
+HEIGHT_STEPS = ((2500, 1080), (1200, 720), (600, 480), (0, 360))
+
+
+class OversizeStrategy(str, Enum):
+    AUTO = "auto"
+    REENCODE = "reencode"
+    SPLIT = "split"
+    REJECT = "reject"
+
+
+def strategy_for(platform: str) -> OversizeStrategy:
+    name = settings.oversize_strategies.get(platform, settings.OVERSIZE_STRATEGY)
+    try:
+        return OversizeStrategy(name)
+    except ValueError:
+        logger.warning(f"Unknown oversize strategy {name!r} for {platform}")
+        return OversizeStrategy.REJECT
+
+
+def target_video_kbps(limit: int, duration: float) -> int:
+    """Video bitrate that, with the audio, fills ``limit`` over ``duration``."""
+    return int(limit * 8 * SIZE_HEADROOM / duration / 1000) - AUDIO_KBPS
+
+
+async def _reencode(source: Path, kbps: int, limit: int, platform: str) -> list[Path]:
+    if kbps < 100:
+        # not even a postage stamp fits, only splitting can help
+        raise MediaTooLargeError(source.stat().st_size, limit)
+    height = next(h for floor, h in HEIGHT_STEPS if kbps >= floor)
+    target = source.with_name(f"{source.stem}_fit.mp4")
+    await transcoder.run(
+        source,
+        target,
+        [
+            "-map",
+            "0:v:0",
+            "-map",
+            "0:a?",
+            "-vf",
+            f"scale=-2:'min({height},ih)'",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-crf",
+            "23",
+            "-maxrate",
+            f"{kbps}k",
+            "-bufsize",
+            f"{kbps * 2}k",
+            "-pix_fmt",
+            "yuv420p",
+            "-c:a",
+            "aac",
+            "-b:a",
+            f"{AUDIO_KBPS}k",
+            "-movflags",
+            "+faststart",
+        ],
+        platform=platform,
+        stage="oversize_reencode",
+    )
+    if target.stat().st_size > limit:
+        size = target.stat().st_size
+        target.unlink(missing_ok=True)
+        raise MediaTooLargeError(size, limit)
+    return [target]
+
+
+async def _split(
+    source: Path, info: MediaInfo, limit: int, platform: str
+) -> list[Path]:
+    size = source.stat().st_size
+    # parts start at the keyframe before their cut point, leave room for it
+    parts = math.ceil(size / (limit * 0.9))
+    while parts <= settings.OVERSIZE_MAX_PARTS:
+        length = info.duration / parts
+        paths = []
+        try:
+            for index in range(parts):
+                paths.append(
+                    await transcoder.cut(
+                        source,
+                        source.with_name(f"{source.stem}_part{index + 1}.mp4"),
+                        start=index * length,
+                        duration=length,
+                        platform=platform,
+                        stage="oversize_split",
+                    )
+                )
+        except BaseException:
+            for path in paths:
+                path.unlink(missing_ok=True)
+            raise
+        if all(path.stat().st_size <= limit for path in paths):
+            return paths
+        # a bitrate spike pushed one part over, cut finer
+        for path in paths:
+            path.unlink(missing_ok=True)
+        parts += 1
+    raise MediaTooLargeError(size, limit)
+
+
+async def fit_to_limit(
+    path: str | Path, platform: str, limit: int | None = None
+) -> list[Path]:
+    """
+    Files to send instead of ``path``: ``[path]`` when it already fits, else
+    one re-encoded file or the parts of an album. The new files are the
+    caller's to delete. Raises ``MediaTooLargeError`` when it cannot fit.
+    """
+    path = Path(path)
+    limit = limit or upload_limit()
+    size = path.stat().st_size
+    if size <= limit:
+        return [path]
+
+    strategy = strategy_for(platform)
+    info = await transcoder.probe(path)
+    if strategy is OversizeStrategy.REJECT or info is None or info.duration <= 0:
+        OVERSIZE_MEDIA.inc(
+            platform=platform, strategy=strategy.value, result="rejected"
+        )
+        raise MediaTooLargeError(size, limit)
+
+    kbps = target_video_kbps(limit, info.duration)
+    if strategy is OversizeStrategy.AUTO:
+        strategy = (
+            OversizeStrategy.REENCODE
+            if kbps >= settings.OVERSIZE_MIN_VIDEO_KBPS
+            else OversizeStrategy.SPLIT
+        )
+    try:
+        if strategy is OversizeStrategy.REENCODE:
+            files = await _reencode(path, kbps, limit, platform)
+        else:
+            files = await _split(path, info, limit, platform)
+    except (MediaTooLargeError, TranscodeError) as e:
+        logger.warning(f"Could not fit {path.name} with {strategy.value}: {e}")
+        OVERSIZE_MEDIA.inc(platform=platform, strategy=strategy.value, result="failed")
+        raise MediaTooLargeError(size, limit) from e
+
+    OVERSIZE_MEDIA.inc(platform=platform, strategy=strategy.value, result="ok")
+    logger.info(
+        f"{path.name} ({size / 1024 / 1024:.1f} MB) fitted with {strategy.value} "
+        f"into {len(files)} file(s)"
+    )
+    return files
@@ -0,0 +1,279 @@
+"""
+Shared ffmpeg pool.
+
+Every ffmpeg run in the process goes through ``transcoder``, which allows
+``TRANSCODE_WORKERS`` of them at a time and gives each ``TRANSCODE_THREADS``
+threads, so concurrent requests queue instead of oversubscribing the cores.
+Waiting jobs are started in priority order (a user waiting in a chat before
+a background worker job), and a job whose caller is cancelled is dropped
+from the queue or has its ffmpeg process killed::
+
+    await transcoder.extract_audio(video, mp3, platform="instagram")
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from pathlib import Path
+from typing import AsyncIterator, Sequence
+
+from app.core.monitoring.metrics import Histogram
+from app.core.monitoring.tracing import media_stage
+from app.core.settings.config import get_settings
+from app.core.utils.media import (
+    TELEGRAM_AUDIO_CODECS,
+    TELEGRAM_PIXEL_FORMATS,
+    TELEGRAM_VIDEO_CODECS,
+    MediaInfo,
+    probe_media,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TRANSCODE_WAIT_SECONDS = Histogram(
+    "transcode_wait_seconds",
+    "Time ffmpeg jobs spent waiting for a free transcoder slot.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # a user is waiting in the chat
+    BACKGROUND = 10  # worker jobs
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def telegram_codec_args(info: MediaInfo) -> list[str]:
+    """Copies whatever Telegram already plays and re-encodes the rest."""
+    if info.is_telegram_compatible:
+        return ["-c", "copy"]
+    if (
+        info.video_codec in TELEGRAM_VIDEO_CODECS
+        and info.pix_fmt in TELEGRAM_PIXEL_FORMATS
+    ):
+        video = ["-c:v", "copy"]
+    else:
+        video = [
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-crf",
+            "23",
+            "-pix_fmt",
+            "yuv420p",
+        ]
+    if info.audio_codec is None or info.audio_codec in TELEGRAM_AUDIO_CODECS:
+        audio = ["-c:a", "copy"]
+    else:
+        audio = ["-c:a", "aac", "-b:a", "128k"]
+    return video + audio
+
+
+class Transcoder:
+    def __init__(self, workers: int, threads: int) -> None:
+        self.workers = workers
+        self.threads = threads
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    async def _acquire(self, priority: int) -> None:
+        if self.active < self.workers and not self.waiting:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was handed over just as the caller went away
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # the slot passes straight to the next job, active is unchanged
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = Priority.INTERACTIVE) -> AsyncIterator[None]:
+        """Holds one of the pool's slots, e.g. around a foreign ffmpeg run."""
+        queued = time.monotonic()
+        await self._acquire(priority)
+        TRANSCODE_WAIT_SECONDS.observe(time.monotonic() - queued)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def run(
+        self,
+        source: str | Path,
+        target: str | Path,
+        options: Sequence[str],
+        *,
+        input_options: Sequence[str] = (),
+        platform: str = "media",
+        stage: str = "transcode",
+        priority: int = Priority.INTERACTIVE,
+        timeout: float | None = None,
+    ) -> Path:
+        """Runs ``ffmpeg [input_options] -i source [options] target``."""
+        target = Path(target)
+        threads = str(self.threads)
+        cmd = [
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-y",
+            "-threads",
+            threads,
+            *input_options,
+            "-i",
+            str(source),
+            *options,
+            "-threads",
+            threads,
+            str(target),
+        ]
+        async with self.slot(priority):
+            with media_stage(platform=platform, stage=stage):
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                try:
+                    _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                except asyncio.TimeoutError:
+                    raise TranscodeError(f"ffmpeg {stage} timed out after {timeout}s")
+                finally:
+                    if process.returncode is None:
+                        # timed out or the caller was cancelled
+                        process.kill()
+                        await process.wait()
+                        target.unlink(missing_ok=True)
+
+        if process.returncode != 0 or not target.exists():
+            target.unlink(missing_ok=True)
+            raise TranscodeError(stderr.decode(errors="ignore").strip()[-500:])
+        return target
+
+    async def probe(self, path: str | Path) -> MediaInfo | None:
+        return await asyncio.to_thread(probe_media, path)
+
+    async def remux(self, source: str | Path, target: str | Path, **kwargs) -> Path:
+        return await self.run(
+            source,
+            target,
+            ["-map", "0", "-c", "copy", "-movflags", "+faststart"],
+            stage="remux",
+            **kwargs,
+        )
+
+    async def to_telegram(
+        self,
+        source: str | Path,
+        target: str | Path,
+        info: MediaInfo | None = None,
+        **kwargs,
+    ) -> Path:
+        """H.264/AAC mp4 with faststart; compatible streams are only copied."""
+        info = info or await self.probe(source)
+        if info is None or not info.has_video:
+            raise TranscodeError(f"Not a readable video: {source}")
+        codec_args = telegram_codec_args(info)
+        stage = "transcode" if "libx264" in codec_args else "remux"
+        return await self.run(
+            source,
+            target,
+            ["-map", "0:v:0", "-map", "0:a?", *codec_args, "-movflags", "+faststart"],
+            stage=stage,
+            **kwargs,
+        )
+
+    async def extract_audio(
+        self,
+        source: str | Path,
+        target: str | Path,
+        codec: str = "libmp3lame",
+        bitrate: str | None = "192k",
+        sample_rate: int | None = None,
+        channels: int | None = None,
+        duration: float | None = None,
+        output_format: str | None = None,
+        **kwargs,
+    ) -> Path:
+        options = ["-vn", "-c:a", codec]
+        if bitrate:
+            options += ["-b:a", bitrate]
+        if sample_rate:
+            options += ["-ar", str(sample_rate)]
+        if channels:
+            options += ["-ac", str(channels)]
+        if duration:
+            options += ["-t", str(duration)]
+        if output_format:
+            options += ["-f", output_format]
+        kwargs.setdefault("stage", "extract_audio")
+        return await self.run(source, target, options, **kwargs)
+
+    async def cut(
+        self,
+        source: str | Path,
+        target: str | Path,
+        start: float,
+        duration: float,
+        **kwargs,
+    ) -> Path:
+        """Stream-copies ``duration`` seconds from the keyframe before ``start``."""
+        kwargs.setdefault("stage", "cut")
+        return await self.run(
+            source,
+            target,
+            [
+                "-t",
+                str(duration),
+                "-map",
+                "0",
+                "-c",
+                "copy",
+                "-avoid_negative_ts",
+                "make_zero",
+                "-movflags",
+                "+faststart",
+            ],
+            input_options=["-ss", str(start)],
+            **kwargs,
+        )
+
+
+def _pool_size() -> tuple[int, int]:
+    cores = os.cpu_count() or 1
+    workers = settings.TRANSCODE_WORKERS or max(1, cores // 2)
+    threads = settings.TRANSCODE_THREADS or max(1, cores // workers)
+    return workers, threads
+
+
+transcoder = Transcoder(*_pool_size())
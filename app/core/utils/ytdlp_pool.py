@@ -0,0 +1,385 @@
+"""
+yt-dlp in worker processes.
+
+Building a ``YoutubeDL`` loads the extractors and parses the cookie jar, and
+extraction itself is CPU-heavy Python that competes with the event loop for
+the GIL. ``ytdlp_pool`` runs yt-dlp jobs in ``YTDLP_WORKERS`` spawned
+processes instead. Each one imports yt-dlp once and keeps its ``YoutubeDL``
+instances between jobs (one per option profile and cookie file, see
+``ydl_for``), and is replaced after ``YTDLP_MAX_JOBS`` jobs so leaks stay
+bounded::
+
+    path = await ytdlp_pool.run(_video_sync, video_id, title)
+
+Searches get their own, smaller ``ytdlp_search_pool`` so a chat search never
+queues behind minute-long downloads.
+
+Jobs are module-level functions (or methods of picklable objects) sent over
+a pipe. Counter increments made inside a job are added to the parent's
+metrics.
+
+A job whose caller is cancelled or times out is told to stop: its progress
+hooks raise ``DownloadCancelled`` at the next chunk, its partial files are
+removed and the worker takes the next job. A job that does not reach a hook
+within ``CANCEL_GRACE`` (still extracting, say) takes its process down.
+"""
+
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import pickle
+import queue
+import signal
+import threading
+from collections import OrderedDict
+from multiprocessing.connection import Connection
+from typing import Any, Callable
+
+from app.core.monitoring.metrics import REGISTRY, Counter
+from app.core.settings.config import get_settings
+from app.core.utils.cancellation import (
+    CANCEL_GRACE,
+    CANCELLED_DOWNLOADS,
+    CancelToken,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+YTDLP_WORKER_EXITS = Counter(
+    "ytdlp_worker_exits_total",
+    "yt-dlp worker processes replaced, by reason (recycled, killed, died).",
+    ("reason",),
+)
+
+# YoutubeDL instances a worker keeps, least recently used are closed first
+MAX_INSTANCES = 16
+
+# sent to a worker to cancel its current job; pickles never start with it
+CANCEL = b"cancel"
+
+# set in worker processes only
+_in_worker = False
+_instances: OrderedDict[str, Any] = OrderedDict()
+_token: CancelToken | None = None
+
+
+class YtDlpWorkerError(Exception):
+    pass
+
+
+def _profile_key(opts: dict) -> str:
+    profile = {key: value for key, value in opts.items() if key != "format"}
+    # loggers and hooks are new objects in every job, their type is enough
+    return json.dumps(profile, sort_keys=True, default=lambda o: type(o).__qualname__)
+
+
+def job_token() -> CancelToken:
+    """
+    The cancel token of the running job, for downloads that ``ydl_for``
+    does not hook (pytubefix). Outside the pool it is never cancelled.
+    """
+    return _token if _token is not None else CancelToken()
+
+
+def _job_hook(d: dict) -> None:
+    if _token is not None:
+        _token.progress_hook(d)
+
+
+def ydl_for(opts: dict):
+    """
+    A ``YoutubeDL`` for ``opts``. In a worker it is reused by every job with
+    the same options apart from ``format``, which is applied per call.
+    Outside the pool a new instance is returned each time.
+    """
+    import yt_dlp
+
+    if not _in_worker:
+        return yt_dlp.YoutubeDL(opts)
+    key = _profile_key(opts)
+    ydl = _instances.get(key)
+    if ydl is None:
+        ydl = _instances[key] = yt_dlp.YoutubeDL(opts)
+        ydl.add_progress_hook(_job_hook)
+        ydl.add_postprocessor_hook(_job_hook)
+        while len(_instances) > MAX_INSTANCES:
+            _, oldest = _instances.popitem(last=False)
+            oldest.close()
+    else:
+        _instances.move_to_end(key)
+        fmt = opts.get("format")
+        ydl.params["format"] = fmt
+        ydl.format_selector = (
+            fmt
+            if fmt in (None, "-") or callable(fmt)
+            else ydl.build_format_selector(fmt)
+        )
+    return ydl
+
+
+def _counter_deltas(before: dict, after: dict) -> dict:
+    deltas = {}
+    for name, series in after.items():
+        old = before.get(name, {})
+        changed = {
+            key: value - old.get(key, 0)
+            for key, value in series.items()
+            if value != old.get(key, 0)
+        }
+        if changed:
+            deltas[name] = changed
+    return deltas
+
+
+def _portable(error: Exception) -> Exception:
+    """The exception itself if it survives the pipe, else just its message."""
+    try:
+        # yt-dlp errors carry the traceback of their cause, which cannot pickle
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return YtDlpWorkerError(f"{type(error).__name__}: {error}")
+
+
+def _receive(conn: Connection, jobs: queue.SimpleQueue) -> None:
+    """
+    Reads the pipe while the main thread runs jobs, so a cancel reaches the
+    job it is meant for. The parent only sends a job after the previous
+    reply, so a late cancel finds a token that is already finished.
+    """
+    token = None
+    while True:
+        try:
+            message = conn.recv_bytes()
+        except (EOFError, OSError):
+            message = b""
+        if message == CANCEL:
+            if token is not None:
+                token.cancel()
+            continue
+        token = CancelToken()
+        jobs.put((message, token))
+        if not message:
+            return
+
+
+def _worker_main(conn: Connection, max_jobs: int, preload: tuple[str, ...]) -> None:
+    global _in_worker, _token
+    _in_worker = True
+    # Ctrl+C reaches the whole process group, the parent decides when we stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from yt_dlp.extractor import gen_extractor_classes
+
+    gen_extractor_classes()
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"yt-dlp worker could not preload {name}: {e}")
+
+    jobs: queue.SimpleQueue = queue.SimpleQueue()
+    threading.Thread(target=_receive, args=(conn, jobs), daemon=True).start()
+    try:
+        for _ in range(max_jobs):
+            job, _token = jobs.get()
+            if not job:
+                return
+            before = REGISTRY.counter_values()
+            try:
+                func, args, kwargs = pickle.loads(job)
+                reply = ("ok", func(*args, **kwargs))
+            except Exception as e:
+                reply = ("error", _portable(e))
+            if _token.cancelled:
+                _token.cleanup()
+                reply = ("cancelled", None)
+            _token = None
+            counts = _counter_deltas(before, REGISTRY.counter_values())
+            try:
+                conn.send((*reply, counts))
+            except Exception as e:
+                error = YtDlpWorkerError(f"Job result does not pickle: {e}")
+                conn.send(("error", error, counts))
+    finally:
+        for ydl in _instances.values():
+            ydl.close()
+
+
+class _Worker:
+    def __init__(self, context, max_jobs: int, preload: tuple[str, ...]) -> None:
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child, max_jobs, preload),
+            name="yt-dlp-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.jobs_left = max_jobs
+        # the last job was cancelled and the worker confirmed it stopped
+        self.stopped = False
+
+    async def _readable(self) -> None:
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await readable
+        finally:
+            loop.remove_reader(fd)
+
+    async def call(self, func: Callable, args: tuple, kwargs: dict) -> tuple:
+        self.conn.send_bytes(pickle.dumps((func, args, kwargs)))
+        self.jobs_left -= 1
+        try:
+            await self._readable()
+        except asyncio.CancelledError:
+            await self._stop()
+            raise
+        return self._reply()
+
+    async def _stop(self) -> None:
+        """Asks the job to stop; it has ``CANCEL_GRACE`` to answer."""
+        self.conn.send_bytes(CANCEL)
+        try:
+            await asyncio.wait_for(self._readable(), CANCEL_GRACE)
+            _, _, counts = self._reply()
+        except (asyncio.TimeoutError, YtDlpWorkerError):
+            CANCELLED_DOWNLOADS.inc(runner="worker", result="killed")
+            return
+        REGISTRY.add_counter_values(counts)
+        CANCELLED_DOWNLOADS.inc(runner="worker", result="stopped")
+        self.stopped = True
+
+    def _reply(self) -> tuple:
+        try:
+            return self.conn.recv()
+        except EOFError:
+            raise YtDlpWorkerError("yt-dlp worker exited during the job") from None
+        except Exception as e:
+            raise YtDlpWorkerError(f"Unreadable yt-dlp worker reply: {e}") from e
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.conn.close()
+
+
+class YtDlpPool:
+    def __init__(self, workers: int, max_jobs: int, prestart: int) -> None:
+        self.workers = workers
+        self.max_jobs = max_jobs
+        # started ahead of the first job, the rest are spawned when needed
+        self.prestart = min(prestart, workers)
+        self.active = 0
+        self.waiting = 0
+        self._idle: list[_Worker] = []
+        self._busy: set[_Worker] = set()
+        self._slots: asyncio.Semaphore | None = None
+        # modules jobs came from, imported by new workers before their first job
+        self._modules: set[str] = set()
+        self._context = multiprocessing.get_context("spawn")
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, self.max_jobs, tuple(sorted(self._modules)))
+
+    async def start(self) -> None:
+        """Starts ``prestart`` workers ahead of the first request."""
+        while len(self._idle) + len(self._busy) < self.prestart:
+            self._idle.append(self._spawn())
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Runs ``func(*args, **kwargs)`` in a worker and returns its result."""
+        return await self._run(func, args, kwargs, timeout=None)
+
+    async def run_timed(self, timeout: float, func: Callable, *args, **kwargs) -> Any:
+        """
+        ``run`` that raises ``asyncio.TimeoutError`` once the job has run for
+        ``timeout`` seconds. Waiting for a free worker doesn't count.
+        """
+        return await self._run(func, args, kwargs, timeout=timeout)
+
+    async def _run(
+        self, func: Callable, args: tuple, kwargs: dict, timeout: float | None
+    ) -> Any:
+        self._modules.add(func.__module__)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        worker = self._idle.pop() if self._idle else self._spawn()
+        self._busy.add(worker)
+        try:
+            status, value, counts = await asyncio.wait_for(
+                worker.call(func, args, kwargs), timeout
+            )
+        except BaseException as e:
+            if worker.stopped:
+                # the cancelled job gave up at a hook, the worker is fine
+                self._release(worker)
+                raise
+            # cancelled without stopping in time, or the process is gone
+            worker.kill()
+            reason = "died" if isinstance(e, YtDlpWorkerError) else "killed"
+            YTDLP_WORKER_EXITS.inc(reason=reason)
+            raise
+        else:
+            self._release(worker)
+        finally:
+            self._busy.discard(worker)
+            self.active -= 1
+            self._slots.release()
+
+        REGISTRY.add_counter_values(counts)
+        if status == "error":
+            raise value
+        return value
+
+    def _release(self, worker: _Worker) -> None:
+        worker.stopped = False
+        if worker.jobs_left > 0:
+            self._idle.append(worker)
+        else:
+            # it exits on its own after the last job
+            worker.conn.close()
+            YTDLP_WORKER_EXITS.inc(reason="recycled")
+
+    async def stop(self) -> None:
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            try:
+                worker.conn.send_bytes(b"")
+            except OSError:
+                pass
+        for worker in self._busy:
+            worker.kill()
+        await asyncio.to_thread(lambda: [worker.process.join(5) for worker in idle])
+        for worker in idle:
+            if worker.process.is_alive():
+                worker.kill()
+
+
+_CORES = multiprocessing.cpu_count() or 1
+
+# as many downloads as the thread pools before it allowed: 16 threads for
+# audio/video (fewer on small machines) plus the default executor for Shorts
+ytdlp_pool = YtDlpPool(
+    settings.YTDLP_WORKERS or min(16, _CORES * 4) + min(32, _CORES + 4),
+    settings.YTDLP_MAX_JOBS,
+    prestart=min(8, _CORES * 2),
+)
+ytdlp_search_pool = YtDlpPool(
+    settings.YTDLP_SEARCH_WORKERS or min(8, _CORES * 2),
+    settings.YTDLP_MAX_JOBS,
+    prestart=1,
+)
@@ -0,0 +1,28 @@
+import logging
+
+from aiohttp import web
+
+from app.core.monitoring.metrics import CONTENT_TYPE, render
+from app.core.settings.config import get_settings, Settings
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(text=await render(), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def start_metrics_server() -> web.AppRunner | None:
+    """Serves ``GET /metrics`` on ``METRICS_PORT`` when it is configured."""
+    if settings.METRICS_PORT is None:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, settings.METRICS_HOST, settings.METRICS_PORT).start()
+    logger.info(
+        f"Metrics server listening on {settings.METRICS_HOST}:{settings.METRICS_PORT}"
+    )
+    return runner
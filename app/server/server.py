@@ -2,38 +2,40 @@ import asyncio, logging, sys
 
 from aiogram import Bot, Dispatcher
 from aiogram.utils.i18n import I18n
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.client.telegram import TelegramAPIServer
 
 from app.bot.routers import v1_router
+from app.bot.handlers.statistics_handler import statistics_aggregator
+from app.bot.controller.broadcast_controller import resume_broadcasts
+from app.bot.state.fsm_storage import SessionFSMStorage
+from app.bot.state.session_store import session_store
+from app.core.middlewares.bot_api_metrics import BotAPIMetricsMiddleware
 from app.core.middlewares.language_middleware import UserI18nMiddleware
+from app.core.middlewares.tracing import BotAPITracingMiddleware, TracingMiddleware
+from app.core.monitoring.collectors import register_default_collectors
+from app.core.monitoring.tracing import setup_tracing, shutdown_tracing
+from app.core.monitoring.watchdog import start_watchdog, stop_watchdog
 from app.core.settings.config import get_settings, Settings
+from app.core.utils.ytdlp_pool import ytdlp_pool, ytdlp_search_pool
 from app.core.extensions.utils import WORKDIR
 from app.core.middlewares.channel_join import CheckSubscriptionMiddleware
 from app.core.middlewares.group_chat_middle import GroupChatMiddleware
 from app.server.init import init, admin_init, set_default_commands
 from app.server.logout import log_out
+from app.server.metrics import start_metrics_server
+from app.server.webhook import run_webhook
 
 settings: Settings = get_settings()
 i18n = I18n(path=WORKDIR / "locales", default_locale="uz", domain="messages")
 
 
-async def main() -> None:
-    if settings.USE_LOCAL_BOT_API:
-        bot = Bot(token=settings.BOT_TOKEN)
-        if settings.FORCE_BOT_LOGOUT_ON_STARTUP:
-            await log_out(bot, 10)
-        local_server = TelegramAPIServer.from_base(settings.LOCAL_BOT_API_URL)
-        bot = Bot(token=settings.BOT_TOKEN, server=local_server)
-    else:
-        bot = Bot(token=settings.BOT_TOKEN)
-
-    init()
-    await bot.delete_webhook(drop_pending_updates=True)
-
+def build_dispatcher() -> Dispatcher:
+    """Dispatcher with every middleware, router and lifecycle hook attached."""
     i18n_middleware = UserI18nMiddleware(i18n)
-    dp = Dispatcher(storage=MemoryStorage())
-    dp.bot = bot
+    dp = Dispatcher(storage=SessionFSMStorage(session_store, ttl=settings.FSM_TTL))
+
+    # Root span of every update, the inner middlewares are traced under it
+    dp.update.outer_middleware(TracingMiddleware())
 
     # Group chat middleware
     dp.message.middleware(GroupChatMiddleware())
@@ -50,9 +52,57 @@ async def main() -> None:
     # Routerlarni qo'shish
     dp.include_router(v1_router)
 
+    # Statistics are buffered in memory and flushed in batches
+    dp.startup.register(statistics_aggregator.start)
+    dp.shutdown.register(statistics_aggregator.stop)
+    # Broadcasts interrupted by a restart continue from their checkpoint
+    dp.startup.register(resume_broadcasts)
+    # Expired sessions are purged in the background
+    dp.startup.register(session_store.start)
+    dp.shutdown.register(session_store.stop)
+    # Blocking calls on the event loop are reported by call site
+    dp.startup.register(start_watchdog)
+    dp.shutdown.register(stop_watchdog)
+    dp.startup.register(setup_tracing)
+    dp.shutdown.register(shutdown_tracing)
+    # yt-dlp worker processes are started before the first download
+    dp.startup.register(ytdlp_pool.start)
+    dp.shutdown.register(ytdlp_pool.stop)
+    dp.startup.register(ytdlp_search_pool.start)
+    dp.shutdown.register(ytdlp_search_pool.stop)
+    return dp
+
+
+async def main() -> None:
+    if settings.USE_LOCAL_BOT_API:
+        bot = Bot(token=settings.BOT_TOKEN)
+        if settings.FORCE_BOT_LOGOUT_ON_STARTUP:
+            await log_out(bot, 10)
+        local_server = TelegramAPIServer.from_base(settings.LOCAL_BOT_API_URL)
+        bot = Bot(token=settings.BOT_TOKEN, server=local_server)
+    else:
+        bot = Bot(token=settings.BOT_TOKEN)
+    bot.session.middleware(BotAPIMetricsMiddleware())
+    bot.session.middleware(BotAPITracingMiddleware())
+
+    init()
+    register_default_collectors()
+
+    dp = build_dispatcher()
+    dp.bot = bot
+
     await set_default_commands(bot)
     await admin_init()
-    await dp.start_polling(bot, drop_pending_updates=True)
+    if settings.USE_WEBHOOK:
+        await run_webhook(dp, bot)
+    else:
+        metrics_runner = await start_metrics_server()
+        await bot.delete_webhook(drop_pending_updates=True)
+        try:
+            await dp.start_polling(bot, drop_pending_updates=True)
+        finally:
+            if metrics_runner:
+                await metrics_runner.cleanup()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import ssl
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import FSInputFile
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from app.core.settings.config import get_settings, Settings
+from app.server.metrics import metrics
+
+logger = logging.getLogger(__name__)
+settings: Settings = get_settings()
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok"})
+
+
+def get_ssl_context() -> ssl.SSLContext | None:
+    if not (settings.WEBHOOK_SSL_CERT and settings.WEBHOOK_SSL_KEY):
+        return None
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(settings.WEBHOOK_SSL_CERT, settings.WEBHOOK_SSL_KEY)
+    return context
+
+
+async def webhook_is_current(bot: Bot, allowed_updates: list[str]) -> bool:
+    """
+    Whether Telegram already delivers to this URL with these update types.
+    The secret is not reported back, changing it needs ``WEBHOOK_FORCE_SET``.
+    """
+    info = await bot.get_webhook_info()
+    return (
+        info.url == settings.webhook_url
+        and set(info.allowed_updates or ()) == set(allowed_updates)
+        and bool(info.has_custom_certificate) == bool(settings.WEBHOOK_SSL_CERT)
+    )
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    async def on_startup(bot: Bot) -> None:
+        allowed_updates = dp.resolve_used_update_types()
+        # every instance starts with this; re-registering from each of them
+        # would be redundant, and dropping updates would lose the queue
+        if (
+            not settings.WEBHOOK_FORCE_SET
+            and not settings.WEBHOOK_DROP_PENDING_UPDATES
+            and await webhook_is_current(bot, allowed_updates)
+        ):
+            logger.info(f"Webhook already set to {settings.webhook_url}")
+            return
+        # a self-signed certificate has to be uploaded to Telegram
+        certificate = (
+            FSInputFile(settings.WEBHOOK_SSL_CERT)
+            if settings.WEBHOOK_SSL_CERT
+            else None
+        )
+        await bot.set_webhook(
+            url=settings.webhook_url,
+            certificate=certificate,
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=allowed_updates,
+            drop_pending_updates=settings.WEBHOOK_DROP_PENDING_UPDATES,
+        )
+        logger.info(f"Webhook set to {settings.webhook_url}")
+
+    dp.startup.register(on_startup)
+
+    app = web.Application()
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    SimpleRequestHandler(
+        dispatcher=dp, bot=bot, secret_token=settings.WEBHOOK_SECRET
+    ).register(app, path=settings.WEBHOOK_PATH)
+    # runs dp.startup / dp.shutdown together with the aiohttp app
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    if not settings.WEBHOOK_BASE_URL:
+        raise RuntimeError("WEBHOOK_BASE_URL is required when USE_WEBHOOK is on")
+
+    runner = web.AppRunner(build_webhook_app(dp, bot))
+    await runner.setup()
+    site = web.TCPSite(
+        runner,
+        host=settings.WEBHOOK_HOST,
+        port=settings.WEBHOOK_PORT,
+        ssl_context=get_ssl_context(),
+    )
+    await site.start()
+    logger.info(
+        f"Webhook server listening on {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}"
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,6 @@
+"""
+Background worker that executes queued jobs (downloads, transcodes, music
+recognition) outside the process that receives Telegram updates.
+
+Run one or more with ``python -m app.worker``.
+"""
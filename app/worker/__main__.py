@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import signal
+
+from aiogram import Bot
+from aiogram.client.telegram import TelegramAPIServer
+
+from app.bot.handlers.statistics_handler import statistics_aggregator
+from app.core.middlewares.bot_api_metrics import BotAPIMetricsMiddleware
+from app.core.middlewares.tracing import BotAPITracingMiddleware
+from app.core.monitoring.collectors import register_default_collectors
+from app.core.monitoring.tracing import setup_tracing, shutdown_tracing
+from app.core.monitoring.watchdog import start_watchdog, stop_watchdog
+from app.core.settings.config import get_settings
+from app.server.init import init
+from app.server.metrics import start_metrics_server
+from app.worker.runner import Worker
+
+settings = get_settings()
+
+
+def create_bot() -> Bot:
+    if settings.USE_LOCAL_BOT_API:
+        local_server = TelegramAPIServer.from_base(settings.LOCAL_BOT_API_URL)
+        bot = Bot(token=settings.BOT_TOKEN, server=local_server)
+    else:
+        bot = Bot(token=settings.BOT_TOKEN)
+    bot.session.middleware(BotAPIMetricsMiddleware())
+    bot.session.middleware(BotAPITracingMiddleware())
+    return bot
+
+
+async def main(concurrency: int) -> None:
+    init()
+    register_default_collectors()
+    bot = create_bot()
+    worker = Worker(bot, concurrency)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    await statistics_aggregator.start()
+    await start_watchdog()
+    await setup_tracing()
+    metrics_runner = await start_metrics_server()
+    try:
+        await worker.run()
+    finally:
+        await shutdown_tracing()
+        await stop_watchdog()
+        await statistics_aggregator.stop()
+        await bot.session.close()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued media jobs")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.WORKER_CONCURRENCY,
+        help="jobs executed at the same time by this process",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
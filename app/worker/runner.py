@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import socket
+
+from aiogram import Bot
+
+from app.bot.handlers.job_handler import (
+    claim_jobs,
+    complete_job,
+    extend_job_lock,
+    fail_job,
+    is_job_cancelled,
+)
+from app.bot.models import Job
+from app.core.extensions.enums import JobStatus
+from app.core.monitoring.metrics import WORKER_ACTIVE_JOBS
+from app.core.monitoring.tracing import trace
+from app.core.settings.config import get_settings
+from app.worker.tasks import TASKS, JobError, Task
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class Worker:
+    """Polls the jobs table and runs up to ``concurrency`` jobs at a time."""
+
+    def __init__(self, bot: Bot, concurrency: int) -> None:
+        self.bot = bot
+        self.concurrency = concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._active: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        logger.info(f"Worker {self.worker_id} started ({self.concurrency} slots)")
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._active)
+            claimed = []
+            if free > 0:
+                try:
+                    claimed = await claim_jobs(self.worker_id, free)
+                except Exception as e:
+                    logger.error(f"Could not claim jobs: {e}")
+            for job in claimed:
+                task = asyncio.create_task(self._execute(job))
+                self._active.add(task)
+                task.add_done_callback(self._active.discard)
+            if free <= 0 or len(claimed) == free:
+                # every slot is busy, wait for one to free up
+                await asyncio.wait(self._active, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                # the queue is drained, poll again later
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), settings.JOB_POLL_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+        if self._active:
+            logger.info(f"Waiting for {len(self._active)} running jobs")
+            await asyncio.gather(*self._active, return_exceptions=True)
+
+    async def _execute(self, job: Job) -> None:
+        with trace(f"job.{job.kind}", job_id=job.id, attempt=job.attempts):
+            await self._run_job(job)
+
+    async def _run_job(self, job: Job) -> None:
+        task = TASKS.get(job.kind)
+        if task is None:
+            job.attempts = job.max_attempts
+            await fail_job(job, f"Unknown job kind: {job.kind}")
+            return
+        if job.attempts > job.max_attempts:
+            # a worker died holding it on its last attempt
+            job.attempts = job.max_attempts
+            await self._fail(task, job, job.last_error or "Visibility timeout")
+            return
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        running = asyncio.create_task(task.run(self.bot, job))
+        watcher = asyncio.create_task(self._watch_cancellation(job, running))
+        WORKER_ACTIVE_JOBS.inc()
+        try:
+            result = await running
+        except asyncio.CancelledError:
+            if not watcher.done():
+                raise
+            logger.info(f"Job {job.id} ({job.kind}) was cancelled")
+        except JobError as e:
+            logger.warning(f"Job {job.id} ({job.kind}) failed: {e}")
+            await self._fail(task, job, str(e))
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.kind}) failed")
+            await self._fail(task, job, str(e) or e.__class__.__name__)
+        else:
+            await complete_job(job.id, result)
+        finally:
+            heartbeat.cancel()
+            watcher.cancel()
+            WORKER_ACTIVE_JOBS.dec()
+
+    async def _fail(self, task: Task, job: Job, error: str) -> None:
+        status = await fail_job(job, error)
+        if status == JobStatus.DEAD and task.on_dead:
+            job.last_error = error
+            try:
+                await task.on_dead(self.bot, job)
+            except Exception as e:
+                logger.error(f"on_dead for job {job.id} failed: {e}")
+
+    async def _watch_cancellation(self, job: Job, running: asyncio.Task) -> None:
+        """Cancels ``running`` once the job is cancelled from the bot."""
+        while True:
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+            try:
+                if await is_job_cancelled(job.id):
+                    running.cancel()
+                    return
+            except Exception as e:
+                logger.warning(f"Could not check job {job.id} for cancellation: {e}")
+
+    async def _heartbeat(self, job: Job) -> None:
+        interval = max(settings.JOB_VISIBILITY_TIMEOUT / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await extend_job_lock(job.id, self.worker_id)
+            except Exception as e:
+                logger.warning(f"Could not extend lock of job {job.id}: {e}")
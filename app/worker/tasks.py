@@ -0,0 +1,215 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.bot.models import Job
+from app.core.extensions.enums import JobKind
+from app.core.utils.transcoder import Priority, TranscodeError, transcoder
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    """Raised by a task when the job should be retried."""
+
+
+@dataclass
+class Task:
+    run: Callable[[Bot, Job], Awaitable[dict | None]]
+    # called once the job is dead-lettered, to tell the user
+    on_dead: Callable[[Bot, Job], Awaitable[None]] | None = None
+
+
+async def _reply(bot: Bot, payload: dict, text: str, **kwargs) -> None:
+    try:
+        await bot.send_message(
+            payload["chat_id"],
+            text,
+            reply_to_message_id=payload.get("message_id"),
+            **kwargs,
+        )
+    except TelegramAPIError as e:
+        logger.error(f"Could not reply to chat {payload['chat_id']}: {e}")
+
+
+async def _delete_processing_message(bot: Bot, payload: dict) -> None:
+    if not payload.get("processing_message_id"):
+        return
+    try:
+        await bot.delete_message(payload["chat_id"], payload["processing_message_id"])
+    except TelegramAPIError:
+        pass
+
+
+async def run_download(bot: Bot, job: Job) -> dict | None:
+    from app.bot.handlers.group_handler import (
+        group_controller,
+        remove_files,
+        send_media_files,
+    )
+    from app.bot.handlers.job_handler import start_delivery
+    from app.bot.handlers.statistics_handler import update_statistics
+
+    payload = job.payload
+    downloads, failed = [], []
+    try:
+        for url in payload["urls"]:
+            result = await group_controller.download_media(url)
+            if result["success"] and result["files"]:
+                platform = group_controller.detect_platform(url)
+                downloads.append(
+                    {
+                        "url": url,
+                        "platform": platform.value if platform else "unknown",
+                        "files": result["files"],
+                    }
+                )
+            else:
+                failed.append((url, result.get("message", "Noma'lum xatolik")))
+
+        if not downloads:
+            raise JobError("; ".join(message for _, message in failed))
+
+        files = [f for download in downloads for f in download["files"]]
+        if not await start_delivery(job.id):
+            # cancelled (and refunded) before the watcher stopped us
+            remove_files(files)
+            return None
+        await send_media_files(bot, payload["chat_id"], payload["message_id"], files)
+    except asyncio.CancelledError:
+        # cancelled from the bot: nothing more is sent, nothing is kept
+        remove_files(f for download in downloads for f in download["files"])
+        raise
+    await _delete_processing_message(bot, payload)
+
+    text = f"✅ {len(files)} ta fayl yuklandi"
+    if failed:
+        text += f"\n❌ {len(failed)} ta link yuklanmadi"
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="🎵 Musiqa yuklash",
+                    callback_data=f"group_music_job:{job.id}:{payload['user_id']}",
+                )
+            ]
+        ]
+    )
+    await _reply(bot, payload, text, reply_markup=keyboard)
+    await update_statistics(
+        payload["user_id"], field=payload.get("statistics_field", "from_group")
+    )
+    return {"downloads": downloads}
+
+
+async def download_dead(bot: Bot, job: Job) -> None:
+    from app.bot.handlers.job_handler import refund_job_quota
+
+    await refund_job_quota(job)
+    await _delete_processing_message(bot, job.payload)
+    await _reply(
+        bot,
+        job.payload,
+        f"❌ Hech qanday media yuklanmadi:\n\n{job.last_error or ''}"[:4000],
+    )
+
+
+async def run_recognize(bot: Bot, job: Job) -> dict:
+    from app.bot.extensions.clear import atomic_clear
+    from app.bot.handlers import shazam_handler as shz
+    from app.bot.handlers.group_handler import (
+        extract_audio_for_platform,
+        group_controller,
+        remove_files,
+    )
+
+    payload = job.payload
+    files = payload["files"]
+    fetched = not any(Path(f["path"]).exists() for f in files)
+    if fetched:
+        # the download ran on another host, fetch the post again
+        result = await group_controller.download_media(payload["url"])
+        if not result["success"] or not result["files"]:
+            raise JobError(result.get("message") or "Media yuklanmadi")
+        files = result["files"]
+
+    try:
+        audio_path = await extract_audio_for_platform(
+            payload["platform"], payload["url"], files
+        )
+        if not audio_path or not Path(audio_path).exists():
+            raise JobError("Audio ajratib bo'lmadi")
+
+        try:
+            shazam_hits = await shz.recognise_music_from_audio(audio_path)
+        finally:
+            await atomic_clear(audio_path)
+    finally:
+        if fetched:
+            remove_files(files)
+
+    if not shazam_hits:
+        await _reply(bot, payload, "❌ Musiqa tanib olinmadi")
+        return {"recognized": False}
+
+    track = shazam_hits[0]["track"]
+    title, artist = track["title"], track["subtitle"]
+    await _reply(
+        bot,
+        payload,
+        f"🎵 <b>Topilgan musiqa:</b>\n\n"
+        f"🎤 <b>Nomi:</b> {title}\n"
+        f"👤 <b>Ijrochi:</b> {artist}",
+        parse_mode="HTML",
+    )
+
+    # video fayllar endi kerak emas
+    for file_info in files:
+        if file_info.get("type") == "video":
+            Path(file_info["path"]).unlink(missing_ok=True)
+    return {"recognized": True, "title": title, "artist": artist}
+
+
+async def recognize_dead(bot: Bot, job: Job) -> None:
+    await _reply(bot, job.payload, "❌ Musiqa tanib olishda xatolik")
+
+
+async def run_transcode(bot: Bot, job: Job) -> dict:
+    """Converts a file to a Telegram friendly H.264/AAC mp4."""
+    payload = job.payload
+    source = Path(payload["path"])
+    if not source.exists():
+        raise JobError(f"File not found: {source}")
+    target = source.with_name(f"{source.stem}_h264.mp4")
+
+    try:
+        await transcoder.to_telegram(
+            source, target, platform="worker", priority=Priority.BACKGROUND
+        )
+    except TranscodeError as e:
+        raise JobError(str(e))
+
+    if payload.get("chat_id"):
+        await bot.send_video(
+            payload["chat_id"],
+            video=FSInputFile(target),
+            caption=payload.get("caption"),
+            reply_to_message_id=payload.get("message_id"),
+            supports_streaming=True,
+        )
+        target.unlink(missing_ok=True)
+        source.unlink(missing_ok=True)
+    return {"path": str(target)}
+
+
+TASKS: dict[str, Task] = {
+    JobKind.DOWNLOAD.value: Task(run=run_download, on_dead=download_dead),
+    JobKind.RECOGNIZE.value: Task(run=run_recognize, on_dead=recognize_dead),
+    JobKind.TRANSCODE.value: Task(run=run_transcode),
+}
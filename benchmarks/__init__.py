@@ -0,0 +1,8 @@
+"""
+Offline benchmarks.
+
+Nothing here talks to the network: Telegram and the download platforms are
+replaced by local aiohttp servers (``fake_telegram``, ``fake_platforms``) and
+outgoing HTTP for known platform hosts is rewritten to point at them
+(``redirect``). Run ``python -m benchmarks.e2e --help`` for the options.
+"""
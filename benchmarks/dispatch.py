@@ -0,0 +1,374 @@
+"""
+Per-update fixed cost of the dispatcher.
+
+Feeds synthetic messages and callbacks one at a time through the production
+``Dispatcher`` (all routers and middlewares) with SQLite standing in for
+PostgreSQL, and stops each update right before its handler would run. Reports
+where the time goes per stage, how many DB queries and Bot API calls each
+update costs and which router ended up handling it::
+
+    python -m benchmarks.dispatch --updates 2000 --channels 3
+
+Stages: ``outer`` is the update-level outer middlewares (FSM context),
+``routing`` the time from there to the first inner middleware (every
+router's filters until one matches), and each middleware stage is its own
+time excluding what runs after it.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import TelegramObject
+
+from benchmarks.fake_telegram import FakeTelegramAPI
+from benchmarks.report import write_json
+from benchmarks.scenarios import USER_ID_BASE, Scenario, make_update
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+SCENARIOS: dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("music_search", "music_router", make_text=lambda i: "imagine"),
+        Scenario("start", "start_router", make_text=lambda i: "/start"),
+        Scenario(
+            "youtube",
+            "shorts_router",
+            make_text=lambda i: f"https://youtu.be/dQw4w9WgXc{i % 10}",
+        ),
+        Scenario(
+            "tiktok",
+            "tiktok_router",
+            make_text=lambda i: f"https://www.tiktok.com/@bench/video/{i}",
+        ),
+        Scenario(
+            "likee",
+            "likee_router",
+            make_text=lambda i: f"https://likee.video/@bench/video/{i}",
+        ),
+        Scenario(
+            "callback",
+            "twitter_router",
+            callback_data="twitter:download_music",
+        ),
+    )
+}
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args) -> None:
+        self.count += 1
+
+
+class Probe:
+    """Collects timestamps and counters of the update being dispatched."""
+
+    def __init__(self, queries: QueryCounter, telegram: FakeTelegramAPI) -> None:
+        self.queries = queries
+        self.telegram = telegram
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = 0.0
+        self.routing_started = 0.0
+        self.first_stage = 0.0
+        self.stages: dict[str, float] = {}
+        self.stage_queries: dict[str, int] = {}
+        self.reached: str | None = None
+
+    def api_calls(self) -> int:
+        return sum(self.telegram.calls.values())
+
+
+class UpdateProbe(BaseMiddleware):
+    """Stamps ``attribute`` of the probe when the update passes by."""
+
+    def __init__(self, probe: Probe, attribute: str) -> None:
+        self.probe = probe
+        self.attribute = attribute
+
+    async def __call__(self, handler: Handler, event, data: dict) -> Any:
+        setattr(self.probe, self.attribute, time.perf_counter())
+        return await handler(event, data)
+
+
+class StageProbe(BaseMiddleware):
+    """Wraps a middleware and records its inclusive time and DB queries."""
+
+    def __init__(self, name: str, middleware, probe: Probe) -> None:
+        self.name = name
+        self.middleware = middleware
+        self.probe = probe
+
+    async def __call__(self, handler: Handler, event, data: dict) -> Any:
+        probe = self.probe
+        started = time.perf_counter()
+        if not probe.first_stage:
+            probe.first_stage = started
+        queries = probe.queries.count
+        try:
+            return await self.middleware(handler, event, data)
+        finally:
+            probe.stages[self.name] = time.perf_counter() - started
+            probe.stage_queries[self.name] = probe.queries.count - queries
+
+
+class HandlerStop(BaseMiddleware):
+    """Records which router's handler matched and skips running it."""
+
+    def __init__(self, probe: Probe) -> None:
+        self.probe = probe
+
+    async def __call__(self, handler: Handler, event, data: dict) -> Any:
+        if not self.probe.first_stage:
+            self.probe.first_stage = time.perf_counter()
+        handler_object = data.get("handler")
+        module = getattr(getattr(handler_object, "callback", None), "__module__", "")
+        self.probe.reached = module.rsplit(".", 1)[-1] or "unknown"
+        return None
+
+
+def instrument(dp: Dispatcher, probe: Probe) -> list[str]:
+    """Wraps every inner middleware in a ``StageProbe``. Returns stage names."""
+    outer = list(dp.update.outer_middleware)
+    for middleware in outer:
+        dp.update.outer_middleware.unregister(middleware)
+    dp.update.outer_middleware(UpdateProbe(probe, "started"))
+    for middleware in outer:
+        dp.update.outer_middleware(middleware)
+    dp.update.outer_middleware(UpdateProbe(probe, "routing_started"))
+
+    names = []
+    for observer in (dp.message, dp.callback_query):
+        middlewares = list(observer.middleware)
+        for middleware in middlewares:
+            observer.middleware.unregister(middleware)
+        for middleware in middlewares:
+            name = type(middleware).__name__
+            observer.middleware(StageProbe(name, middleware, probe))
+            if name not in names:
+                names.append(name)
+        observer.middleware(HandlerStop(probe))
+    return names
+
+
+async def prepare_database(users: int, channels: int) -> QueryCounter:
+    from sqlalchemy import event
+
+    from app.bot.models import AdminRequirements, Channel, User
+    from app.core.databases.postgres import get_async_engine, get_general_session
+    from app.core.models.base import Base
+
+    engine = get_async_engine()
+    tables = [model.__table__ for model in (User, AdminRequirements, Channel)]
+    # SQLite can't autoincrement a composite key (users is id + tg_id), so
+    # seeded rows carry their own ids and every sender is a seeded user
+    User.__table__.c.id.autoincrement = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=tables)
+
+    async with get_general_session() as session:
+        session.add(AdminRequirements(referral_count_for_free_month=10))
+        for i in range(users):
+            session.add(
+                User(
+                    id=i + 1,
+                    tg_id=USER_ID_BASE + i,
+                    first_name="Bench",
+                    language_code="en",
+                    last_active=datetime.now(),
+                )
+            )
+        for i in range(channels):
+            session.add(
+                Channel(
+                    name=f"bench{i}",
+                    link=f"https://t.me/bench{i}",
+                    channel_id=-100_000_000_000 - i,
+                )
+            )
+        await session.commit()
+
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    return counter
+
+
+def _us(seconds: list[float]) -> dict:
+    if not seconds:
+        return {"mean_us": 0.0, "p50_us": 0.0}
+    return {
+        "mean_us": round(statistics.fmean(seconds) * 1e6, 1),
+        "p50_us": round(statistics.median(seconds) * 1e6, 1),
+    }
+
+
+async def run_scenario(
+    dp: Dispatcher,
+    bot: Bot,
+    probe: Probe,
+    stage_names: list[str],
+    scenario: Scenario,
+    updates: int,
+    users: int,
+) -> dict:
+    totals: list[float] = []
+    outer: list[float] = []
+    routing: list[float] = []
+    self_times: defaultdict[str, list[float]] = defaultdict(list)
+    queries: list[int] = []
+    stage_queries: defaultdict[str, list[int]] = defaultdict(list)
+    api_calls: list[int] = []
+    reached: Counter[str] = Counter()
+
+    for i in range(updates):
+        update = make_update(scenario, i + 1, USER_ID_BASE + i % users)
+        probe.reset()
+        queries_before = probe.queries.count
+        calls_before = probe.api_calls()
+        await dp.feed_update(bot, update)
+        finished = time.perf_counter()
+
+        totals.append(finished - probe.started)
+        outer.append(probe.routing_started - probe.started)
+        if probe.first_stage:
+            routing.append(probe.first_stage - probe.routing_started)
+        # inclusive times nest, so a stage's own time is minus the next stage
+        ran = [name for name in stage_names if name in probe.stages]
+        for name, inner in zip(ran, ran[1:] + [None]):
+            own = probe.stages[name] - (probe.stages[inner] if inner else 0.0)
+            self_times[name].append(own)
+            stage_queries[name].append(probe.stage_queries[name])
+        queries.append(probe.queries.count - queries_before)
+        api_calls.append(probe.api_calls() - calls_before)
+        reached[probe.reached or "unhandled"] += 1
+
+    return {
+        "scenario": scenario.name,
+        "expected_router": scenario.router,
+        "reached": dict(reached),
+        "updates": updates,
+        "total": _us(totals),
+        "outer": _us(outer),
+        "routing": _us(routing),
+        "stages": {
+            name: {
+                **_us(self_times[name]),
+                "queries": round(statistics.fmean(stage_queries[name]), 2),
+            }
+            for name in stage_names
+            if self_times[name]
+        },
+        "queries_per_update": round(statistics.fmean(queries), 2),
+        "api_calls_per_update": round(statistics.fmean(api_calls), 2),
+    }
+
+
+def format_result(result: dict) -> str:
+    reached = ", ".join(f"{k} x{v}" for k, v in result["reached"].items())
+    lines = [f"{result['scenario']} -> {reached}"]
+    for name in ("total", "outer", "routing"):
+        times = result[name]
+        lines.append(
+            f"  {name:<28} {times['p50_us']:>10} us p50"
+            f" {times['mean_us']:>10} us mean"
+        )
+    for name, stage in result["stages"].items():
+        lines.append(
+            f"  {name:<28} {stage['p50_us']:>10} us p50"
+            f" {stage['mean_us']:>10} us mean {stage['queries']:>5} queries"
+        )
+    lines.append(
+        f"  {result['queries_per_update']} DB queries,"
+        f" {result['api_calls_per_update']} Bot API calls per update"
+    )
+    return "\n".join(lines)
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    db_dir = tempfile.mkdtemp(prefix="dispatch-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_dir}/bench.db"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from app.server.server import build_dispatcher
+
+    telegram = FakeTelegramAPI()
+    await telegram.start()
+    api = TelegramAPIServer.from_base(telegram.base_url)
+    bot = Bot(token="123456:BENCHMARK", session=AiohttpSession(api=api))
+
+    queries = await prepare_database(args.users, args.channels)
+    probe = Probe(queries, telegram)
+    dp = build_dispatcher()
+    stage_names = instrument(dp, probe)
+
+    results = []
+    try:
+        for name in args.scenarios:
+            # warm caches, lazy imports and the connection pool first
+            await run_scenario(
+                dp, bot, probe, stage_names, SCENARIOS[name], 20, args.users
+            )
+            result = await run_scenario(
+                dp,
+                bot,
+                probe,
+                stage_names,
+                SCENARIOS[name],
+                args.updates,
+                args.users,
+            )
+            results.append(result)
+            print(format_result(result), flush=True)
+    finally:
+        from app.core.databases.postgres import get_async_engine
+
+        await bot.session.close()
+        await telegram.stop()
+        await get_async_engine().dispose()
+
+    if args.json:
+        meta = {
+            "argv": sys.argv[1:],
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        write_json(args.json, results, meta)
+    return results
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=sorted(SCENARIOS),
+        default=list(SCENARIOS),
+    )
+    parser.add_argument("--updates", type=int, default=1000, help="per scenario")
+    parser.add_argument("--users", type=int, default=100, help="distinct senders")
+    parser.add_argument(
+        "--channels",
+        type=int,
+        default=0,
+        help="active required channels, each costs a getChatMember per message",
+    )
+    parser.add_argument("--json", help="write the results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,247 @@
+"""
+End-to-end throughput benchmark.
+
+Replays synthetic update streams through the production ``Dispatcher`` with
+``feed_update`` against the fake Bot API and fake platforms, and reports
+latency percentiles, throughput, CPU and RSS per scenario::
+
+    python -m benchmarks.e2e --updates 500 --concurrency 50 --json before.json
+
+Needs the PostgreSQL database from ``docker compose`` with migrations applied;
+the benchmark users it seeds are removed again at the end.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import platform
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+
+from benchmarks.fake_otlp import FakeOTLPCollector
+from benchmarks.fake_platforms import PLATFORM_HOSTS, FakePlatforms, make_fixture_video
+from benchmarks.fake_telegram import FakeTelegramAPI
+from benchmarks.redirect import redirect_hosts
+from benchmarks.report import (
+    ResourceSampler,
+    RunResult,
+    Timer,
+    current_rss,
+    format_table,
+    write_json,
+)
+from benchmarks.scenarios import SCENARIOS, USER_ID_BASE, Scenario, update_stream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCENARIOS = ("start", "twitter", "likee", "pinterest", "session_expired")
+BENCHMARK_TOKEN = "123456:BENCHMARK"
+
+
+async def seed_users(users: int) -> None:
+    from app.bot.models import User
+    from app.core.databases.postgres import get_general_session
+
+    # an active subscription keeps the quota from running out mid-run
+    expiry = datetime.now() + timedelta(days=365)
+    rows = [
+        {
+            "tg_id": USER_ID_BASE + i,
+            "first_name": "Bench",
+            "language_code": "en",
+            "subscription_expiry": expiry,
+        }
+        for i in range(users)
+    ]
+    stmt = insert(User).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.tg_id],
+        set_={"subscription_expiry": stmt.excluded.subscription_expiry},
+    )
+    async with get_general_session() as session:
+        await session.execute(stmt)
+        await session.commit()
+
+
+async def remove_users(users: int) -> None:
+    from app.bot.models import Statistics, User
+    from app.core.databases.postgres import get_general_session
+
+    first, last = USER_ID_BASE, USER_ID_BASE + users - 1
+    async with get_general_session() as session:
+        await session.execute(
+            delete(Statistics).where(Statistics.tg_id.between(first, last))
+        )
+        await session.execute(delete(User).where(User.tg_id.between(first, last)))
+        await session.commit()
+
+
+async def run_scenario(
+    dp: Dispatcher,
+    bot: Bot,
+    telegram: FakeTelegramAPI,
+    scenario: Scenario,
+    updates: int,
+    concurrency: int,
+    users: int,
+) -> RunResult:
+    queue: asyncio.Queue[Update] = asyncio.Queue()
+    for update in update_stream(scenario, updates, users):
+        queue.put_nowait(update)
+
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            update = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception as e:
+                errors += 1
+                logger.debug(f"{scenario.name} update {update.update_id} failed: {e}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    calls_before = Counter(telegram.calls)
+    rss_start = current_rss()
+    async with ResourceSampler() as sampler:
+        with Timer() as timer:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return RunResult(
+        scenario=scenario.name,
+        router=scenario.router,
+        updates=updates,
+        concurrency=concurrency,
+        errors=errors,
+        wall_seconds=round(timer.wall, 3),
+        cpu_seconds=round(timer.cpu, 3),
+        rss_start_mb=round(rss_start / 2**20, 1),
+        rss_peak_mb=round(sampler.peak_rss / 2**20, 1),
+        latencies_ms=latencies,
+        extra={"telegram_calls": dict(Counter(telegram.calls) - calls_before)},
+    )
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    os.environ.setdefault("LOG_LEVEL", args.log_level)
+    collector = None
+    if args.trace:
+        # settings are read once, so tracing is configured before app imports
+        collector = FakeOTLPCollector()
+        os.environ["TRACING_ENABLED"] = "true"
+        os.environ["TRACE_OTLP_ENDPOINT"] = await collector.start()
+
+    from app.bot.handlers.statistics_handler import statistics_aggregator
+    from app.bot.state.session_store import session_store
+    from app.core.monitoring.tracing import setup_tracing, shutdown_tracing
+    from app.server.init import init
+    from app.server.server import build_dispatcher
+
+    init()
+    video = make_fixture_video()
+    telegram = FakeTelegramAPI(file_bytes=video)
+    platforms = FakePlatforms(video, latency=args.upstream_latency)
+    await telegram.start()
+    await platforms.start()
+
+    api = TelegramAPIServer.from_base(telegram.base_url)
+    bot = Bot(token=BENCHMARK_TOKEN, session=AiohttpSession(api=api))
+    dp = build_dispatcher()
+    await seed_users(args.users)
+    # only the hooks the request path needs; resume_broadcasts is left out
+    await statistics_aggregator.start()
+    await session_store.start()
+    await setup_tracing()
+
+    summaries = []
+    print(format_table([]), flush=True)
+    try:
+        with redirect_hosts(PLATFORM_HOSTS, platforms.base_url):
+            for name in args.scenarios:
+                result = await run_scenario(
+                    dp,
+                    bot,
+                    telegram,
+                    SCENARIOS[name],
+                    args.updates,
+                    args.concurrency,
+                    args.users,
+                )
+                summaries.append(result.summary())
+                print(format_table(summaries[-1:]).splitlines()[-1], flush=True)
+    finally:
+        await shutdown_tracing()
+        await statistics_aggregator.stop()
+        await session_store.stop()
+        if not args.keep_users:
+            await remove_users(args.users)
+        await bot.session.close()
+        await telegram.stop()
+        await platforms.stop()
+        if collector:
+            await collector.stop()
+
+    if collector:
+        print("\nspan                              count   mean ms   total ms")
+        for row in collector.breakdown():
+            print(
+                f"{row['span']:<32} {row['count']:>6} {row['mean_ms']:>9}"
+                f" {row['total_ms']:>10}"
+            )
+
+    if args.json:
+        meta = {
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fixture_bytes": len(video),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        write_json(args.json, summaries, meta)
+    return summaries
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=sorted(SCENARIOS),
+        default=list(DEFAULT_SCENARIOS),
+        help="threads also needs a local chromedriver",
+    )
+    parser.add_argument("--updates", type=int, default=200, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50, help="distinct senders")
+    parser.add_argument(
+        "--upstream-latency",
+        type=float,
+        default=0.0,
+        help="seconds the fake platforms wait before answering",
+    )
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--keep-users", action="store_true")
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="trace every update into a local OTLP collector and print spans",
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,63 @@
+"""
+A local stand-in for an OpenTelemetry collector.
+
+Accepts OTLP/HTTP JSON on ``POST /v1/traces`` and keeps the spans, so a run
+with ``TRACE_OTLP_ENDPOINT`` pointed here can report where update time went.
+"""
+
+import statistics
+from collections import defaultdict
+
+from aiohttp import web
+
+
+class FakeOTLPCollector:
+    def __init__(self) -> None:
+        self.spans: list[dict] = []
+        self.requests = 0
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/traces", self.handle_traces)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_traces(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.requests += 1
+        for resource in body.get("resourceSpans", []):
+            for scope in resource.get("scopeSpans", []):
+                self.spans.extend(scope.get("spans", []))
+        return web.json_response({"partialSuccess": {}})
+
+    def breakdown(self) -> list[dict]:
+        """Mean and total milliseconds per span name, slowest total first."""
+        durations: defaultdict[str, list[float]] = defaultdict(list)
+        for span in self.spans:
+            elapsed = int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])
+            durations[span["name"]].append(elapsed / 1e6)
+        rows = [
+            {
+                "span": name,
+                "count": len(values),
+                "mean_ms": round(statistics.fmean(values), 2),
+                "total_ms": round(sum(values), 1),
+            }
+            for name, values in durations.items()
+        ]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
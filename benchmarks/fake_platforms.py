@@ -0,0 +1,189 @@
+"""
+A local stand-in for the platforms the routers download from.
+
+Serves fixture media and the canned pages/JSON each controller parses:
+Pinterest HTML, the RapidAPI Twitter and Likee responses and Threads HTML.
+Requests reach it through ``benchmarks.redirect``, which rewrites
+``https://<host>/<path>`` to ``<base_url>/<host>/<path>``.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+TWITTER_API_HOST = (
+    "twitter-downloader-download-twitter-videos-gifs-and-images.p.rapidapi.com"
+)
+LIKEE_API_HOST = "likee-downloader-download-likee-videos.p.rapidapi.com"
+
+PLATFORM_HOSTS = (
+    TWITTER_API_HOST,
+    LIKEE_API_HOST,
+    "pin.it",
+    "pinterest.com",
+    "www.pinterest.com",
+    "threads.com",
+    "www.threads.com",
+)
+
+# Threads only accepts long Meta CDN looking urls as post media
+THREADS_MEDIA_PATH = (
+    "/media/scontent-benchmark.cdninstagram.com/v/t50.2886-16/"
+    + "0" * 64
+    + "_n.mp4?_nc_cat=1&_nc_ohc=benchmark&_nc_ht=scontent-benchmark"
+)
+
+
+def _ffmpeg() -> str | None:
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+def make_fixture_video(seconds: int = 5, size_kb: int = 512) -> bytes:
+    """
+    A short H.264/AAC clip, so audio extraction paths do real work.
+    Falls back to ``size_kb`` of filler bytes when ffmpeg is unavailable.
+    """
+    ffmpeg = _ffmpeg()
+    if ffmpeg:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "fixture.mp4")
+            cmd = [
+                ffmpeg,
+                "-loglevel",
+                "error",
+                "-f",
+                "lavfi",
+                "-i",
+                f"testsrc=size=480x854:rate=24:duration={seconds}",
+                "-f",
+                "lavfi",
+                "-i",
+                f"sine=frequency=440:duration={seconds}",
+                "-c:v",
+                "libx264",
+                "-preset",
+                "ultrafast",
+                "-c:a",
+                "aac",
+                "-shortest",
+                "-movflags",
+                "+faststart",
+                out,
+            ]
+            try:
+                subprocess.run(cmd, check=True, capture_output=True, timeout=60)
+                with open(out, "rb") as f:
+                    return f.read()
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning(f"ffmpeg fixture generation failed: {e}")
+    return os.urandom(size_kb * 1024)
+
+
+class FakePlatforms:
+    def __init__(self, video: bytes, latency: float = 0.0) -> None:
+        self.video = video
+        # simulated upstream latency per request, in seconds
+        self.latency = latency
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/media/{path:.*}", self.media)
+        app.router.add_get(f"/{TWITTER_API_HOST}/tweetgrab", self.twitter_api)
+        app.router.add_get(f"/{LIKEE_API_HOST}/process", self.likee_api)
+        for host in ("pin.it", "pinterest.com", "www.pinterest.com"):
+            app.router.add_get(f"/{host}/{{path:.*}}", self.pinterest_page)
+        for host in ("threads.com", "www.threads.com"):
+            app.router.add_get(f"/{host}/{{path:.*}}", self.threads_page)
+        app.middlewares.append(self._latency_middleware)
+        return app
+
+    @web.middleware
+    async def _latency_middleware(self, request: web.Request, handler):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def media_url(self, name: str = "clip.mp4") -> str:
+        return f"{self.base_url}/media/{name}"
+
+    async def media(self, request: web.Request) -> web.Response:
+        headers = {"Content-Type": "video/mp4", "Accept-Ranges": "bytes"}
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(self.video))
+            return web.Response(headers=headers)
+        if "Range" in request.headers:
+            # like a CDN, so the downloader takes its range path
+            start, stop, _ = request.http_range.indices(len(self.video))
+            headers["Content-Range"] = f"bytes {start}-{stop - 1}/{len(self.video)}"
+            return web.Response(
+                status=206, body=self.video[start:stop], headers=headers
+            )
+        return web.Response(body=self.video, headers=headers)
+
+    async def twitter_api(self, request: web.Request) -> web.Response:
+        tweet_id = request.query.get("url", "").rstrip("/").split("/")[-1]
+        variant = {
+            "content_type": "video/mp4",
+            "bitrate": 832000,
+            "url": self.media_url(f"twitter_{tweet_id}.mp4"),
+        }
+        return web.json_response(
+            {"id": tweet_id, "media_list": [{"type": "video", "variants": [variant]}]}
+        )
+
+    async def likee_api(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"nick_name": "bench", "withoutWater": self.media_url("likee.mp4")}
+        )
+
+    async def pinterest_page(self, request: web.Request) -> web.Response:
+        video_url = self.media_url("pinterest.mp4")
+        html = (
+            "<html><head>"
+            f'<meta property="og:video" content="{video_url}">'
+            '<meta property="og:image" content="">'
+            "</head><body><script>"
+            f'{{"videos": {{"video_list": {{"V_720P": {{"url": "{video_url}"}}}}}}}}'
+            "</script></body></html>"
+        )
+        return web.Response(text=html, content_type="text/html")
+
+    async def threads_page(self, request: web.Request) -> web.Response:
+        video_url = self.base_url + THREADS_MEDIA_PATH
+        html = (
+            "<html><body><main><div role='article'>"
+            f"<video src='{video_url}'></video>"
+            "</div></main></body></html>"
+        )
+        return web.Response(text=html, content_type="text/html")
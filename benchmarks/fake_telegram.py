@@ -0,0 +1,111 @@
+"""
+A local stand-in for the Telegram Bot API.
+
+Accepts every method the routers call, answers with the smallest valid
+result and counts calls per method. Uploaded files are read and dropped, so
+upload cost is still part of the measurement.
+"""
+
+import itertools
+import time
+from collections import Counter
+
+from aiohttp import web
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Benchmark",
+    "username": "benchmark_bot",
+}
+
+
+class FakeTelegramAPI:
+    def __init__(self, file_bytes: bytes = b"") -> None:
+        self.file_bytes = file_bytes
+        self.calls: Counter[str] = Counter()
+        self.uploaded_bytes = 0
+        self._message_ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=2 * 1024**3)
+        app.router.add_post("/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/file/bot{token}/{path:.*}", self.handle_file)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _read_params(self, request: web.Request) -> dict:
+        params = {}
+        if request.content_type == "multipart/form-data":
+            reader = await request.multipart()
+            async for part in reader:
+                if part.filename:
+                    while chunk := await part.read_chunk():
+                        self.uploaded_bytes += len(chunk)
+                    params[part.name] = part.filename
+                else:
+                    params[part.name] = await part.text()
+        elif request.can_read_body:
+            if request.content_type == "application/json":
+                params = await request.json()
+            else:
+                params = dict(await request.post())
+        return params
+
+    def _message(self, params: dict, **content) -> dict:
+        chat_id = int(params.get("chat_id") or 0)
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+            "from": BOT_USER,
+            **content,
+        }
+
+    def _result(self, method: str, params: dict):
+        file = {"file_id": f"f{method}", "file_unique_id": f"u{method}"}
+        if method == "getMe":
+            return BOT_USER
+        if method == "getFile":
+            return {**file, "file_size": len(self.file_bytes), "file_path": "file"}
+        if method == "getChatMember":
+            user = {"id": int(params.get("user_id") or 0), "is_bot": False}
+            return {"status": "member", "user": {**user, "first_name": "User"}}
+        if method in ("sendMessage", "editMessageText"):
+            return self._message(params, text=params.get("text", ""))
+        if method == "sendVideo":
+            video = {**file, "width": 720, "height": 1280, "duration": 1}
+            return self._message(params, video=video)
+        if method == "sendAudio":
+            return self._message(params, audio={**file, "duration": 1})
+        if method == "sendPhoto":
+            return self._message(params, photo=[{**file, "width": 1, "height": 1}])
+        if method == "sendDocument":
+            return self._message(params, document=file)
+        if method == "sendMediaGroup":
+            return [self._message(params, document=file)]
+        return True
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._read_params(request)
+        self.calls[method] += 1
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.file_bytes)
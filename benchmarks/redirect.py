@@ -0,0 +1,70 @@
+"""
+Rewrites outgoing platform requests to the local stand-in servers.
+
+``https://pin.it/abc`` becomes ``<base_url>/pin.it/abc``. Covers ``requests``
+(Twitter, Likee, Pinterest, Threads media), aiohttp client sessions and the
+Selenium driver used for Threads pages. Hosts that are not listed are left
+alone, so the bot's own calls to the fake Bot API are untouched.
+"""
+
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+from urllib.parse import urlsplit
+
+
+def rewrite_url(url: str, hosts: frozenset[str], base_url: str) -> str:
+    parts = urlsplit(str(url))
+    if parts.hostname not in hosts:
+        return url
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{base_url}/{parts.hostname}{parts.path}{query}"
+
+
+@contextmanager
+def redirect_hosts(hosts: Iterable[str], base_url: str) -> Iterator[None]:
+    import aiohttp
+    import requests
+
+    hosts = frozenset(hosts)
+    patches = []
+
+    def patch(owner, name, make):
+        original = getattr(owner, name)
+        setattr(owner, name, make(original))
+        patches.append((owner, name, original))
+
+    def requests_request(original):
+        def request(self, method, url, *args, **kwargs):
+            return original(
+                self, method, rewrite_url(url, hosts, base_url), *args, **kwargs
+            )
+
+        return request
+
+    def aiohttp_request(original):
+        async def _request(self, method, str_or_url, *args, **kwargs):
+            url = rewrite_url(str(str_or_url), hosts, base_url)
+            return await original(self, method, url, *args, **kwargs)
+
+        return _request
+
+    patch(requests.Session, "request", requests_request)
+    patch(aiohttp.ClientSession, "_request", aiohttp_request)
+    try:
+        from selenium.webdriver.remote.webdriver import WebDriver
+
+        def driver_get(original):
+            def get(self, url):
+                return original(self, rewrite_url(url, hosts, base_url))
+
+            return get
+
+        patch(WebDriver, "get", driver_get)
+    except ImportError:
+        pass
+
+    try:
+        yield
+    finally:
+        for owner, name, original in reversed(patches):
+            setattr(owner, name, original)
@@ -0,0 +1,139 @@
+"""Latency, throughput and resource figures shared by the benchmark runners."""
+
+import asyncio
+import json
+import os
+import resource
+import time
+from dataclasses import asdict, dataclass, field
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        # ru_maxrss is KiB on Linux; best effort elsewhere
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class ResourceSampler:
+    """Samples RSS in the background to catch the peak of a run."""
+
+    def __init__(self, interval: float = 0.1) -> None:
+        self.interval = interval
+        self.peak_rss = 0
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "ResourceSampler":
+        self.peak_rss = current_rss()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+        self.peak_rss = max(self.peak_rss, current_rss())
+
+    async def _run(self) -> None:
+        while True:
+            self.peak_rss = max(self.peak_rss, current_rss())
+            await asyncio.sleep(self.interval)
+
+
+@dataclass
+class RunResult:
+    scenario: str
+    router: str
+    updates: int
+    concurrency: int
+    errors: int
+    wall_seconds: float
+    cpu_seconds: float
+    rss_start_mb: float
+    rss_peak_mb: float
+    latencies_ms: list[float] = field(default_factory=list, repr=False)
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        return self.updates / self.wall_seconds if self.wall_seconds else 0.0
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies_ms)
+        data = asdict(self)
+        data.pop("latencies_ms")
+        data.update(
+            {
+                "throughput_per_s": round(self.throughput, 2),
+                "p50_ms": round(percentile(ordered, 50), 2),
+                "p95_ms": round(percentile(ordered, 95), 2),
+                "p99_ms": round(percentile(ordered, 99), 2),
+                "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+                "cpu_per_update_ms": round(
+                    self.cpu_seconds * 1000 / self.updates if self.updates else 0.0,
+                    3,
+                ),
+            }
+        )
+        return data
+
+
+class Timer:
+    def __init__(self) -> None:
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._wall = time.perf_counter()
+        self._cpu = cpu_seconds()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.wall = time.perf_counter() - self._wall
+        self.cpu = cpu_seconds() - self._cpu
+
+
+# (summary key, header, width)
+COLUMNS = (
+    ("scenario", "scenario", -16),
+    ("router", "router", -18),
+    ("updates", "updates", 7),
+    ("errors", "errors", 6),
+    ("throughput_per_s", "upd/s", 10),
+    ("p50_ms", "p50 ms", 9),
+    ("p95_ms", "p95 ms", 9),
+    ("p99_ms", "p99 ms", 9),
+    ("cpu_per_update_ms", "cpu ms", 9),
+    ("rss_peak_mb", "rss MB", 9),
+)
+
+
+def _cell(value, width: int) -> str:
+    return f"{value!s:<{-width}}" if width < 0 else f"{value!s:>{width}}"
+
+
+def format_table(summaries: list[dict]) -> str:
+    lines = [" ".join(_cell(header, width) for _, header, width in COLUMNS)]
+    for summary in summaries:
+        lines.append(" ".join(_cell(summary[key], width) for key, _, width in COLUMNS))
+    return "\n".join(lines)
+
+
+def write_json(path: str, summaries: list[dict], meta: dict) -> None:
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": summaries}, f, indent=2, default=str)
@@ -0,0 +1,109 @@
+"""
+Synthetic update streams, one scenario per router.
+
+Every update comes from one of ``users`` seeded benchmark users so that the
+quota, session and statistics paths see realistic per-user contention.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from aiogram.types import Update
+
+# far above real Telegram ids so seeded rows never collide with real users
+USER_ID_BASE = 9_000_000_000_000
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    router: str
+    make_text: Callable[[int], str] | None = None
+    callback_data: str | None = None
+
+
+SCENARIOS: dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("start", "start_router", make_text=lambda i: "/start"),
+        Scenario(
+            "twitter",
+            "twitter_router",
+            make_text=lambda i: f"https://x.com/bench/status/{1000 + i}",
+        ),
+        Scenario(
+            "likee",
+            "likee_router",
+            make_text=lambda i: f"https://likee.video/@bench/video/{1000 + i}",
+        ),
+        Scenario(
+            "pinterest",
+            "pinterest_router",
+            make_text=lambda i: f"https://pin.it/bench{i}",
+        ),
+        Scenario(
+            "threads",
+            "threads_router",
+            make_text=lambda i: f"https://www.threads.com/@bench/post/B{i}",
+        ),
+        Scenario(
+            "session_expired",
+            "twitter_router",
+            callback_data="twitter:download_music",
+        ),
+    )
+}
+
+
+def user_id(index: int, users: int) -> int:
+    return USER_ID_BASE + index % users
+
+
+def _user(tg_id: int) -> dict:
+    return {
+        "id": tg_id,
+        "is_bot": False,
+        "first_name": "Bench",
+        "language_code": "en",
+    }
+
+
+def make_update(scenario: Scenario, update_id: int, tg_id: int) -> Update:
+    now = int(time.time())
+    chat = {"id": tg_id, "type": "private", "first_name": "Bench"}
+    message = {
+        "message_id": update_id,
+        "date": now,
+        "chat": chat,
+        "from": _user(tg_id),
+    }
+    if scenario.callback_data is not None:
+        bot_message = {**message, "from": {**_user(1), "is_bot": True}, "text": "."}
+        return Update.model_validate(
+            {
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(update_id),
+                    "from": _user(tg_id),
+                    "chat_instance": str(tg_id),
+                    "message": bot_message,
+                    "data": scenario.callback_data,
+                },
+            }
+        )
+    text = scenario.make_text(update_id)
+    entities = []
+    if text.startswith("/"):
+        entities = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {**message, "text": text, "entities": entities},
+        }
+    )
+
+
+def update_stream(scenario: Scenario, count: int, users: int) -> Iterator[Update]:
+    for index in range(count):
+        yield make_update(scenario, index + 1, user_id(index, users))
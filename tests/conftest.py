@@ -0,0 +1,20 @@
+"""Settings the app needs at import time, for runs without a ``.env``."""
+
+import os
+
+for name, value in {
+    "BOT_TOKEN": "123456:TEST",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_DB": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "SELENIUM_REMOTE_URL": "http://localhost:4444",
+    "LIKEE_API_KEY": "test",
+    "TWITTER_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+# database tests run against TEST_DATABASE_URL and are skipped without it
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
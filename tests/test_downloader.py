@@ -0,0 +1,160 @@
+import asyncio
+import re
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.core.utils import downloader
+from app.core.utils.downloader import DownloadError, download_file
+
+BODY = b"x" * 4096
+
+
+async def _serve(content_type: str, check) -> list[str]:
+    """Runs ``check(url)`` against a server and returns the Range headers seen."""
+    ranges = []
+
+    async def handler(request: web.Request) -> web.Response:
+        ranges.append(request.headers.get("Range", ""))
+        if request.headers.get("Range") == "bytes=0-0":
+            return web.Response(
+                status=206,
+                body=BODY[:1],
+                content_type=content_type,
+                headers={"Content-Range": f"bytes 0-0/{len(BODY)}"},
+            )
+        return web.Response(body=BODY, content_type=content_type)
+
+    app = web.Application()
+    app.router.add_get("/media", handler)
+    async with TestServer(app) as server:
+        await check(str(server.make_url("/media")))
+    return ranges
+
+
+def test_unexpected_content_type_is_rejected_before_the_body(tmp_path):
+    target = tmp_path / "video.mp4"
+
+    async def check(url: str) -> None:
+        with pytest.raises(DownloadError):
+            await download_file(url, target, expect_type="video")
+
+    ranges = asyncio.run(_serve("text/html", check))
+    assert ranges == ["bytes=0-0"]
+    assert not target.exists()
+
+
+def test_expected_content_type_is_downloaded(tmp_path):
+    target = tmp_path / "video.mp4"
+
+    async def check(url: str) -> None:
+        result = await download_file(url, target, expect_type="video")
+        assert result.size == len(BODY)
+
+    asyncio.run(_serve("video/mp4", check))
+    assert target.read_bytes() == BODY
+
+
+def test_disk_errors_are_download_errors(tmp_path):
+    # a file where the target directory should be
+    (tmp_path / "media").write_bytes(b"")
+
+    async def check(url: str) -> None:
+        with pytest.raises(DownloadError):
+            await download_file(url, tmp_path / "media" / "video.mp4")
+
+    asyncio.run(_serve("video/mp4", check))
+
+
+RANGED_BODY = bytes(range(256)) * 256  # 64 KiB, four 16 KiB ranges
+PART = len(RANGED_BODY) // 4
+
+
+async def _serve_ranges(respond, check) -> list[str]:
+    """
+    Serves ``RANGED_BODY`` by ranges; ``respond(start, seen)`` may return a
+    response of its own for the request of a range. Returns the ranges asked.
+    """
+    asked = []
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        value = request.headers.get("Range", "")
+        asked.append(value)
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", value).groups())
+        custom = respond(start, asked.count(value))
+        if custom is not None:
+            return custom
+        response = web.StreamResponse(
+            status=206,
+            headers={
+                "Content-Type": "video/mp4",
+                "Content-Range": f"bytes {start}-{end}/{len(RANGED_BODY)}",
+                "Content-Length": str(end + 1 - start),
+            },
+        )
+        await response.prepare(request)
+        # slow enough that the other ranges are still running on a failure
+        for offset in range(start, end + 1, 4096):
+            await response.write(RANGED_BODY[offset : min(offset + 4096, end + 1)])
+            await asyncio.sleep(0.05)
+        return response
+
+    app = web.Application()
+    app.router.add_get("/media", handler)
+    async with TestServer(app) as server:
+        await check(str(server.make_url("/media")))
+    return asked
+
+
+@pytest.fixture
+def ranged(monkeypatch):
+    monkeypatch.setattr(downloader.settings, "DOWNLOAD_RANGE_MIN_SIZE", 1)
+    monkeypatch.setattr(downloader, "RETRIES", 1)
+
+
+def test_a_range_resumes_where_it_stopped(ranged, tmp_path):
+    target = tmp_path / "video.mp4"
+    half = PART + PART // 2
+
+    def respond(start: int, seen: int) -> web.Response | None:
+        # the second range answers half of its bytes the first time
+        if start == PART and seen == 1:
+            return web.Response(
+                status=206,
+                body=RANGED_BODY[PART:half],
+                headers={"Content-Range": f"bytes {PART}-{half - 1}/*"},
+            )
+        return None
+
+    async def check(url: str) -> None:
+        result = await download_file(url, target, connections=4)
+        assert result.ranged
+
+    asked = asyncio.run(_serve_ranges(respond, check))
+    assert f"bytes={half}-{2 * PART - 1}" in asked
+    assert target.read_bytes() == RANGED_BODY
+
+
+def test_a_failed_range_stops_the_others(ranged, monkeypatch, tmp_path):
+    # fail at once, while the other ranges are still streaming
+    monkeypatch.setattr(downloader, "RETRIES", 0)
+    target = tmp_path / "video.mp4"
+
+    def respond(start: int, seen: int) -> web.Response | None:
+        if start == PART:
+            return web.Response(status=500)
+        return None
+
+    async def check(url: str) -> None:
+        with pytest.raises(DownloadError):
+            await download_file(url, target, connections=4)
+        running = [
+            task
+            for task in asyncio.all_tasks()
+            if task.get_coro().__name__ == "_fetch_range"
+        ]
+        assert running == []
+
+    asyncio.run(_serve_ranges(respond, check))
+    assert not target.exists()
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from app.bot.controller import pinterest_controller
+from app.bot.controller.group_controller import GroupController
+
+
+def test_a_cancelled_pinterest_download_is_not_saved(monkeypatch, tmp_path):
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def scrape(self, url):
+        fetching.set()
+        release.wait(5)
+        return SimpleNamespace(media_type="image", extension=".jpg", buffer=b"x")
+
+    monkeypatch.setattr(pinterest_controller.PinterestDL, "scrape", scrape)
+    controller = GroupController()
+    controller.media_dir = tmp_path
+
+    async def main() -> None:
+        task = asyncio.create_task(
+            controller._download_pinterest("https://pin.it/abc")
+        )
+        # the event loop must stay free while the page is fetched
+        while not fetching.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        release.set()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("the download was not cancelled")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert not list(tmp_path.rglob("*.jpg"))
@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.bot.handlers.job_handler import (
+    cancel_job,
+    complete_job,
+    enqueue_job,
+    get_job,
+    start_delivery,
+)
+from app.bot.models import Job
+from app.core.databases.postgres import get_async_engine, get_general_session
+from app.core.extensions.enums import JobKind, JobStatus
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"),
+    reason="needs a PostgreSQL database in TEST_DATABASE_URL",
+)
+
+
+async def _with_running_job(check) -> None:
+    job = await enqueue_job(JobKind.DOWNLOAD, {"user_id": 1})
+    async with get_general_session() as session:
+        await session.execute(
+            update(Job)
+            .where(Job.id == job.id)
+            .values(status=JobStatus.RUNNING.value)
+        )
+        await session.commit()
+    try:
+        await check(job.id)
+    finally:
+        async with get_general_session() as session:
+            await session.execute(delete(Job).where(Job.id == job.id))
+            await session.commit()
+        await get_async_engine().dispose()
+
+
+def test_a_sending_job_cannot_be_cancelled():
+    async def check(job_id: int) -> None:
+        assert await start_delivery(job_id)
+        assert not await cancel_job(job_id)
+        await complete_job(job_id)
+        assert (await get_job(job_id)).status == JobStatus.DONE.value
+
+    asyncio.run(_with_running_job(check))
+
+
+def test_a_cancelled_job_is_not_delivered():
+    async def check(job_id: int) -> None:
+        assert await cancel_job(job_id)
+        assert not await start_delivery(job_id)
+        await complete_job(job_id)
+        assert (await get_job(job_id)).status == JobStatus.CANCELLED.value
+
+    asyncio.run(_with_running_job(check))
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+import app.bot.routers  # noqa: F401  (group_handler needs the routers first)
+from app.bot.handlers import group_handler, threads_handler
+
+PARTS = [(1, [1]), (10, [10]), (11, [10, 1]), (23, [10, 10, 3])]
+
+
+class FakeSender:
+    """Stands in for both a ``Bot`` and a ``Message``."""
+
+    def __init__(self) -> None:
+        self.sent: list[int] = []
+
+    async def _video(self, *args, video, **kwargs) -> None:
+        self.sent.append(1)
+
+    async def _album(self, *args, media, **kwargs) -> None:
+        assert 2 <= len(media) <= 10
+        self.sent.append(len(media))
+
+    send_video = reply_video = _video
+    send_media_group = reply_media_group = _album
+
+
+def _split_into(monkeypatch, module, tmp_path, count: int):
+    source = tmp_path / "video.mp4"
+    parts = [tmp_path / f"part{i}.mp4" for i in range(count)]
+    for path in [source, *parts]:
+        path.write_bytes(b"x")
+
+    async def fit_to_limit(path, platform):
+        return parts
+
+    monkeypatch.setattr(module, "fit_to_limit", fit_to_limit)
+    return source, parts
+
+
+@pytest.mark.parametrize(("count", "albums"), PARTS)
+def test_group_parts_go_out_in_albums_of_ten(monkeypatch, tmp_path, count, albums):
+    source, parts = _split_into(monkeypatch, group_handler, tmp_path, count)
+    bot = FakeSender()
+    sent = asyncio.run(
+        group_handler._send_oversized_video(bot, 1, 2, source, {}, "via")
+    )
+
+    assert sent
+    assert bot.sent == albums
+    assert source.exists()
+    assert not any(part.exists() for part in parts)
+
+
+@pytest.mark.parametrize(("count", "albums"), PARTS)
+def test_threads_parts_go_out_in_albums_of_ten(monkeypatch, tmp_path, count, albums):
+    source, parts = _split_into(monkeypatch, threads_handler, tmp_path, count)
+    message = FakeSender()
+    sent = asyncio.run(
+        threads_handler.ThreadHandler()._send_oversized_video(message, source)
+    )
+
+    assert sent
+    assert message.sent == albums
+    assert not any(part.exists() for part in parts)
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import random
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.bot.handlers.quota_handler import consume_quota, reserve_quota
+from app.bot.models import User
+from app.core.databases.postgres import get_async_engine, get_general_session
+from app.core.extensions.enums import QuotaSource
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"),
+    reason="needs a PostgreSQL database in TEST_DATABASE_URL",
+)
+
+
+async def _with_user(tokens: int, free_requests_left: int, check) -> None:
+    tg_id = random.randint(10**12, 10**13)
+    async with get_general_session() as session:
+        session.add(
+            User(
+                tg_id=tg_id,
+                first_name="Quota test",
+                tokens=tokens,
+                free_requests_left=free_requests_left,
+            )
+        )
+        await session.commit()
+    try:
+        await check(tg_id)
+    finally:
+        async with get_general_session() as session:
+            await session.execute(delete(User).where(User.tg_id == tg_id))
+            await session.commit()
+        # the pooled connections belong to this event loop
+        await get_async_engine().dispose()
+
+
+async def _balance(tg_id: int) -> tuple[int, int]:
+    async with get_general_session() as session:
+        row = (
+            await session.execute(
+                select(User.free_requests_left, User.tokens).where(
+                    User.tg_id == tg_id
+                )
+            )
+        ).one()
+    return row.free_requests_left, row.tokens
+
+
+def test_concurrent_requests_spend_each_token_once():
+    tokens, requests = 3, 10
+
+    async def check(tg_id: int) -> None:
+        results = await asyncio.gather(
+            *(consume_quota(tg_id) for _ in range(requests))
+        )
+        assert results.count(QuotaSource.TOKENS) == tokens
+        assert results.count(None) == requests - tokens
+        assert await _balance(tg_id) == (0, 0)
+
+    asyncio.run(_with_user(tokens, 0, check))
+
+
+def test_free_requests_are_spent_before_tokens():
+    async def check(tg_id: int) -> None:
+        assert await consume_quota(tg_id) == QuotaSource.FREE
+        assert await consume_quota(tg_id) == QuotaSource.TOKENS
+        assert await consume_quota(tg_id) is None
+        assert await _balance(tg_id) == (0, 0)
+
+    asyncio.run(_with_user(1, 1, check))
+
+
+def test_refund_gives_the_token_back():
+    async def check(tg_id: int) -> None:
+        reservation = await reserve_quota(tg_id)
+        assert reservation.source == QuotaSource.TOKENS
+        assert await _balance(tg_id) == (0, 0)
+
+        await reservation.refund()
+        await reservation.refund()
+        assert await _balance(tg_id) == (0, 1)
+
+    asyncio.run(_with_user(1, 0, check))
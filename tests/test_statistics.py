@@ -0,0 +1,48 @@
+import asyncio
+import os
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.bot.handlers.statistics_handler import StatisticsAggregator
+from app.bot.models import UsageDailyUser
+from app.core.databases.postgres import get_async_engine, get_general_session
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"),
+    reason="needs a PostgreSQL database in TEST_DATABASE_URL",
+)
+
+PLATFORM = "test_prune"
+
+
+def test_flush_prunes_users_of_finished_days():
+    today = date.today()
+    days = [today - timedelta(days=n) for n in range(4)]
+
+    async def run() -> list[date]:
+        async with get_general_session() as session:
+            session.add_all(
+                UsageDailyUser(day=day, platform=PLATFORM, event="download", tg_id=1)
+                for day in days
+            )
+            await session.commit()
+        try:
+            await StatisticsAggregator(flush_interval=60, max_events=100).flush()
+            async with get_general_session() as session:
+                result = await session.execute(
+                    select(UsageDailyUser.day).where(
+                        UsageDailyUser.platform == PLATFORM
+                    )
+                )
+                return sorted(result.scalars())
+        finally:
+            async with get_general_session() as session:
+                await session.execute(
+                    delete(UsageDailyUser).where(UsageDailyUser.platform == PLATFORM)
+                )
+                await session.commit()
+            await get_async_engine().dispose()
+
+    assert asyncio.run(run()) == [days[1], today]
@@ -0,0 +1,53 @@
+import asyncio
+
+from benchmarks.fake_otlp import FakeOTLPCollector
+
+from app.core.monitoring import tracing
+from app.core.monitoring.tracing import (
+    OTLPHttpExporter,
+    setup_tracing,
+    shutdown_tracing,
+    span,
+    trace,
+    tracer,
+)
+
+
+def test_nested_spans_reach_the_collector(monkeypatch, tmp_path):
+    collector = FakeOTLPCollector()
+
+    async def run() -> None:
+        monkeypatch.setattr(tracing.settings, "TRACING_ENABLED", True)
+        monkeypatch.setattr(tracing.settings, "TRACE_SAMPLE_RATE", 1.0)
+        monkeypatch.setattr(tracing.settings, "TRACE_FILE", str(tmp_path / "t.jsonl"))
+        monkeypatch.setattr(
+            tracing.settings, "TRACE_OTLP_ENDPOINT", await collector.start()
+        )
+        await setup_tracing()
+        try:
+            with trace("update", update_type="message"):
+                with span("tiktok.download"):
+                    with span("ffmpeg.probe"):
+                        pass
+            for exporter in tracer.exporters:
+                if isinstance(exporter, OTLPHttpExporter):
+                    await exporter.flush()
+        finally:
+            await shutdown_tracing()
+            await collector.stop()
+
+    asyncio.run(run())
+
+    spans = {s["name"]: s for s in collector.spans}
+    assert set(spans) == {"update", "tiktok.download", "ffmpeg.probe"}
+    root, download, probe = (
+        spans["update"],
+        spans["tiktok.download"],
+        spans["ffmpeg.probe"],
+    )
+    assert root["traceId"] == download["traceId"] == probe["traceId"]
+    assert root["parentSpanId"] == ""
+    assert download["parentSpanId"] == root["spanId"]
+    assert probe["parentSpanId"] == download["spanId"]
+    assert int(root["startTimeUnixNano"]) <= int(download["startTimeUnixNano"])
+    assert int(download["endTimeUnixNano"]) <= int(root["endTimeUnixNano"])
@@ -0,0 +1,131 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, WebhookInfo
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.server import webhook
+
+SECRET = "s3cret"
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+        "text": "hello",
+    },
+}
+
+
+class FakeTelegram:
+    """Stands in for the webhook calls the startup hook makes."""
+
+    def __init__(self, info: WebhookInfo) -> None:
+        self.info = info
+        self.set_calls: list[dict] = []
+
+    async def get_webhook_info(self) -> WebhookInfo:
+        return self.info
+
+    async def set_webhook(self, **kwargs) -> bool:
+        self.set_calls.append(kwargs)
+        return True
+
+
+def _setup(monkeypatch, info: WebhookInfo):
+    monkeypatch.setattr(webhook.settings, "WEBHOOK_BASE_URL", "https://bot.test")
+    monkeypatch.setattr(webhook.settings, "WEBHOOK_PATH", "/webhook")
+    monkeypatch.setattr(webhook.settings, "WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(webhook.settings, "WEBHOOK_SSL_CERT", None)
+
+    received: list[str] = []
+    router = Router()
+
+    @router.message()
+    async def record(message: Message) -> None:
+        received.append(message.text)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot(token="123456:TEST")
+    telegram = FakeTelegram(info)
+    monkeypatch.setattr(bot, "get_webhook_info", telegram.get_webhook_info)
+    monkeypatch.setattr(bot, "set_webhook", telegram.set_webhook)
+    return webhook.build_webhook_app(dp, bot), telegram, received
+
+
+def _info(url: str, allowed_updates: list[str]) -> WebhookInfo:
+    return WebhookInfo(
+        url=url,
+        has_custom_certificate=False,
+        pending_update_count=0,
+        allowed_updates=allowed_updates,
+    )
+
+
+async def _with_client(app, check) -> None:
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    try:
+        await check(client)
+    finally:
+        await client.close()
+
+
+def test_health_and_secret_token(monkeypatch):
+    app, _, received = _setup(monkeypatch, _info("", []))
+
+    async def check(client: TestClient) -> None:
+        response = await client.get("/health")
+        assert response.status == 200
+        assert await response.json() == {"status": "ok"}
+
+        response = await client.post("/webhook", json=UPDATE)
+        assert response.status == 401
+        response = await client.post(
+            "/webhook",
+            json=UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+        )
+        assert response.status == 401
+
+        response = await client.post(
+            "/webhook",
+            json=UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+        )
+        assert response.status == 200
+        # updates are handled in the background after the response
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        assert received == ["hello"]
+
+    asyncio.run(_with_client(app, check))
+
+
+def test_startup_registers_a_new_webhook_without_dropping_updates(monkeypatch):
+    app, telegram, _ = _setup(monkeypatch, _info("https://old.test/webhook", []))
+
+    async def check(client: TestClient) -> None:
+        assert len(telegram.set_calls) == 1
+        call = telegram.set_calls[0]
+        assert call["url"] == "https://bot.test/webhook"
+        assert call["secret_token"] == SECRET
+        assert call["drop_pending_updates"] is False
+
+    asyncio.run(_with_client(app, check))
+
+
+def test_startup_keeps_a_current_webhook(monkeypatch):
+    app, telegram, _ = _setup(
+        monkeypatch, _info("https://bot.test/webhook", ["message"])
+    )
+
+    async def check(client: TestClient) -> None:
+        assert telegram.set_calls == []
+
+    asyncio.run(_with_client(app, check))
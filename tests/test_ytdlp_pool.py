@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.utils.ytdlp_pool import YtDlpPool
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_waiting_for_a_worker_does_not_count_against_the_timeout():
+    async def run() -> None:
+        pool = YtDlpPool(workers=1, max_jobs=10, prestart=1)
+        await pool.start()
+        try:
+            await pool.run(_sleep, 0)  # the worker imports this module
+            busy = asyncio.create_task(pool.run(_sleep, 1.0))
+            await asyncio.sleep(0.1)
+            assert await pool.run_timed(0.5, _sleep, 0.1) == 0.1
+            await busy
+        finally:
+            await pool.stop()
+
+    asyncio.run(run())
+
+
+def test_a_job_over_the_timeout_is_stopped():
+    async def run() -> None:
+        pool = YtDlpPool(workers=1, max_jobs=10, prestart=1)
+        await pool.start()
+        try:
+            await pool.run(_sleep, 0)
+            started = time.monotonic()
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.run_timed(0.2, _sleep, 30)
+            assert time.monotonic() - started < 5
+            # the worker that didn't stop is replaced
+            assert await pool.run(_sleep, 0) == 0
+        finally:
+            await pool.stop()
+
+    asyncio.run(run())